@@ -1,130 +1,617 @@
-from datetime import datetime, timedelta
-
-
-def get_longest_streak(completions, periodicity):
-    """Calculate the longest streak for a habit.
-
-    Args:
-        completions: List of datetime objects
-        periodicity: 'daily', 'weekly', or 'monthly'
-    """
-    if not completions:
-        return 0
-
-    completions_sorted = sorted(completions)
-    streaks = []
-    current_streak = 1
-
-    for i in range(1, len(completions_sorted)):
-        prev = completions_sorted[i - 1]
-        curr = completions_sorted[i]
-
-        if periodicity == 'daily':
-            expected = prev + timedelta(days=1)
-            is_streak = curr.date() == expected.date()
-        elif periodicity == 'weekly':
-            expected = prev + timedelta(weeks=1)
-            is_streak = curr.date() == expected.date()
-        elif periodicity == 'monthly':
-
-            is_streak = (
-                    curr.day == prev.day and
-                    (curr.year == prev.year and curr.month == prev.month + 1) or
-                    (curr.year == prev.year + 1 and curr.month == 1 and prev.month == 12)
-            )
-        else:
-            raise ValueError("Periodicity must be 'daily', 'weekly', or 'monthly'")
-
-        if is_streak:
-            current_streak += 1
-        else:
-            streaks.append(current_streak)
-            current_streak = 1
-
-    streaks.append(current_streak)
-    return max(streaks) if streaks else 0
-
-
-def get_current_streak(completions, periodicity):
-    """Calculate the current active streak for a habit."""
-    if not completions:
-        return 0
-
-    completions_sorted = sorted(completions, reverse=True)
-    current_streak = 1
-    today = datetime.now().date()
-
-    last_completion = completions_sorted[0].date()
-
-    if periodicity == 'daily':
-        days_since_last = (today - last_completion).days
-        if days_since_last > 1:
-            return 0
-    elif periodicity == 'weekly':
-        days_since_last = (today - last_completion).days
-        if days_since_last > 7:
-            return 0
-    elif periodicity == 'monthly':
-        days_since_last = (today - last_completion).days
-        if days_since_last > 31:
-            return 0
-    else:
-        raise ValueError("Periodicity must be 'daily', 'weekly', or 'monthly'")
-
-    for i in range(1, len(completions_sorted)):
-        prev = completions_sorted[i - 1]
-        curr = completions_sorted[i]
-
-        if periodicity == 'daily':
-            expected = prev - timedelta(days=1)
-            is_streak = curr.date() == expected.date()
-        elif periodicity == 'weekly':
-            expected = prev - timedelta(weeks=1)
-            is_streak = curr.date() == expected.date()
-        elif periodicity == 'monthly':
-
-            is_streak = (
-                    curr.day == prev.day and
-                    ((curr.year == prev.year and curr.month == prev.month - 1) or
-                     (curr.year == prev.year - 1 and curr.month == 12 and prev.month == 1))
-            )
-        else:
-            raise ValueError("Periodicity must be 'daily', 'weekly', or 'monthly'")
-
-        if is_streak:
-            current_streak += 1
-        else:
-            break
-
-    return current_streak
-
-
-def get_all_longest_streaks(habits, tracker):
-    """Get longest streaks for all habits.
-
-    Args:
-        habits: List of Habit objects
-        tracker: HabitTracker instance
-
-    Returns:
-        Dictionary of {habit_name: longest_streak}
-    """
-    streaks = {}
-    for habit in habits:
-        completions = tracker.get_habit_completions(habit.habit_id)
-        streaks[habit.name] = get_longest_streak(completions, habit.periodicity)
-    return streaks
-
-
-def get_global_longest_streak(habits, tracker):
-    """Get the maximum streak across all habits.
-
-    Args:
-        habits: List of Habit objects
-        tracker: HabitTracker instance
-
-    Returns:
-        Tuple of (habit_name, streak_length)
-    """
-    streaks = get_all_longest_streaks(habits, tracker)
-    return max(streaks.items(), key=lambda x: x[1], default=(None, 0))
\ No newline at end of file
+from array import array
+from collections import Counter, OrderedDict
+from datetime import date, datetime, timedelta
+
+import profiling
+from timestamps import EPOCH, from_epoch_us, slice_range, to_epoch_us, unpack_timestamps
+
+# NumPy is optional and only imported by _load_numpy() once a history is
+# long enough to vectorize, so short-lived scripts never pay for it.
+np = None
+_numpy_checked = False
+
+# Below this many completions building arrays costs more than the loops.
+VECTORIZE_MIN_COMPLETIONS = 64
+
+
+def _load_numpy():
+    """Import NumPy on first use.
+
+    Returns:
+        bool: True if NumPy is available
+    """
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+        except ImportError:  # the plain loops are used instead
+            numpy = None
+        np = numpy
+        _numpy_checked = True
+    return np is not None
+
+
+@profiling.timed("analytics.get_longest_streak")
+def get_longest_streak(completions, periodicity):
+    """Calculate the longest streak for a habit.
+
+    Args:
+        completions: List of datetime objects, or array('q') of epoch
+            microseconds (see timestamps.py)
+        periodicity: 'daily', 'weekly', or 'monthly'
+    """
+    if len(completions) >= VECTORIZE_MIN_COMPLETIONS and _load_numpy():
+        return _longest_streak_vectorized(completions, periodicity)
+    return _longest_streak_loop(completions, periodicity)
+
+
+def _longest_streak_loop(completions, periodicity):
+    """Pure-Python implementation of get_longest_streak."""
+    if not completions:
+        return 0
+    if isinstance(completions, array):
+        completions = unpack_timestamps(completions)
+
+    completions_sorted = sorted(completions)
+    streaks = []
+    current_streak = 1
+
+    for i in range(1, len(completions_sorted)):
+        if _continues_streak(completions_sorted[i - 1], completions_sorted[i], periodicity):
+            current_streak += 1
+        else:
+            streaks.append(current_streak)
+            current_streak = 1
+
+    streaks.append(current_streak)
+    return max(streaks) if streaks else 0
+
+
+def _continues_streak(prev, curr, periodicity):
+    """Return True if completion curr extends a streak ending at prev (prev <= curr)."""
+    if periodicity == 'daily':
+        expected = prev + timedelta(days=1)
+        return curr.date() == expected.date()
+    elif periodicity == 'weekly':
+        expected = prev + timedelta(weeks=1)
+        return curr.date() == expected.date()
+    elif periodicity == 'monthly':
+
+        return (
+                curr.day == prev.day and
+                (curr.year == prev.year and curr.month == prev.month + 1) or
+                (curr.year == prev.year + 1 and curr.month == 1 and prev.month == 12)
+        )
+    raise ValueError("Periodicity must be 'daily', 'weekly', or 'monthly'")
+
+
+@profiling.timed("analytics.get_current_streak")
+def get_current_streak(completions, periodicity):
+    """Calculate the current active streak for a habit."""
+    if len(completions) >= VECTORIZE_MIN_COMPLETIONS and _load_numpy():
+        return _current_streak_vectorized(completions, periodicity)
+    return _current_streak_loop(completions, periodicity)
+
+
+def _current_streak_loop(completions, periodicity):
+    """Pure-Python implementation of get_current_streak."""
+    if not completions:
+        return 0
+    if isinstance(completions, array):
+        completions = unpack_timestamps(completions)
+
+    completions_sorted = sorted(completions, reverse=True)
+    current_streak = 1
+    today = datetime.now().date()
+
+    last_completion = completions_sorted[0].date()
+
+    if periodicity == 'daily':
+        days_since_last = (today - last_completion).days
+        if days_since_last > 1:
+            return 0
+    elif periodicity == 'weekly':
+        days_since_last = (today - last_completion).days
+        if days_since_last > 7:
+            return 0
+    elif periodicity == 'monthly':
+        days_since_last = (today - last_completion).days
+        if days_since_last > 31:
+            return 0
+    else:
+        raise ValueError("Periodicity must be 'daily', 'weekly', or 'monthly'")
+
+    for i in range(1, len(completions_sorted)):
+        prev = completions_sorted[i - 1]
+        curr = completions_sorted[i]
+
+        if periodicity == 'daily':
+            expected = prev - timedelta(days=1)
+            is_streak = curr.date() == expected.date()
+        elif periodicity == 'weekly':
+            expected = prev - timedelta(weeks=1)
+            is_streak = curr.date() == expected.date()
+        elif periodicity == 'monthly':
+
+            is_streak = (
+                    curr.day == prev.day and
+                    ((curr.year == prev.year and curr.month == prev.month - 1) or
+                     (curr.year == prev.year - 1 and curr.month == 12 and prev.month == 1))
+            )
+        else:
+            raise ValueError("Periodicity must be 'daily', 'weekly', or 'monthly'")
+
+        if is_streak:
+            current_streak += 1
+        else:
+            break
+
+    return current_streak
+
+
+@profiling.timed("analytics.build_streak_state")
+def build_streak_state(completions, periodicity):
+    """Build the persisted streak state of a habit from its full history.
+
+    Args:
+        completions: List of datetime objects, or array('q') of epoch microseconds
+        periodicity: 'daily', 'weekly', or 'monthly'
+
+    Returns:
+        Dictionary with "current" (length of the streak ending at the last
+        completion), "longest" and "last_completed_at" (ISO string or None)
+    """
+    if not completions:
+        return {"current": 0, "longest": 0, "last_completed_at": None}
+    if isinstance(completions, array):
+        completions = unpack_timestamps(completions)
+
+    completions_sorted = sorted(completions)
+    current = longest = 1
+    for i in range(1, len(completions_sorted)):
+        if _continues_streak(completions_sorted[i - 1], completions_sorted[i], periodicity):
+            current += 1
+        else:
+            current = 1
+        longest = max(longest, current)
+
+    return {
+        "current": current,
+        "longest": longest,
+        "last_completed_at": completions_sorted[-1].isoformat(),
+    }
+
+
+def advance_streak_state(state, completed_at, periodicity):
+    """Return the streak state after one more completion, in O(1).
+
+    Args:
+        state: Dictionary from build_streak_state (or a previous call)
+        completed_at: datetime of the new completion, not older than
+            state["last_completed_at"]
+        periodicity: 'daily', 'weekly', or 'monthly'
+
+    Raises:
+        ValueError: If completed_at is older than the last completion; the
+            state has to be rebuilt from history in that case
+    """
+    last = state.get("last_completed_at")
+    if last is None:
+        current = 1
+    else:
+        last = datetime.fromisoformat(last)
+        if completed_at < last:
+            raise ValueError("Completion is older than the last recorded completion")
+        current = state["current"] + 1 if _continues_streak(last, completed_at, periodicity) else 1
+
+    return {
+        "current": current,
+        "longest": max(state.get("longest", 0), current),
+        "last_completed_at": completed_at.isoformat(),
+    }
+
+
+def iter_streak_ids(completions, periodicity):
+    """Number the streaks of a habit, one completion at a time.
+
+    Args:
+        completions: Iterable of datetime objects, oldest first
+        periodicity: 'daily', 'weekly', or 'monthly'
+
+    Yields:
+        int: For each completion, the 1-based number of the streak it
+        belongs to; the number goes up whenever a completion does not
+        continue the previous one (as in build_streak_state)
+    """
+    streak_id = 0
+    previous = None
+    for completed_at in completions:
+        if previous is None or not _continues_streak(previous, completed_at, periodicity):
+            streak_id += 1
+        yield streak_id
+        previous = completed_at
+
+
+def current_streak_from_state(state, periodicity):
+    """Current active streak from a persisted streak state.
+
+    Like get_current_streak, the streak counts as broken once the last
+    completion is more than one period old.
+    """
+    if not state or state.get("last_completed_at") is None:
+        return 0
+
+    max_gap = {'daily': 1, 'weekly': 7, 'monthly': 31}
+    if periodicity not in max_gap:
+        raise ValueError("Periodicity must be 'daily', 'weekly', or 'monthly'")
+
+    last_completion = datetime.fromisoformat(state["last_completed_at"]).date()
+    if (datetime.now().date() - last_completion).days > max_gap[periodicity]:
+        return 0
+    return state["current"]
+
+
+# Microseconds per day, for turning epoch microseconds into day numbers.
+_DAY_US = 86_400_000_000
+
+
+def _sorted_epoch_us(completions):
+    """Return completions as a sorted int64 array of epoch microseconds.
+
+    array('q') input (see timestamps.py) is used as is. Datetimes are
+    truncated to midnight, which is all the streak rules look at, because
+    toordinal() is much cheaper than exact timedelta arithmetic.
+    """
+    if isinstance(completions, array):
+        values = np.frombuffer(completions, dtype=np.int64)
+    else:
+        days = np.fromiter((c.toordinal() for c in completions), dtype=np.int64,
+                           count=len(completions))
+        values = (days - EPOCH.toordinal()) * _DAY_US
+    return np.sort(values)
+
+
+def _streak_steps(times, periodicity, current=False):
+    """Return a bool array telling whether each completion continues the
+    streak of the one before it (times: sorted epoch microseconds).
+
+    Times are turned into int64 day numbers, or month indexes and days of
+    month, and compared with np.diff instead of building a timedelta for
+    every pair. Gives the same answers as the loops above; with
+    current=True monthly steps follow _current_streak_loop, which always
+    requires the same day of month.
+    """
+    if periodicity in ('daily', 'weekly'):
+        days = times // _DAY_US
+        return np.diff(days) == (1 if periodicity == 'daily' else 7)
+    if periodicity == 'monthly':
+        instants = times.astype('datetime64[us]')
+        month_starts = instants.astype('datetime64[M]')
+        months = month_starts.astype(np.int64)
+        days = (instants.astype('datetime64[D]') - month_starts).astype(np.int64)
+        same_day = days[1:] == days[:-1]
+        if current:
+            return (np.diff(months) == 1) & same_day
+        # Matches _longest_streak_loop, where a December -> January step
+        # counts regardless of the day of month.
+        from_december = months[:-1] % 12 == 11
+        return (np.diff(months) == 1) & (same_day | from_december)
+    raise ValueError("Periodicity must be 'daily', 'weekly', or 'monthly'")
+
+
+def _longest_streak_vectorized(completions, periodicity):
+    """NumPy implementation of get_longest_streak using run lengths."""
+    if not len(completions):
+        return 0
+    _load_numpy()
+
+    steps = _streak_steps(_sorted_epoch_us(completions), periodicity)
+    edges = np.diff(np.concatenate(([0], steps.view(np.int8), [0])))
+    run_lengths = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    return int(run_lengths.max(initial=0)) + 1
+
+
+def _current_streak_vectorized(completions, periodicity):
+    """NumPy implementation of get_current_streak: the run ending at the
+    latest completion."""
+    if not len(completions):
+        return 0
+    _load_numpy()
+
+    max_gap = {'daily': 1, 'weekly': 7, 'monthly': 31}
+    if periodicity not in max_gap:
+        raise ValueError("Periodicity must be 'daily', 'weekly', or 'monthly'")
+
+    times = _sorted_epoch_us(completions)
+    latest = from_epoch_us(int(times[-1]))
+    if (datetime.now().date() - latest.date()).days > max_gap[periodicity]:
+        return 0
+
+    steps = _streak_steps(times, periodicity, current=True)
+    breaks = np.flatnonzero(~steps)
+    if not breaks.size:
+        return len(times)
+    return int(len(steps) - breaks[-1])
+
+
+def period_key(moment, granularity):
+    """Return the calendar period a datetime falls in.
+
+    Args:
+        moment: datetime
+        granularity: 'daily', 'weekly' (ISO weeks) or 'monthly'
+
+    Returns:
+        str: e.g. '2025-07-01', '2025-W27' or '2025-07'
+    """
+    if granularity == 'daily':
+        return moment.strftime('%Y-%m-%d')
+    if granularity == 'weekly':
+        year, week, _ = moment.isocalendar()
+        return f"{year}-W{week:02d}"
+    if granularity == 'monthly':
+        return moment.strftime('%Y-%m')
+    raise ValueError("Granularity must be 'daily', 'weekly', or 'monthly'")
+
+
+def _period_keys(since, until, granularity):
+    """Yield, in order, the keys of every period overlapping [since, until)."""
+    since = from_epoch_us(to_epoch_us(since))
+    last = from_epoch_us(to_epoch_us(until) - 1)
+    day = since.replace(hour=0, minute=0, second=0, microsecond=0)
+    previous = None
+    while day <= last:
+        key = period_key(day, granularity)
+        if key != previous:
+            yield key
+            previous = key
+        day += timedelta(days=1)
+
+
+def period_counts(completions, granularity, since=None, until=None):
+    """Count completions per day, ISO week or month.
+
+    Only the completions inside [since, until) are visited; they are
+    located by binary search in the sorted timestamps.
+
+    Args:
+        completions: array('q') of epoch microseconds, oldest first
+        granularity: 'daily', 'weekly' or 'monthly'
+        since (datetime or str, optional): Start of the window
+        until (datetime or str, optional): End of the window (exclusive)
+
+    Returns:
+        dict: {period key: count} in chronological order. When both bounds
+        are given, periods without completions are included with 0.
+    """
+    counts = {}
+    if since is not None and until is not None:
+        counts = dict.fromkeys(_period_keys(since, until, granularity), 0)
+    for value in slice_range(completions, since, until):
+        key = period_key(from_epoch_us(value), granularity)
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def completion_rate(completions, periodicity, since, until):
+    """Return the share of periods in [since, until) with a completion.
+
+    Args:
+        completions: array('q') of epoch microseconds, oldest first
+        periodicity: 'daily', 'weekly' or 'monthly'
+        since (datetime or str): Start of the window
+        until (datetime or str): End of the window (exclusive)
+
+    Returns:
+        float: Between 0.0 and 1.0 (0.0 for an empty window)
+    """
+    counts = period_counts(completions, periodicity, since, until)
+    if not counts:
+        return 0.0
+    return sum(1 for count in counts.values() if count) / len(counts)
+
+
+ROLLUP_GRANULARITIES = ('daily', 'weekly', 'monthly')
+
+
+@profiling.timed("analytics.build_rollup")
+def build_rollup(completions):
+    """Count completions per day, ISO week and month.
+
+    Completions are grouped by day first, so the period keys are only
+    computed once per distinct day.
+
+    Args:
+        completions: array('q') of epoch microseconds, or datetime objects
+
+    Returns:
+        dict: {granularity: {period key: count}} for 'daily', 'weekly' and 'monthly'
+    """
+    if isinstance(completions, array):
+        days = Counter(value // _DAY_US for value in completions)
+        day_counts = ((EPOCH + timedelta(days=day), count) for day, count in days.items())
+    else:
+        day_counts = Counter(
+            datetime.combine(c.date(), datetime.min.time()) for c in completions
+        ).items()
+
+    rollup = {granularity: {} for granularity in ROLLUP_GRANULARITIES}
+    for day, count in sorted(day_counts):
+        advance_rollup(rollup, day, count)
+    return rollup
+
+
+def advance_rollup(rollup, completed_at, count=1):
+    """Add count completions at completed_at (a datetime) to a rollup, in place."""
+    for granularity in ROLLUP_GRANULARITIES:
+        counts = rollup.setdefault(granularity, {})
+        key = period_key(completed_at, granularity)
+        counts[key] = counts.get(key, 0) + count
+    return rollup
+
+
+def period_bounds(granularity, since=None, until=None):
+    """Return the keys of the first and last periods overlapping [since, until).
+
+    Period keys sort chronologically, so they can be compared as strings
+    (or in SQL). A missing bound gives None.
+    """
+    first = period_key(from_epoch_us(to_epoch_us(since)), granularity) if since is not None else None
+    last = period_key(from_epoch_us(to_epoch_us(until) - 1), granularity) if until is not None else None
+    return first, last
+
+
+def rollup_range(counts, granularity, since=None, until=None, fill=False):
+    """Select the periods of one rollup granularity that overlap [since, until).
+
+    Periods are selected whole: a week that starts before since is
+    included with all its completions.
+
+    Args:
+        counts: {period key: count} of one granularity of a rollup
+        granularity: 'daily', 'weekly' or 'monthly'
+        since (datetime or str, optional): Start of the range
+        until (datetime or str, optional): End of the range (exclusive)
+        fill (bool): Include periods without completions (needs both bounds)
+
+    Returns:
+        dict: {period key: count} in chronological order
+    """
+    first, last = period_bounds(granularity, since, until)
+    selected = {}
+    if fill and since is not None and until is not None:
+        selected = dict.fromkeys(_period_keys(since, until, granularity), 0)
+    for key in sorted(counts):
+        if (first is None or key >= first) and (last is None or key <= last):
+            selected[key] = counts[key]
+    return selected
+
+
+class StreakCache:
+    """LRU cache of computed streaks.
+
+    Entries are keyed by habit id, storage generation and day, so they go
+    stale as soon as storage is written to (or the date changes, which can
+    break a current streak). Writers should also call invalidate() for the
+    habit they changed: it frees the stale entries, and is the only
+    invalidation for backends without a generation.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries if full."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, habit_id=None):
+        """Drop the entries of one habit, or all entries."""
+        if habit_id is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == habit_id]:
+            del self._entries[key]
+
+    def stats(self):
+        """Return hit/miss counters and the current size."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+
+@profiling.timed("analytics.compute_streaks")
+def compute_streaks(storage, cache=None):
+    """Compute longest and current streaks for every habit at once.
+
+    All completions are read from storage in one pass, instead of one
+    storage round trip per habit. With a StreakCache, habits whose
+    streaks are cached for the current storage generation are not
+    recomputed, and completions are only read if some habit missed.
+
+    Args:
+        storage: Storage backend (JSONStorage, SQLiteStorage, ...)
+        cache (StreakCache, optional): Cache of previous results
+
+    Returns:
+        Dictionary of {habit_id: {"name", "periodicity", "longest", "current"}}
+    """
+    generation = getattr(storage, "generation", None)
+    today = date.today()
+    completions_by_habit = None
+    streaks = {}
+    for habit in storage.get_habits():
+        key = (habit["id"], generation, today)
+        cached = cache.get(key) if cache is not None else None
+        if cached is None:
+            if completions_by_habit is None:
+                completions_by_habit = storage.get_all_completion_times()
+            completions = completions_by_habit.get(habit["id"], array('q'))
+            cached = {
+                "longest": get_longest_streak(completions, habit["periodicity"]),
+                "current": get_current_streak(completions, habit["periodicity"]),
+            }
+            if cache is not None:
+                cache.put(key, cached)
+        streaks[habit["id"]] = {
+            "name": habit["name"],
+            "periodicity": habit["periodicity"],
+            "longest": cached["longest"],
+            "current": cached["current"],
+        }
+    return streaks
+
+
+def _get_completions_map(habits, tracker):
+    """Fetch completions for habits, in one call when the tracker supports it."""
+    if hasattr(tracker, "get_all_completions"):
+        completions_by_habit = tracker.get_all_completions()
+        return {habit.habit_id: completions_by_habit.get(habit.habit_id, []) for habit in habits}
+    return {habit.habit_id: tracker.get_habit_completions(habit.habit_id) for habit in habits}
+
+
+def get_all_longest_streaks(habits, tracker):
+    """Get longest streaks for all habits.
+
+    Args:
+        habits: List of Habit objects
+        tracker: HabitTracker instance
+
+    Returns:
+        Dictionary of {habit_name: longest_streak}
+    """
+    completions_by_habit = _get_completions_map(habits, tracker)
+    return {
+        habit.name: get_longest_streak(completions_by_habit[habit.habit_id], habit.periodicity)
+        for habit in habits
+    }
+
+
+def get_global_longest_streak(habits, tracker):
+    """Get the maximum streak across all habits.
+
+    Args:
+        habits: List of Habit objects
+        tracker: HabitTracker instance
+
+    Returns:
+        Tuple of (habit_name, streak_length)
+    """
+    streaks = get_all_longest_streaks(habits, tracker)
+    return max(streaks.items(), key=lambda x: x[1], default=(None, 0))
@@ -0,0 +1,121 @@
+"""Load test for server.py: many concurrent check-ins, latency percentiles.
+
+By default a server is started in-process on a temporary habits.json;
+pass --port to test a server that is already running.
+
+    python benchmarks/load_test.py --clients 200 --requests 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def request(reader, writer, method, path, body=None):
+    """Send one keep-alive HTTP request and return (status, payload)."""
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(host, port, habit_id, count, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, "POST", f"/habits/{habit_id}/complete")
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status != 201:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_load_test(clients, requests, host="127.0.0.1", port=None, habits=10):
+    """Run clients concurrent connections doing requests check-ins each."""
+    server = None
+    workdir = None
+    if port is None:
+        from habit_tracker import HabitTracker
+        from server import HabitServer
+        from storage import CachedJSONStorage
+
+        workdir = tempfile.TemporaryDirectory()
+        tracker = HabitTracker(CachedJSONStorage(os.path.join(workdir.name, "habits.json")))
+        for number in range(habits):
+            tracker.create_habit(f"Habit {number + 1}", "daily")
+        tracker.storage.flush()
+        server = HabitServer(tracker)
+        port = (await server.start(host, 0)).sockets[0].getsockname()[1]
+
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        _, habit_list = await request(reader, writer, "GET", "/habits")
+        writer.close()
+        habit_ids = [habit["id"] for habit in habit_list]
+
+        latencies, errors = [], []
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            client(host, port, habit_ids[i % len(habit_ids)], requests, latencies, errors)
+            for i in range(clients)
+        ))
+        elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            await server.close()
+            workdir.cleanup()
+
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "max": round(max(latencies), 3),
+            "mean": round(statistics.mean(latencies), 3),
+        },
+        "storage_batches": server.batches_written if server is not None else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200, help="concurrent connections (default: 200)")
+    parser.add_argument("--requests", type=int, default=20, help="check-ins per client (default: 20)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="port of a running server (default: start one)")
+    args = parser.parse_args(argv)
+    results = asyncio.run(run_load_test(args.clients, args.requests, args.host, args.port))
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
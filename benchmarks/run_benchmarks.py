@@ -0,0 +1,139 @@
+"""Time the hot paths of the habit tracker on synthetic datasets.
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes 10,1000,100000 --output results.json
+
+Results are written as JSON so runs can be compared between commits.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import analytics
+from habit_tracker import HabitTracker
+from storage import JSONStorage
+from synthetic import write_dataset
+
+
+def time_call(func, repeat):
+    """Run func repeat times and return timing statistics in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "repeat": repeat,
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "mean_ms": round(statistics.mean(timings), 3),
+    }
+
+
+def bench_size(workdir, n_habits, completions_per_habit, repeat):
+    """Benchmark every hot path on one dataset size."""
+    path = os.path.join(workdir, f"habits_{n_habits}.json")
+    total_completions = write_dataset(path, n_habits, completions_per_habit)
+    storage = JSONStorage(path)
+    # Measure the steady state, where streak states are already stored.
+    storage.rebuild_streaks()
+    tracker = HabitTracker(storage)
+    habit_id = n_habits // 2 + 1
+    habits = tracker.get_all_habits()
+
+    results = {
+        "habits": n_habits,
+        "completions": total_completions,
+        "file_bytes": os.path.getsize(path),
+        "timings": {
+            "JSONStorage.get_completions": time_call(lambda: storage.get_completions(habit_id), repeat),
+            # A fresh storage per call: parse and index the file from scratch.
+            "JSONStorage.get_completions.cold": time_call(
+                lambda: JSONStorage(path).get_completions(habit_id), repeat
+            ),
+            "JSONStorage.get_habit_by_id": time_call(lambda: storage.get_habit_by_id(habit_id), repeat),
+            "JSONStorage.complete_habit": time_call(lambda: storage.complete_habit(habit_id), repeat),
+            "HabitTracker.get_global_longest_streak": time_call(tracker.get_global_longest_streak, repeat),
+            "analytics.get_all_longest_streaks": time_call(
+                lambda: analytics.get_all_longest_streaks(habits, tracker), repeat
+            ),
+        },
+    }
+
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        from visualization import plot_habit_progress
+    except ImportError:
+        results["timings"]["plot_habit_progress"] = None
+    else:
+        completions = storage.get_completion_times(habit_id)
+        results["timings"]["plot_habit_progress"] = time_call(
+            lambda: plot_habit_progress(f"Habit {habit_id}", completions), repeat
+        )
+    return results
+
+
+def run_benchmarks(sizes, max_completions=1_000_000, completions_per_habit=365, repeat=3):
+    """Run the suite for each habit count in sizes.
+
+    Completions per habit are capped so a dataset never holds more than
+    max_completions completions in total.
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # plot_habit_progress writes into ./graphs
+        os.chdir(workdir)
+        try:
+            runs = [
+                bench_size(workdir, n_habits,
+                           max(1, min(completions_per_habit, max_completions // n_habits)), repeat)
+                for n_habits in sizes
+            ]
+        finally:
+            os.chdir(cwd)
+    return {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": runs,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,1000,100000",
+                        help="comma separated habit counts (default: 10,1000,100000)")
+    parser.add_argument("--max-completions", type=int, default=1_000_000,
+                        help="cap on total completions per dataset (default: 1000000)")
+    parser.add_argument("--completions-per-habit", type=int, default=365,
+                        help="periods of history per habit before the cap (default: 365)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (default: 3)")
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        [int(size) for size in args.sizes.split(",")],
+        max_completions=args.max_completions,
+        completions_per_habit=args.completions_per_habit,
+        repeat=args.repeat,
+    )
+    text = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Synthetic habit/completion datasets for benchmarks.
+
+Datasets are plain habits.json documents, so they can be loaded by any
+storage backend (or migrated to SQLite) exactly like real user data.
+"""
+import json
+import random
+from datetime import datetime, timedelta
+
+PERIODICITIES = ["daily", "weekly", "monthly"]
+_STEPS = {"daily": timedelta(days=1), "weekly": timedelta(weeks=1), "monthly": timedelta(days=30)}
+
+
+def generate_habits(n_habits, start, rng):
+    """Yield n_habits habit dictionaries in the habits.json format."""
+    for habit_id in range(1, n_habits + 1):
+        yield {
+            "id": habit_id,
+            "name": f"Habit {habit_id}",
+            "periodicity": rng.choice(PERIODICITIES),
+            "created_at": start.isoformat(),
+            "description": "",
+            "target_streak": 0
+        }
+
+
+def generate_completions(habit, count, end, rng, miss_rate=0.1):
+    """Yield up to count completions for a habit, oldest first, ending at end.
+
+    Completions follow the habit's periodicity with randomly missed
+    periods, so the data has streaks of varying length.
+    """
+    step = _STEPS[habit["periodicity"]]
+    moment = end - step * count
+    for _ in range(count):
+        moment += step
+        if rng.random() >= miss_rate:
+            completed_at = moment + timedelta(seconds=rng.randrange(86400))
+            yield {"habit_id": habit["id"], "completed_at": completed_at.isoformat()}
+
+
+def generate_dataset(n_habits, completions_per_habit, seed=0, end=None):
+    """Build a habits.json document with n_habits habits.
+
+    Args:
+        n_habits (int): Number of habits
+        completions_per_habit (int): Periods of history per habit
+        seed (int): Random seed, so runs are comparable
+        end (datetime, optional): Last day of history (default: now)
+
+    Returns:
+        dict: Document with "habits", "completions" and "analytics_settings"
+    """
+    rng = random.Random(seed)
+    end = end or datetime.now()
+    start = end - timedelta(days=365 * 3)
+    habits = list(generate_habits(n_habits, start, rng))
+    completions = [
+        completion
+        for habit in habits
+        for completion in generate_completions(habit, completions_per_habit, end, rng)
+    ]
+    return {
+        "habits": habits,
+        "completions": completions,
+        "analytics_settings": {
+            "graph_directory": "graphs",
+            "default_periodicities": PERIODICITIES
+        }
+    }
+
+
+def write_dataset(path, n_habits, completions_per_habit, seed=0):
+    """Write a synthetic dataset to path and return the number of completions."""
+    data = generate_dataset(n_habits, completions_per_habit, seed)
+    with open(path, "w") as file:
+        json.dump(data, file, indent=4)
+    return len(data["completions"])
@@ -0,0 +1,372 @@
+"""Non-interactive command line interface for the habit tracker.
+
+Examples:
+    python cli.py add "Morning run" daily
+    python cli.py done 3
+    python cli.py streaks --json
+    python cli.py plot --all
+    python cli.py plot --all --backend svg
+    python cli.py report --output report.html
+    python cli.py import wearable_export.csv
+    python cli.py export history.parquet --derived
+    python cli.py due --within 6
+    python cli.py watch --warn-before 2
+
+With --batch, one command per line is read from stdin and all of them run
+against a single loaded tracker. With the json and sqlite backends changes
+are written once at the end (nothing is written if a command fails); the
+other backends write each command as it runs:
+
+    printf 'done 1\ndone 2\nstreaks --json\n' | python cli.py --batch
+
+--profile prints timings of storage, streak and rendering calls to
+stderr (see profiling.py); --cprofile runs the command under cProfile.
+"""
+import argparse
+import csv
+import json
+import os
+import shlex
+import sys
+from datetime import timedelta
+
+import profiling
+from habit_tracker import HabitTracker
+from storage import create_storage
+
+
+class CommandError(Exception):
+    """A command could not be carried out (e.g. unknown habit id)."""
+
+
+def read_completions(file, file_format):
+    """Yield (habit_id, completed_at) pairs from a CSV or JSON Lines stream.
+
+    CSV files need a header with "habit_id" and "completed_at" columns;
+    JSON Lines records need the same keys. Malformed records are yielded
+    as (None, None) so the import can count them as invalid.
+    """
+    if file_format == "csv":
+        for row in csv.DictReader(file):
+            yield row.get("habit_id"), row.get("completed_at")
+        return
+
+    for line in file:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+            yield record.get("habit_id"), record.get("completed_at")
+        except (ValueError, AttributeError):
+            yield None, None
+
+
+def cmd_add(tracker, args):
+    """Create a new habit."""
+    try:
+        habit_id = tracker.create_habit(args.name, args.periodicity)
+    except ValueError as error:
+        raise CommandError(str(error))
+    print(f"Habit '{args.name}' created with ID {habit_id}")
+    return 0
+
+
+def cmd_done(tracker, args):
+    """Mark one or more habits as completed."""
+    for habit_id in args.habit_ids:
+        if not tracker.complete_habit(habit_id):
+            raise CommandError(f"No habit with ID {habit_id}")
+        print(f"Habit {habit_id} completed!")
+    return 0
+
+
+def cmd_streaks(tracker, args):
+    """Show current and longest streaks of every habit."""
+    rows = tracker.get_streak_table()
+    if args.json:
+        print(json.dumps(rows))
+    else:
+        for row in rows:
+            print(f"{row['id']}: {row['name']} ({row['periodicity']}) - "
+                  f"current {row['current']}, longest {row['longest']}")
+    return 0
+
+
+def cmd_plot(tracker, args):
+    """Generate progress graphs for one habit or for all of them."""
+    from visualization import plot_all_habits, plot_habit_progress
+
+    if args.all:
+        filenames = plot_all_habits(tracker, output_dir=args.output_dir, backend=args.backend)
+        print(f"Generated {len(filenames)} graphs")
+        return 0
+
+    if args.habit_id is None:
+        raise CommandError("Give a habit ID or --all")
+    habit = tracker.storage.get_habit_by_id(args.habit_id)
+    if habit is None:
+        raise CommandError(f"No habit with ID {args.habit_id}")
+    filename = plot_habit_progress(habit["name"], tracker.get_completion_times(args.habit_id),
+                                   backend=args.backend, output_dir=args.output_dir)
+    if filename:
+        print(f"Graph generated and saved as '{filename}'")
+    return 0
+
+
+def cmd_report(tracker, args):
+    """Write an HTML report with SVG charts of every habit."""
+    from visualization import write_html_report
+
+    filename = write_html_report(tracker, args.output, weeks=args.weeks)
+    print(f"Report written to '{filename}'")
+    return 0
+
+
+def cmd_due(tracker, args):
+    """List habits that are due, and streaks that break within --within hours."""
+    from scheduler import Scheduler
+
+    scheduler = Scheduler(tracker)
+    due = scheduler.due_now()
+    at_risk = scheduler.at_risk(within=timedelta(hours=args.within))
+    if args.json:
+        print(json.dumps({
+            "due": [{"id": d.habit_id, "name": d.name, "due_at": d.at.isoformat()} for d in due],
+            "at_risk": [{"id": d.habit_id, "name": d.name, "breaks_at": d.at.isoformat()} for d in at_risk],
+        }))
+        return 0
+    for deadline in due:
+        print(f"Due: {deadline.habit_id}: {deadline.name} (since {deadline.at:%Y-%m-%d %H:%M})")
+    for deadline in at_risk:
+        print(f"At risk: {deadline.habit_id}: {deadline.name} (streak breaks {deadline.at:%Y-%m-%d %H:%M})")
+    return 0
+
+
+def cmd_watch(tracker, args):
+    """Print reminders as habits become due or their streaks near breaking, until interrupted."""
+    from scheduler import Scheduler
+
+    scheduler = Scheduler(tracker, warn_before=timedelta(hours=args.warn_before))
+
+    def notify(kind, deadline):
+        if kind == "due":
+            print(f"Due: {deadline.habit_id}: {deadline.name}", flush=True)
+        else:
+            print(f"At risk: {deadline.habit_id}: {deadline.name} "
+                  f"(streak breaks {deadline.at:%Y-%m-%d %H:%M})", flush=True)
+
+    try:
+        scheduler.watch(notify)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_import(tracker, args):
+    """Bulk import completions from a CSV or JSON Lines file."""
+    file_format = args.format
+    if file_format is None:
+        file_format = "csv" if args.file.endswith(".csv") else "jsonl"
+
+    if args.file == "-":
+        summary = tracker.import_completions(read_completions(sys.stdin, file_format), args.chunk_size)
+    else:
+        with open(args.file, "r", newline="") as file:
+            summary = tracker.import_completions(read_completions(file, file_format), args.chunk_size)
+
+    print(f"Imported {summary['added']} completions "
+          f"({summary['duplicates']} duplicates, {summary['unknown_habit']} unknown habits, "
+          f"{summary['invalid']} invalid rows skipped)")
+    return 0
+
+
+def cmd_export(tracker, args):
+    """Stream habits or completions to a CSV, JSON Lines or Parquet file."""
+    from export import export
+
+    target = sys.stdout if args.file == "-" else args.file
+    file_format = args.format or ("csv" if args.file == "-" else None)
+    try:
+        rows = export(tracker.storage, target, file_format=file_format, table=args.table,
+                      derived=args.derived, batch_size=args.batch_size)
+    except ValueError as error:
+        raise CommandError(str(error))
+    if args.file != "-":
+        print(f"Exported {rows} {args.table} to '{args.file}'")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="habit", description="Habit tracker command line interface")
+    parser.add_argument("--batch", action="store_true",
+                        help="read one command per line from stdin and write changes once at the end")
+    parser.add_argument("--profile", action="store_true",
+                        help="print call counts and timings to stderr (also HABIT_TRACKER_PROFILE=1)")
+    parser.add_argument("--profile-format", choices=sorted(profiling.REPORT_FORMATS), default="table",
+                        help="format of the --profile report (default: table)")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="run the command under cProfile and print the hottest functions to stderr")
+    subparsers = parser.add_subparsers(dest="command")
+
+    add_parser = subparsers.add_parser("add", help="create a new habit")
+    add_parser.add_argument("name")
+    add_parser.add_argument("periodicity", choices=["daily", "weekly", "monthly"])
+    add_parser.set_defaults(func=cmd_add)
+
+    done_parser = subparsers.add_parser("done", help="mark habits as completed")
+    done_parser.add_argument("habit_ids", type=int, nargs="+", metavar="id")
+    done_parser.set_defaults(func=cmd_done)
+
+    streaks_parser = subparsers.add_parser("streaks", help="show current and longest streaks")
+    streaks_parser.add_argument("--json", action="store_true", help="print JSON")
+    streaks_parser.set_defaults(func=cmd_streaks)
+
+    plot_parser = subparsers.add_parser("plot", help="generate progress graphs")
+    plot_parser.add_argument("habit_id", type=int, nargs="?")
+    plot_parser.add_argument("--all", action="store_true", help="graph every habit")
+    plot_parser.add_argument("--output-dir",
+                             help="output directory (default: graph_directory setting with --all, else graphs)")
+    plot_parser.add_argument("--backend", choices=["matplotlib", "svg"], default="matplotlib",
+                             help="png via matplotlib, or svg rendered without it (default: matplotlib)")
+    plot_parser.set_defaults(func=cmd_plot)
+
+    report_parser = subparsers.add_parser("report", help="write an HTML report with charts of every habit")
+    report_parser.add_argument("--output", default="report.html", help="output file (default: report.html)")
+    report_parser.add_argument("--weeks", type=int, default=26,
+                               help="weeks covered by the sparklines (default: 26)")
+    report_parser.set_defaults(func=cmd_report)
+
+    import_parser = subparsers.add_parser("import", help="bulk import completions from CSV or JSON Lines")
+    import_parser.add_argument("file", help="file to import, or - for stdin")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"],
+                               help="input format (default: from the file extension)")
+    import_parser.add_argument("--chunk-size", type=int, default=50000,
+                               help="completions per write (default: 50000)")
+    import_parser.set_defaults(func=cmd_import)
+
+    export_parser = subparsers.add_parser("export", help="export habits or completions for analysis tools")
+    export_parser.add_argument("file", help="output file, or - for CSV on stdout")
+    export_parser.add_argument("--format", choices=["csv", "jsonl", "parquet", "columnar"],
+                               help="output format; columnar is parquet if pyarrow is installed and "
+                                    "file is not -, else jsonl (default: from the file extension)")
+    export_parser.add_argument("--table", choices=["completions", "habits"], default="completions",
+                               help="what to export (default: completions)")
+    export_parser.add_argument("--derived", action="store_true",
+                               help="add each completion's period and streak number")
+    export_parser.add_argument("--batch-size", type=int, default=10000,
+                               help="rows per batch (default: 10000)")
+    export_parser.set_defaults(func=cmd_export)
+
+    due_parser = subparsers.add_parser("due", help="list due habits and streaks about to break")
+    due_parser.add_argument("--within", type=float, default=24,
+                            help="report streaks breaking within this many hours (default: 24)")
+    due_parser.add_argument("--json", action="store_true", help="print JSON")
+    due_parser.set_defaults(func=cmd_due)
+
+    watch_parser = subparsers.add_parser("watch", help="print reminders as deadlines pass (Ctrl-C to stop)")
+    watch_parser.add_argument("--warn-before", type=float, default=2,
+                              help="hours before a streak breaks to warn (default: 2)")
+    watch_parser.set_defaults(func=cmd_watch)
+    return parser
+
+
+def open_tracker(buffered=False):
+    """Open the configured storage. With buffered=True the default JSON
+    backend keeps the file in memory and only writes it on flush()."""
+    backend = os.environ.get("HABIT_TRACKER_BACKEND", "json")
+    if buffered and backend == "json":
+        backend = "cached"
+    return HabitTracker(create_storage(backend))
+
+
+def run_command(tracker, args):
+    """Run one parsed command, turning failures into an exit status."""
+    try:
+        return args.func(tracker, args)
+    except CommandError as error:
+        print(f"habit {args.command}: {error}", file=sys.stderr)
+        return 1
+
+
+class _BatchFailed(Exception):
+    """Raised inside a batch transaction to roll it back."""
+
+    def __init__(self, status):
+        super().__init__(status)
+        self.status = status
+
+
+def run_batch(parser, tracker, lines):
+    """Run commands read from lines against one tracker.
+
+    Stops at the first failing command. With a storage that buffers
+    writes (CachedJSONStorage) or runs the batch in one transaction
+    (SQLiteStorage), nothing is written in that case; other backends
+    write each command as it runs, so earlier commands stay written.
+    """
+    storage = tracker.storage
+    transaction = getattr(storage, "transaction", None)
+    if transaction is None:
+        kept = "no changes written" if hasattr(storage, "flush") else "earlier commands were already written"
+        status = _run_batch_lines(parser, tracker, lines, kept)
+    else:
+        try:
+            with transaction():
+                status = _run_batch_lines(parser, tracker, lines, "no changes written")
+                if status:
+                    raise _BatchFailed(status)
+        except _BatchFailed as failure:
+            return failure.status
+    if status:
+        return status
+
+    flush = getattr(storage, "flush", None)
+    if flush is not None:
+        flush()
+    return 0
+
+
+def _run_batch_lines(parser, tracker, lines, kept):
+    """Run batch lines until one fails; return its exit status, or 0."""
+    for number, line in enumerate(lines, 1):
+        words = shlex.split(line, comments=True)
+        if not words:
+            continue
+        try:
+            args = parser.parse_args(words)
+        except SystemExit:
+            print(f"line {number}: invalid command: {line.strip()}", file=sys.stderr)
+            return 2
+        if args.batch or args.command in (None, "watch"):
+            print(f"line {number}: expected a command", file=sys.stderr)
+            return 2
+        status = run_command(tracker, args)
+        if status:
+            print(f"line {number}: stopping, {kept}", file=sys.stderr)
+            return status
+    return 0
+
+
+def main(argv=None, tracker=None, stdin=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.batch and args.command is None:
+        parser.error("a command is required (or --batch)")
+
+    if args.profile:
+        profiling.enable()
+    # An export reads every habit's completions, so keep the file in memory.
+    tracker = tracker if tracker is not None else open_tracker(buffered=args.batch or args.command == "export")
+    if args.batch:
+        run, run_args = run_batch, (parser, tracker, stdin if stdin is not None else sys.stdin)
+    else:
+        run, run_args = run_command, (tracker, args)
+    status = profiling.profile_call(run, *run_args) if args.cprofile else run(*run_args)
+    if profiling.is_enabled():
+        profiling.report(args.profile_format)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
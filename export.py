@@ -0,0 +1,268 @@
+"""Streaming export of habits and completion history.
+
+Completions are read one habit at a time and written in fixed-size
+batches. With SQLiteStorage, or ShardedStorage and its bounded shard
+cache, memory use is one habit's packed timestamps (8 bytes per
+completion) plus one batch, however long the history is. The JSON
+backends parse the whole file first, so there it grows with the history:
+
+    python cli.py export history.csv
+    python cli.py export history.parquet --derived
+    python cli.py export habits.csv --table habits
+
+Formats:
+    csv      one row per completion, with a header
+    parquet  Apache Parquet, one row group per batch (needs pyarrow and a
+             file name; it can't be written to stdout)
+    jsonl    one JSON object per batch, mapping each column to a list of
+             values; the fallback columnar layout when pyarrow is missing
+
+--derived adds the calendar period of each completion (in the habit's
+periodicity, see analytics.period_key) and the number of the streak it
+belongs to (analytics.iter_streak_ids).
+"""
+import csv
+import itertools
+import json
+import os
+from array import array
+
+import profiling
+from analytics import iter_streak_ids, period_key
+from timestamps import from_epoch_us, to_epoch_us
+
+# Rows per batch (and per Parquet row group).
+BATCH_SIZE = 10000
+
+COMPLETION_COLUMNS = ("habit_id", "habit_name", "periodicity", "completed_at")
+DERIVED_COLUMNS = ("period", "streak_id")
+HABIT_COLUMNS = ("id", "name", "periodicity", "created_at", "description", "target_streak")
+TABLES = ("completions", "habits")
+FORMATS = ("csv", "jsonl", "parquet")
+
+# Columns holding epoch microseconds; written as ISO strings or as
+# Parquet timestamps.
+_TIMESTAMP_COLUMNS = ("completed_at", "created_at")
+
+# pyarrow is optional and only imported by _load_pyarrow() for Parquet.
+pa = None
+pq = None
+_pyarrow_checked = False
+
+
+def _load_pyarrow():
+    """Import pyarrow on first use.
+
+    Returns:
+        bool: True if pyarrow is available
+    """
+    global pa, pq, _pyarrow_checked
+    if not _pyarrow_checked:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:  # columnar exports fall back to jsonl
+            pyarrow = None
+        pa = pyarrow
+        pq = pyarrow.parquet if pyarrow is not None else None
+        _pyarrow_checked = True
+    return pa is not None
+
+
+def columnar_format():
+    """Return the columnar format available here: 'parquet' or 'jsonl'."""
+    return "parquet" if _load_pyarrow() else "jsonl"
+
+
+def format_from_path(path):
+    """Guess the export format from a file extension.
+
+    Returns:
+        str: One of FORMATS, or None if the extension is not recognised
+    """
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension == "pq":
+        return "parquet"
+    return extension if extension in FORMATS else None
+
+
+def columns(table="completions", derived=False):
+    """Return the column names of an export table."""
+    if table == "habits":
+        return HABIT_COLUMNS
+    if table == "completions":
+        return COMPLETION_COLUMNS + DERIVED_COLUMNS if derived else COMPLETION_COLUMNS
+    raise ValueError(f"Unknown table {table!r}; expected one of {', '.join(TABLES)}")
+
+
+def _empty_batch(names):
+    return {name: array('q') if name in _TIMESTAMP_COLUMNS else [] for name in names}
+
+
+def _iter_completion_records(storage, derived):
+    """Yield one tuple per completion, habit by habit, oldest first."""
+    for habit in storage.get_habits():
+        times = storage.get_completion_times(habit["id"])
+        if not times:
+            continue
+        habit_id, name, periodicity = habit["id"], habit["name"], habit["periodicity"]
+        if not derived:
+            for completed_at in times:
+                yield habit_id, name, periodicity, completed_at
+            continue
+        moments, streak_moments = itertools.tee(map(from_epoch_us, times))
+        for completed_at, moment, streak_id in zip(times, moments, iter_streak_ids(streak_moments, periodicity)):
+            yield habit_id, name, periodicity, completed_at, period_key(moment, periodicity), streak_id
+
+
+def _iter_habit_records(storage):
+    for habit in storage.get_habits():
+        yield (habit["id"], habit["name"], habit["periodicity"], to_epoch_us(habit["created_at"]),
+               habit.get("description"), habit.get("target_streak"))
+
+
+def iter_batches(storage, table="completions", derived=False, batch_size=BATCH_SIZE):
+    """Yield an export table in batches of at most batch_size rows.
+
+    Args:
+        storage: Storage backend (JSONStorage, SQLiteStorage, ...)
+        table (str): 'completions' or 'habits'
+        derived (bool): Add the period and streak_id columns to completions
+        batch_size (int): Rows per batch
+
+    Yields:
+        dict: {column: values}, in column order; timestamp columns are
+        array('q') of epoch microseconds, the others lists
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    names = columns(table, derived)
+    records = _iter_habit_records(storage) if table == "habits" else _iter_completion_records(storage, derived)
+    batch = _empty_batch(names)
+    values = list(batch.values())
+    size = 0
+    for record in records:
+        for column, value in zip(values, record):
+            column.append(value)
+        size += 1
+        if size == batch_size:
+            yield batch
+            batch = _empty_batch(names)
+            values = list(batch.values())
+            size = 0
+    if size:
+        yield batch
+
+
+def _iso_column(name, column):
+    if name in _TIMESTAMP_COLUMNS:
+        return [from_epoch_us(value).isoformat() for value in column]
+    return column
+
+
+def write_csv(batches, file, names):
+    """Write batches as CSV rows with a header.
+
+    Returns:
+        int: Number of rows written
+    """
+    writer = csv.writer(file)
+    writer.writerow(names)
+    rows = 0
+    for batch in batches:
+        writer.writerows(zip(*(_iso_column(name, batch[name]) for name in names)))
+        rows += len(batch[names[0]])
+    return rows
+
+
+def write_jsonl(batches, file, names):
+    """Write each batch as one JSON object of column lists.
+
+    Returns:
+        int: Number of rows written
+    """
+    rows = 0
+    for batch in batches:
+        file.write(json.dumps({name: _iso_column(name, batch[name]) for name in names}))
+        file.write("\n")
+        rows += len(batch[names[0]])
+    return rows
+
+
+def read_jsonl_batches(file):
+    """Yield the batches of a jsonl export as {column: list} dicts."""
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _arrow_schema(names):
+    types = {
+        "habit_id": pa.int64(), "id": pa.int64(), "streak_id": pa.int64(), "target_streak": pa.int64(),
+        "completed_at": pa.timestamp("us"), "created_at": pa.timestamp("us"),
+    }
+    return pa.schema([(name, types.get(name, pa.string())) for name in names])
+
+
+def write_parquet(batches, path, names):
+    """Write batches to a Parquet file, one row group per batch.
+
+    Raises:
+        ValueError: If pyarrow is not installed
+
+    Returns:
+        int: Number of rows written
+    """
+    if not _load_pyarrow():
+        raise ValueError("Parquet export needs pyarrow; use the jsonl format instead")
+    schema = _arrow_schema(names)
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in batches:
+            arrays = [pa.array(list(batch[name]), type=schema.field(name).type) for name in names]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            rows += len(batch[names[0]])
+    return rows
+
+
+@profiling.timed("export.export")
+def export(storage, path, file_format=None, table="completions", derived=False, batch_size=BATCH_SIZE):
+    """Stream an export table to a file.
+
+    Args:
+        storage: Storage backend (JSONStorage, SQLiteStorage, ...)
+        path (str): Output filename; for csv and jsonl also an open text file
+        file_format (str, optional): 'csv', 'jsonl', 'parquet' or 'columnar'
+            (parquet if pyarrow is installed and path is a filename, else
+            jsonl); by default taken from the file extension
+        table (str): 'completions' or 'habits'
+        derived (bool): Add the period and streak_id columns to completions
+        batch_size (int): Rows per batch
+
+    Raises:
+        ValueError: If the format is unknown or unavailable, or parquet is
+            asked for with an open file
+
+    Returns:
+        int: Number of rows written
+    """
+    if file_format is None:
+        file_format = format_from_path(path) if isinstance(path, str) else None
+        if file_format is None:
+            raise ValueError(f"Can't tell the export format of {path!r}; give one of {', '.join(FORMATS)}")
+    elif file_format == "columnar":
+        file_format = columnar_format() if isinstance(path, str) else "jsonl"
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format {file_format!r}; expected one of {', '.join(FORMATS)}")
+    if file_format == "parquet" and not isinstance(path, str):
+        raise ValueError("Parquet export needs a file name; use csv or jsonl to write to a stream")
+
+    names = columns(table, derived)
+    batches = iter_batches(storage, table, derived, batch_size)
+    if file_format == "parquet":
+        return write_parquet(batches, path, names)
+    write = write_csv if file_format == "csv" else write_jsonl
+    if not isinstance(path, str):
+        return write(batches, path, names)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        return write(batches, file, names)
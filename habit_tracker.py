@@ -1,99 +1,283 @@
-from datetime import datetime
-from storage import JSONStorage
-
-class Habit:
-    def __init__(self, habit_id, name, periodicity, created_at):
-        self.habit_id = habit_id
-        self.name = name
-        self.periodicity = periodicity
-        self.created_at = datetime.fromisoformat(created_at)
-
-    def __repr__(self):
-        return f"Habit(id={self.habit_id}, name={self.name}, periodicity={self.periodicity})"
-
-class HabitTracker:
-    def __init__(self):
-        self.storage = JSONStorage()
-
-    def create_habit(self, name, periodicity):
-        """Create a new habit."""
-        self.storage.add_habit(name, periodicity)
-
-    def complete_habit(self, habit_id):
-        """Mark a habit as completed."""
-        self.storage.complete_habit(habit_id)
-
-    def get_all_habits(self):
-        """Retrieve all habits."""
-        return [
-            Habit(habit["id"], habit["name"], habit["periodicity"], habit["created_at"])
-            for habit in self.storage.get_habits()
-        ]
-
-    def get_habit_completions(self, habit_id):
-        """Retrieve all completions for a habit."""
-        return [
-            datetime.fromisoformat(completion)
-            for completion in self.storage.get_completions(habit_id)
-        ]
-
-    def get_habits_by_periodicity(self, periodicity):
-        """Retrieve habits filtered by periodicity (e.g., 'daily', 'weekly')."""
-        return [
-            Habit(habit["id"], habit["name"], habit["periodicity"], habit["created_at"])
-            for habit in self.storage.get_habits()
-            if habit["periodicity"].lower() == periodicity.lower()
-        ]
-
-    def get_global_longest_streak(self):
-        """Return the habit with the longest streak across all habits."""
-        habits = self.get_all_habits()
-        longest_streak = 0
-        top_habit = None
-
-        for habit in habits:
-            completions = self.get_habit_completions(habit.habit_id)
-            streak = self._calculate_streak(completions, habit.periodicity)
-            if streak > longest_streak:
-                longest_streak = streak
-                top_habit = habit
-
-        if top_habit:
-            return top_habit.name, longest_streak
-        else:
-            return None, 0
-
-    def _calculate_streak(self, completions, periodicity):
-        """Calculate the current streak based on completions and periodicity."""
-        if not completions:
-            return 0
-
-        completions.sort(reverse=True)
-        streak = 1
-        today = datetime.now()
-
-        for i in range(1, len(completions)):
-            diff = (completions[i - 1] - completions[i]).days
-
-            if periodicity == "daily" and diff == 1:
-                streak += 1
-            elif periodicity == "weekly" and diff <= 7:
-                streak += 1
-            else:
-                break
-
-        # Check if most recent completion was today/yesterday/week
-        latest = completions[0]
-        if (periodicity == "daily" and (today - latest).days > 1) or \
-           (periodicity == "weekly" and (today - latest).days > 7):
-            streak = 0
-
-        return streak
-
-    def get_longest_streak_for_habit(self, habit_id):
-        """Return the longest streak for a given habit."""
-        habit = next((h for h in self.get_all_habits() if h.habit_id == habit_id), None)
-        if not habit:
-            return 0
-        completions = self.get_habit_completions(habit_id)
-        return self._calculate_streak(completions, habit.periodicity)
+from datetime import datetime, time, timedelta
+from itertools import islice
+from analytics import StreakCache, compute_streaks, current_streak_from_state, period_counts, rollup_range
+from storage import PooledStorage, create_storage, default_storage_pool
+from timestamps import unpack_timestamps
+
+class Habit:
+    __slots__ = ("habit_id", "name", "periodicity", "_created_at")
+
+    def __init__(self, habit_id, name, periodicity, created_at):
+        self.habit_id = habit_id
+        self.name = name
+        self.periodicity = periodicity
+        self._created_at = created_at
+
+    @property
+    def created_at(self):
+        """datetime: Creation time, parsed from the ISO string on first access."""
+        if isinstance(self._created_at, str):
+            self._created_at = datetime.fromisoformat(self._created_at)
+        return self._created_at
+
+    def __repr__(self):
+        return f"Habit(id={self.habit_id}, name={self.name}, periodicity={self.periodicity})"
+
+class HabitTracker:
+    def __init__(self, storage=None, cache_size=256, user_id=None, pool=None):
+        """Use the given storage, or the backend configured through
+        HABIT_TRACKER_BACKEND / HABIT_TRACKER_PATH (JSON by default).
+
+        With user_id, the tracker works on that user's partition, leased
+        from pool (a storage.StoragePool, by default the process-wide
+        one) for every storage call, so the pool may close it between
+        calls but not during one. Writes are flushed right away, since
+        pooled storages keep data in memory.
+
+        cache_size is the number of per-habit streak results kept by
+        compute_streaks().
+        """
+        self.user_id = user_id
+        if user_id is not None:
+            self._pool = pool if pool is not None else default_storage_pool()
+            self._storage = PooledStorage(self._pool, user_id)
+        else:
+            self._pool = None
+            self._storage = storage if storage is not None else create_storage()
+        self.streak_cache = StreakCache(cache_size)
+        # Identity map of Habit objects, valid for one storage generation.
+        self._habits = []
+        self._habits_by_id = {}
+        self._habits_generation = None
+
+    @property
+    def storage(self):
+        """The storage backend; for a user's tracker, a PooledStorage handle."""
+        return self._storage
+
+    def _written(self, result):
+        """Flush a user's pooled storage after a write and pass result through."""
+        if self._pool is not None:
+            flush = getattr(self.storage, "flush", None)
+            if flush is not None:
+                flush()
+        return result
+
+    def _load_habits(self):
+        """Return the cached Habit objects, refreshing them if storage changed.
+
+        Unchanged habits keep their Habit object across refreshes.
+        """
+        generation = getattr(self.storage, "generation", None)
+        if generation is None or generation != self._habits_generation:
+            habits = []
+            for raw in self.storage.get_habits():
+                habit = self._habits_by_id.get(raw["id"])
+                if habit is None or habit.name != raw["name"] or habit.periodicity != raw["periodicity"]:
+                    habit = Habit(raw["id"], raw["name"], raw["periodicity"], raw["created_at"])
+                habits.append(habit)
+            self._habits = habits
+            self._habits_by_id = {habit.habit_id: habit for habit in habits}
+            self._habits_generation = generation
+        return self._habits
+
+    def create_habit(self, name, periodicity):
+        """Create a new habit and return its ID."""
+        return self._written(self.storage.add_habit(name, periodicity))
+
+    def complete_habit(self, habit_id):
+        """Mark a habit as completed; returns False if it doesn't exist."""
+        self.streak_cache.invalidate(habit_id)
+        return self._written(self.storage.complete_habit(habit_id))
+
+    def update_habit(self, habit_id, **kwargs):
+        """Update a habit's name and/or periodicity; returns False if it doesn't exist."""
+        self.streak_cache.invalidate(habit_id)
+        return self._written(self.storage.update_habit(habit_id, **kwargs))
+
+    def delete_habit(self, habit_id):
+        """Delete a habit and its completions; returns False if it doesn't exist."""
+        self.streak_cache.invalidate(habit_id)
+        return self._written(self.storage.delete_habit(habit_id))
+
+    def import_completions(self, completions, chunk_size=50000):
+        """Import (habit_id, timestamp) pairs, e.g. backfilled from an export.
+
+        The iterable is consumed in chunks of chunk_size pairs, each stored
+        with one write, so streams of any length use bounded memory.
+        Unknown habit ids, unparsable rows and duplicates are skipped.
+
+        Returns:
+            dict: Counts of "added", "duplicates", "unknown_habit" and
+            "invalid" entries
+        """
+        totals = {"added": 0, "duplicates": 0, "unknown_habit": 0, "invalid": 0}
+        self.streak_cache.invalidate()
+        iterator = iter(completions)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                return self._written(totals)
+            for key, count in self.storage.add_completions(chunk).items():
+                totals[key] += count
+
+    def get_all_habits(self):
+        """Retrieve all habits."""
+        return list(self._load_habits())
+
+    def get_habit_completions(self, habit_id, since=None, until=None):
+        """Retrieve the completions for a habit, optionally only those in [since, until)."""
+        return unpack_timestamps(self.storage.get_completion_times(habit_id, since=since, until=until))
+
+    def get_completion_times(self, habit_id, since=None, until=None):
+        """Retrieve completions for a habit as array('q') of epoch
+        microseconds, for analytics and plotting without datetime objects."""
+        return self.storage.get_completion_times(habit_id, since=since, until=until)
+
+    def get_period_counts(self, habit_id, granularity="daily", since=None, until=None):
+        """Count a habit's completions per day, ISO week or month.
+
+        Returns:
+            dict: {period key: count}, see analytics.period_counts
+        """
+        times = self.storage.get_completion_times(habit_id, since=since, until=until)
+        return period_counts(times, granularity, since, until)
+
+    def get_rollup(self, habit_id, granularity="daily", since=None, until=None, fill=False):
+        """Read a habit's stored completion counts per day, ISO week or month.
+
+        Unlike get_period_counts, no completions are read: the counts come
+        from rollups that storage keeps up to date on every write. Periods
+        overlapping [since, until) are returned whole.
+
+        Args:
+            habit_id (int): ID of the habit
+            granularity (str): 'daily', 'weekly' or 'monthly'
+            since (datetime or str, optional): Start of the range
+            until (datetime or str, optional): End of the range (exclusive)
+            fill (bool): Include periods without completions (needs both bounds)
+
+        Returns:
+            dict: {period key: count} in chronological order
+        """
+        counts = self.storage.get_rollup(habit_id, granularity, since, until)
+        if fill:
+            counts = rollup_range(counts, granularity, since, until, fill=True)
+        return counts
+
+    def completion_rate(self, habit_id, window=30, now=None):
+        """Return the share of the habit's periods completed in the last window days.
+
+        Answered from the stored rollups; a week or month partly inside
+        the window counts as completed if it has any completion.
+
+        Args:
+            habit_id (int): ID of the habit
+            window (int or timedelta): Number of days, today included
+            now (datetime, optional): End of the window, defaults to now
+
+        Returns:
+            float: Between 0.0 and 1.0; 0.0 for an unknown habit
+        """
+        habit = self.storage.get_habit_by_id(habit_id)
+        if not habit:
+            return 0.0
+        if isinstance(window, timedelta):
+            window = window.days
+        now = now or datetime.now()
+        since = datetime.combine(now.date() - timedelta(days=window - 1), time())
+        counts = self.get_rollup(habit_id, habit["periodicity"], since, now, fill=True)
+        if not counts:
+            return 0.0
+        return sum(1 for count in counts.values() if count) / len(counts)
+
+    def get_all_completions(self):
+        """Retrieve the completions of every habit with a single storage read.
+
+        Returns:
+            dict: {habit_id: array('q') of epoch microseconds}
+        """
+        return self.storage.get_all_completion_times()
+
+    def get_habits_by_periodicity(self, periodicity):
+        """Retrieve habits filtered by periodicity (e.g., 'daily', 'weekly')."""
+        return [
+            habit for habit in self._load_habits()
+            if habit.periodicity.lower() == periodicity.lower()
+        ]
+
+    def get_global_longest_streak(self):
+        """Return the habit with the longest streak across all habits.
+
+        Answered from the stored streak state, without reading completions.
+        """
+        states = self.storage.get_streak_states()
+        longest_streak = 0
+        top_habit = None
+
+        for habit in self.get_all_habits():
+            streak = states.get(habit.habit_id, {}).get("longest", 0)
+            if streak > longest_streak:
+                longest_streak = streak
+                top_habit = habit
+
+        if top_habit:
+            return top_habit.name, longest_streak
+        else:
+            return None, 0
+
+    def get_longest_streak_for_habit(self, habit_id):
+        """Return the longest streak for a given habit."""
+        state = self.storage.get_streak_state(habit_id)
+        return state["longest"] if state else 0
+
+    def get_current_streak_for_habit(self, habit_id):
+        """Return the current active streak for a given habit."""
+        habit = self.storage.get_habit_by_id(habit_id)
+        if not habit:
+            return 0
+        return current_streak_from_state(self.storage.get_streak_state(habit_id), habit["periodicity"])
+
+    def get_streak_table(self, habits=None):
+        """Return the current and longest streak of every habit from stored
+        streak state, without reading completions.
+
+        Args:
+            habits (list, optional): Habit dicts already read with
+                storage.get_habits()
+
+        Returns:
+            list: One {"id", "name", "periodicity", "current", "longest"}
+            dict per habit
+        """
+        if habits is None:
+            habits = self.storage.get_habits()
+        states = self.storage.get_streak_states()
+        return [
+            {
+                "id": habit["id"],
+                "name": habit["name"],
+                "periodicity": habit["periodicity"],
+                "current": current_streak_from_state(states.get(habit["id"]), habit["periodicity"]),
+                "longest": states.get(habit["id"], {}).get("longest", 0),
+            }
+            for habit in habits
+        ]
+
+    def compute_streaks(self):
+        """Recompute streaks of every habit from full history, reusing
+        cached results while storage is unchanged.
+
+        Returns:
+            dict: {habit_id: {"name", "periodicity", "longest", "current"}}
+        """
+        return compute_streaks(self.storage, self.streak_cache)
+
+    def rebuild_streaks(self):
+        """Recompute stored streaks from the full completion history."""
+        self.streak_cache.invalidate()
+        self._written(self.storage.rebuild_streaks())
+
+    def rebuild_rollups(self):
+        """Recompute stored per-period completion counts from the full history."""
+        self._written(self.storage.rebuild_rollups())
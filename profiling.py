@@ -0,0 +1,166 @@
+"""Opt-in instrumentation of the tracker's hot paths.
+
+Set HABIT_TRACKER_PROFILE=1 (or pass --profile to cli.py) to count and
+time storage loads and saves, streak computations and graph rendering.
+When disabled, an instrumented call costs one extra function call and a
+flag check.
+
+Results are kept per metric name and can be printed as a table, or
+dumped as JSON or Prometheus text:
+
+    HABIT_TRACKER_PROFILE=1 python main.py
+    python cli.py --profile --profile-format prometheus streaks
+    python cli.py --cprofile plot --all
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+_enabled = os.environ.get("HABIT_TRACKER_PROFILE", "") not in ("", "0")
+_lock = threading.Lock()
+_metrics = {}
+
+
+def is_enabled():
+    """Return True if instrumentation is switched on."""
+    return _enabled
+
+
+def enable():
+    """Switch instrumentation on."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Switch instrumentation off; collected metrics are kept."""
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    """Forget all collected metrics."""
+    with _lock:
+        _metrics.clear()
+
+
+def _metric(name):
+    metric = _metrics.get(name)
+    if metric is None:
+        metric = _metrics[name] = {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "bytes": 0}
+    return metric
+
+
+def record(name, seconds):
+    """Record one call of metric name that took seconds."""
+    with _lock:
+        metric = _metric(name)
+        metric["calls"] += 1
+        metric["seconds"] += seconds
+        metric["max_seconds"] = max(metric["max_seconds"], seconds)
+
+
+def add_bytes(name, count):
+    """Add count bytes read or written to metric name."""
+    with _lock:
+        _metric(name)["bytes"] += count
+
+
+def timed(name):
+    """Decorator that records the calls and run time of a function under name."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """Return a copy of the collected metrics.
+
+    Returns:
+        dict: {name: {"calls", "seconds", "max_seconds", "bytes"}}, sorted by name
+    """
+    with _lock:
+        return {name: dict(_metrics[name]) for name in sorted(_metrics)}
+
+
+def format_table(metrics=None):
+    """Format metrics as a plain-text table, slowest total first."""
+    metrics = snapshot() if metrics is None else metrics
+    if not metrics:
+        return "No profiling data collected."
+    rows = sorted(metrics.items(), key=lambda item: item[1]["seconds"], reverse=True)
+    width = max(len("metric"), max(len(name) for name in metrics))
+    lines = [f"{'metric':<{width}}  {'calls':>7}  {'total ms':>10}  {'mean ms':>9}  {'max ms':>9}  {'bytes':>12}"]
+    for name, metric in rows:
+        mean = metric["seconds"] / metric["calls"] if metric["calls"] else 0.0
+        lines.append(
+            f"{name:<{width}}  {metric['calls']:>7}  {metric['seconds'] * 1000:>10.2f}  "
+            f"{mean * 1000:>9.3f}  {metric['max_seconds'] * 1000:>9.3f}  {metric['bytes']:>12}"
+        )
+    return "\n".join(lines)
+
+
+def to_json(metrics=None):
+    """Dump metrics as a JSON string."""
+    return json.dumps(snapshot() if metrics is None else metrics, indent=2)
+
+
+def to_prometheus(metrics=None):
+    """Dump metrics in the Prometheus text exposition format."""
+    metrics = snapshot() if metrics is None else metrics
+    series = [
+        ("habit_tracker_calls_total", "counter", "Number of instrumented calls.", "calls"),
+        ("habit_tracker_seconds_total", "counter", "Time spent in instrumented calls.", "seconds"),
+        ("habit_tracker_max_seconds", "gauge", "Slowest single instrumented call.", "max_seconds"),
+        ("habit_tracker_bytes_total", "counter", "Bytes read or written by instrumented calls.", "bytes"),
+    ]
+    lines = []
+    for metric_name, metric_type, help_text, field in series:
+        lines.append(f"# HELP {metric_name} {help_text}")
+        lines.append(f"# TYPE {metric_name} {metric_type}")
+        for name, metric in metrics.items():
+            lines.append(f'{metric_name}{{name="{name}"}} {metric[field]}')
+    return "\n".join(lines) + "\n"
+
+
+REPORT_FORMATS = {"table": format_table, "json": to_json, "prometheus": to_prometheus}
+
+
+def report(output_format="table", file=None):
+    """Print the collected metrics (to stderr by default)."""
+    print(REPORT_FORMATS[output_format](), file=file if file is not None else sys.stderr)
+
+
+def profile_call(func, *args, sort="cumulative", limit=25, file=None, **kwargs):
+    """Run func(*args, **kwargs) under cProfile and print its hottest functions.
+
+    Args:
+        func: Callable to profile
+        sort (str): pstats sort key
+        limit (int): Number of functions to print
+        file: Stream for the statistics (stderr by default)
+
+    Returns:
+        Whatever func returns
+    """
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        stats = pstats.Stats(profiler, stream=file if file is not None else sys.stderr)
+        stats.sort_stats(sort).print_stats(limit)
@@ -0,0 +1,279 @@
+"""Reminders for habits that are due or about to break their streak.
+
+The Scheduler keeps every habit's next deadlines in heaps, so "what is
+due now" and "what breaks soon" are answered without recomputing
+streaks, and a completion updates them in O(log n):
+
+    scheduler = Scheduler(tracker)
+    scheduler.complete_habit(3)
+    scheduler.due_now()
+    scheduler.at_risk(within=timedelta(hours=6))
+
+watch() blocks and calls back whenever a habit becomes due or comes
+within warn_before of breaking its streak. It sleeps until the next
+deadline instead of polling.
+"""
+import calendar
+import heapq
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+Deadline = namedtuple("Deadline", ["habit_id", "name", "at"])
+
+# A streak counts as broken once the last completion is more than this
+# many days old, as in analytics.current_streak_from_state.
+_MAX_GAP_DAYS = {'daily': 1, 'weekly': 7, 'monthly': 31}
+
+
+def _midnight(day):
+    return datetime(day.year, day.month, day.day)
+
+
+def next_deadlines(periodicity, last_completed_at, created_at):
+    """Compute when a habit is next due and when its streak breaks.
+
+    The habit is due again on the next day, the same weekday next week,
+    or the same day next month; a completion on that day continues the
+    streak. If next month is too short for that day, the due day is
+    clamped to its last day (Jan 31 is due Feb 28) as a reminder only:
+    monthly streaks need the same day of month, so no completion then
+    continues the streak. The streak breaks at the start of the first
+    day on which the current streak would be 0.
+
+    Args:
+        periodicity: 'daily', 'weekly' or 'monthly'
+        last_completed_at (datetime or str): Last completion, or None
+        created_at (datetime or str): Creation time of the habit
+
+    Returns:
+        tuple: (due_at, breaks_at) datetimes; a habit that was never
+        completed is due since its creation and has no streak to break
+    """
+    if periodicity not in _MAX_GAP_DAYS:
+        raise ValueError("Periodicity must be 'daily', 'weekly', or 'monthly'")
+    if last_completed_at is None:
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        return created_at, None
+    if isinstance(last_completed_at, str):
+        last_completed_at = datetime.fromisoformat(last_completed_at)
+
+    last_day = last_completed_at.date()
+    if periodicity == 'daily':
+        due_day = last_day + timedelta(days=1)
+    elif periodicity == 'weekly':
+        due_day = last_day + timedelta(weeks=1)
+    else:
+        year, month = (last_day.year + 1, 1) if last_day.month == 12 else (last_day.year, last_day.month + 1)
+        due_day = last_day.replace(year=year, month=month,
+                                   day=min(last_day.day, calendar.monthrange(year, month)[1]))
+    breaks_day = last_day + timedelta(days=_MAX_GAP_DAYS[periodicity] + 1)
+    return _midnight(due_day), _midnight(breaks_day)
+
+
+class Scheduler:
+    """Heaps of every habit's next due time and streak-breaking time.
+
+    Heap entries are never updated in place: a change pushes new entries
+    with a higher version, and entries whose version is no longer the
+    habit's current one are skipped (and dropped once they outnumber
+    the live ones).
+
+    Changes made through other trackers or processes are only picked up
+    by update() or refresh(); watch() re-reads a habit before notifying
+    about it, so it never reports a habit that was completed meanwhile.
+    """
+
+    def __init__(self, tracker, warn_before=timedelta(hours=2), clock=datetime.now):
+        """
+        Args:
+            tracker: HabitTracker instance
+            warn_before (timedelta): How long before a streak breaks
+                watch() reports it as at risk
+            clock: Callable returning the current (naive, local) datetime
+        """
+        self.tracker = tracker
+        self.warn_before = warn_before
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self.refresh()
+
+    def refresh(self):
+        """Reload the deadlines of every habit from storage."""
+        states = self.tracker.storage.get_streak_states()
+        with self._lock:
+            self._entries = {}
+            self._version = 0
+            self._due = []
+            self._breaks = []
+            self._alarms = []
+            for habit in self.tracker.get_all_habits():
+                state = states.get(habit.habit_id) or {}
+                self._set(habit.habit_id, habit.name,
+                          *next_deadlines(habit.periodicity, state.get("last_completed_at"), habit.created_at))
+        self._wake.set()
+
+    def _set(self, habit_id, name, due_at, breaks_at):
+        """Record new deadlines for a habit and push their heap entries (lock held)."""
+        self._version += 1
+        version = self._version
+        self._entries[habit_id] = (name, due_at, breaks_at, version)
+        heapq.heappush(self._due, (due_at, version, habit_id))
+        heapq.heappush(self._alarms, (due_at, version, "due", habit_id))
+        if breaks_at is not None:
+            heapq.heappush(self._breaks, (breaks_at, version, habit_id))
+            heapq.heappush(self._alarms, (breaks_at - self.warn_before, version, "at_risk", habit_id))
+        if len(self._due) > 2 * len(self._entries) + 16:
+            self._compact()
+
+    def _compact(self):
+        """Drop heap entries of outdated versions (lock held)."""
+        live = {(habit_id, entry[3]) for habit_id, entry in self._entries.items()}
+        self._due = [e for e in self._due if (e[2], e[1]) in live]
+        self._breaks = [e for e in self._breaks if (e[2], e[1]) in live]
+        self._alarms = [e for e in self._alarms if (e[3], e[1]) in live]
+        for heap in (self._due, self._breaks, self._alarms):
+            heapq.heapify(heap)
+
+    def _is_live(self, habit_id, version):
+        entry = self._entries.get(habit_id)
+        return entry is not None and entry[3] == version
+
+    def update(self, habit_id):
+        """Re-read one habit from storage and update its deadlines in O(log n).
+
+        Returns:
+            bool: False if the habit no longer exists
+        """
+        storage = self.tracker.storage
+        habit = storage.get_habit_by_id(habit_id)
+        if habit is None:
+            self.remove(habit_id)
+            return False
+        state = storage.get_streak_state(habit_id) or {}
+        due_at, breaks_at = next_deadlines(habit["periodicity"], state.get("last_completed_at"),
+                                           habit["created_at"])
+        with self._lock:
+            entry = self._entries.get(habit_id)
+            if entry is None or entry[:3] != (habit["name"], due_at, breaks_at):
+                self._set(habit_id, habit["name"], due_at, breaks_at)
+        self._wake.set()
+        return True
+
+    def remove(self, habit_id):
+        """Stop tracking a habit."""
+        with self._lock:
+            self._entries.pop(habit_id, None)
+
+    def complete_habit(self, habit_id):
+        """Complete a habit through the tracker and move its deadlines."""
+        completed = self.tracker.complete_habit(habit_id)
+        if completed:
+            self.update(habit_id)
+        return completed
+
+    def _select(self, heap, limit, position):
+        """Yield live entries of heap with time <= limit, walking only the
+        heap nodes that can hold them (lock held)."""
+        pending = [0] if heap else []
+        while pending:
+            index = pending.pop()
+            entry = heap[index]
+            if entry[0] > limit:
+                continue
+            habit_id = entry[position]
+            if self._is_live(habit_id, entry[1]):
+                yield entry[0], habit_id
+            pending.extend(child for child in (2 * index + 1, 2 * index + 2) if child < len(heap))
+
+    def due_now(self, now=None):
+        """Return the habits whose next completion is due, oldest deadline first.
+
+        Costs O(k) for k due habits, regardless of how many are tracked.
+
+        Returns:
+            list: Deadline(habit_id, name, at) tuples, at being the due time
+        """
+        now = now or self._clock()
+        with self._lock:
+            due = [Deadline(habit_id, self._entries[habit_id][0], at)
+                   for at, habit_id in self._select(self._due, now, 2)]
+        return sorted(due, key=lambda deadline: deadline.at)
+
+    def at_risk(self, within=timedelta(days=1), now=None):
+        """Return the habits whose streak breaks within the given time, soonest first.
+
+        Entries of streaks that have already broken are popped from the
+        heap on the way, so they are only looked at once.
+
+        Returns:
+            list: Deadline(habit_id, name, at) tuples, at being the time the
+            streak breaks
+        """
+        now = now or self._clock()
+        with self._lock:
+            while self._breaks and self._breaks[0][0] <= now:
+                heapq.heappop(self._breaks)
+            risky = [Deadline(habit_id, self._entries[habit_id][0], at)
+                     for at, habit_id in self._select(self._breaks, now + within, 2)]
+        return sorted(risky, key=lambda deadline: deadline.at)
+
+    def next_wakeup(self):
+        """Return the time of the next watch() notification, or None."""
+        with self._lock:
+            while self._alarms and not self._is_live(self._alarms[0][3], self._alarms[0][1]):
+                heapq.heappop(self._alarms)
+            return self._alarms[0][0] if self._alarms else None
+
+    def _pop_alarms(self, now):
+        """Pop the notifications that are due at now, re-checking each habit."""
+        with self._lock:
+            fired = []
+            while self._alarms and self._alarms[0][0] <= now:
+                _, version, kind, habit_id = heapq.heappop(self._alarms)
+                if self._is_live(habit_id, version):
+                    fired.append((kind, habit_id, version))
+
+        events = []
+        for kind, habit_id, version in fired:
+            # Another process may have completed the habit since it was loaded.
+            self.update(habit_id)
+            with self._lock:
+                if not self._is_live(habit_id, version):
+                    continue
+                name, due_at, breaks_at, _ = self._entries[habit_id]
+            if kind == "due":
+                events.append((kind, Deadline(habit_id, name, due_at)))
+            elif breaks_at > now:
+                events.append((kind, Deadline(habit_id, name, breaks_at)))
+        return events
+
+    def watch(self, callback):
+        """Call callback(kind, deadline) as deadlines pass, until stop().
+
+        kind is "due" when a habit becomes due, or "at_risk" when its
+        streak breaks within warn_before (deadline.at is then the breaking
+        time). Habits that are already due when watching starts are
+        reported right away. Between notifications the thread sleeps
+        until the next deadline, or until update() or refresh() changes it.
+        """
+        self._stopped.clear()
+        while not self._stopped.is_set():
+            for kind, deadline in self._pop_alarms(self._clock()):
+                callback(kind, deadline)
+            if self._stopped.is_set():
+                break
+            # Cleared before looking at the heap, so a change made from now
+            # on still cuts the sleep short.
+            self._wake.clear()
+            wake_at = self.next_wakeup()
+            timeout = None if wake_at is None else max(0.0, (wake_at - self._clock()).total_seconds())
+            self._wake.wait(timeout)
+
+    def stop(self):
+        """Make watch() return."""
+        self._stopped.set()
+        self._wake.set()
@@ -0,0 +1,258 @@
+"""Local HTTP API for the habit tracker, built on asyncio streams.
+
+    python server.py --port 8080
+
+Endpoints (JSON in and out):
+    GET  /habits                       all habits
+    POST /habits                       {"name": ..., "periodicity": ...}
+    GET  /habits/<id>/completions      ?limit=N&latest=1
+    POST /habits/<id>/complete         record a completion now (409 if that
+                                       exact completion is already stored)
+    GET  /streaks                      current and longest streak per habit
+
+Storage calls run on a single worker thread, never on the event loop.
+Habits and streaks are answered from an in-memory snapshot that is
+refreshed after each write, and completions that arrive together are
+written to storage as one batch.
+"""
+import argparse
+import asyncio
+import functools
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+from cli import open_tracker
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class HabitServer:
+    """Serve a HabitTracker over HTTP.
+
+    Args:
+        tracker: HabitTracker to serve
+        max_batch (int): Most completions written in one storage call
+    """
+
+    def __init__(self, tracker, max_batch=1000):
+        self.tracker = tracker
+        self.max_batch = max_batch
+        # One thread: storage backends are not thread-safe, and writes are
+        # grouped anyway.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="habit-storage")
+        self._queue = None
+        self._writer = None
+        self._server = None
+        self.snapshot = {"habits": [], "streaks": []}
+        self._habit_ids = set()
+        self.batches_written = 0
+
+    async def _run_storage(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _build_snapshot(self):
+        """Read habits and streak states from storage (worker thread)."""
+        habits = self.tracker.storage.get_habits()
+        return {"habits": [dict(habit) for habit in habits], "streaks": self.tracker.get_streak_table(habits)}
+
+    async def refresh_snapshot(self):
+        self.snapshot = await self._run_storage(self._build_snapshot)
+        self._habit_ids = {habit["id"] for habit in self.snapshot["habits"]}
+
+    def _write(self, func, *args):
+        """Run a storage write and flush it if the storage buffers writes."""
+        result = func(*args)
+        flush = getattr(self.tracker.storage, "flush", None)
+        if flush is not None:
+            flush()
+        return result
+
+    async def _write_completions(self):
+        """Drain queued completions and store each group with one write."""
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            pairs = [(habit_id, completed_at) for habit_id, completed_at, _ in batch]
+            outcomes = []
+            try:
+                await self._run_storage(
+                    self._write, functools.partial(self.tracker.storage.add_completions, pairs, outcomes=outcomes)
+                )
+                self.batches_written += 1
+                await self.refresh_snapshot()
+            except Exception as error:  # report to every waiting request
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+            else:
+                # "added", or why add_completions skipped the pair
+                for (_, _, future), outcome in zip(batch, outcomes):
+                    if not future.done():
+                        future.set_result(outcome)
+
+    async def complete_habit(self, habit_id):
+        """Queue a completion and wait until it has been written."""
+        if habit_id not in self._habit_ids:
+            raise HTTPError(404, f"No habit with ID {habit_id}")
+        completed_at = datetime.now().isoformat()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((habit_id, completed_at, future))
+        outcome = await future
+        if outcome == "duplicates":
+            raise HTTPError(409, f"Habit {habit_id} already has a completion at {completed_at}")
+        if outcome == "unknown_habit":
+            raise HTTPError(404, f"No habit with ID {habit_id}")
+        if outcome != "added":
+            raise HTTPError(400, "Invalid completion")
+        return {"habit_id": habit_id, "completed_at": completed_at}
+
+    async def route(self, method, target, body):
+        """Dispatch a request and return (status, payload)."""
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+
+        if parts == ["habits"]:
+            if method == "GET":
+                return 200, self.snapshot["habits"]
+            if method == "POST":
+                try:
+                    habit_id = await self._run_storage(
+                        self._write, self.tracker.storage.add_habit, body["name"], body["periodicity"]
+                    )
+                except (KeyError, TypeError, ValueError) as error:
+                    raise HTTPError(400, f"Invalid habit: {error}")
+                await self.refresh_snapshot()
+                return 201, {"id": habit_id}
+            raise HTTPError(405, "Use GET or POST")
+
+        if parts == ["streaks"] and method == "GET":
+            return 200, self.snapshot["streaks"]
+
+        if len(parts) == 3 and parts[0] == "habits":
+            try:
+                habit_id = int(parts[1])
+            except ValueError:
+                raise HTTPError(404, "Not found")
+            if parts[2] == "complete" and method == "POST":
+                return 201, await self.complete_habit(habit_id)
+            if parts[2] == "completions" and method == "GET":
+                if habit_id not in self._habit_ids:
+                    raise HTTPError(404, f"No habit with ID {habit_id}")
+                query = parse_qs(url.query)
+                limit = int(query["limit"][0]) if "limit" in query else None
+                latest = query.get("latest", ["0"])[0] in ("1", "true")
+                completions = await self._run_storage(
+                    self.tracker.storage.get_completions, habit_id, limit, latest
+                )
+                return 200, completions
+
+        raise HTTPError(404, "Not found")
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection (keep-alive aware)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                try:
+                    if length < 0:
+                        raise HTTPError(400, "Invalid Content-Length")
+                    raw_body = await reader.readexactly(length)
+                    body = json.loads(raw_body) if raw_body else None
+                    status, payload = await self.route(method.upper(), target, body)
+                except HTTPError as error:
+                    status, payload = error.status, {"error": str(error)}
+                except ValueError:
+                    status, payload = 400, {"error": "Invalid request"}
+                except Exception as error:
+                    status, payload = 500, {"error": str(error)}
+
+                # Without a valid Content-Length the next request can't be found.
+                keep_alive = (length >= 0 and headers.get("connection", "").lower() != "close"
+                              and version == "HTTP/1.1")
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8080):
+        """Load the snapshot and start listening. Returns the asyncio server."""
+        self._queue = asyncio.Queue()
+        await self.refresh_snapshot()
+        self._writer = asyncio.ensure_future(self._write_completions())
+        self._server = await asyncio.start_server(self.handle_connection, host, port)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._writer is not None:
+            self._writer.cancel()
+        self._executor.shutdown(wait=True)
+
+
+async def serve(host, port):
+    # Buffered: the JSON file is parsed once and flushed after every write.
+    server = HabitServer(open_tracker(buffered=True))
+    asyncio_server = await server.start(host, port)
+    print(f"Serving habit tracker on http://{host}:{port}")
+    try:
+        async with asyncio_server:
+            await asyncio_server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the habit tracker over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,205 +1,2375 @@
-import json
-from datetime import datetime
-from pathlib import Path
-
-class JSONStorage:
-    def __init__(self, file_path="habits.json"):
-        self.file_path = Path(file_path)
-        self._ensure_file_exists()
-
-    def _ensure_file_exists(self):
-        """Create the JSON file if it doesn't exist with proper structure."""
-        if not self.file_path.exists():
-            initial_data = {
-                "habits": [],
-                "completions": [],
-                "analytics_settings": {
-                    "graph_directory": "graphs",
-                    "default_periodicities": ["daily", "weekly", "monthly"]
-                }
-            }
-            self.file_path.write_text(json.dumps(initial_data, indent=4))
-
-    def _load_data(self):
-        """Load and validate data from the JSON file."""
-        with open(self.file_path, "r") as file:
-            data = json.load(file)
-            
-            if "habits" not in data:
-                data["habits"] = []
-            if "completions" not in data:
-                data["completions"] = []
-            if "analytics_settings" not in data:
-                data["analytics_settings"] = {
-                    "graph_directory": "graphs",
-                    "default_periodicities": ["daily", "weekly", "monthly"]
-                }
-                
-            return data
-
-    def _save_data(self, data):
-        """Save data to the JSON file with validation."""
-        if not all(key in data for key in ["habits", "completions", "analytics_settings"]):
-            raise ValueError("Invalid data structure")
-            
-        with open(self.file_path, "w") as file:
-            json.dump(data, file, indent=4)
-
-    def add_habit(self, name, periodicity):
-        """Add a new habit with validation.
-        
-        Args:
-            name (str): Name of the habit
-            periodicity (str): One of 'daily', 'weekly', or 'monthly'
-            
-        Raises:
-            ValueError: If periodicity is invalid
-        """
-        if periodicity not in ["daily", "weekly", "monthly"]:
-            raise ValueError("Periodicity must be 'daily', 'weekly', or 'monthly'")
-            
-        data = self._load_data()
-        habit = {
-            "id": len(data["habits"]) + 1,
-            "name": name,
-            "periodicity": periodicity,
-            "created_at": datetime.now().isoformat(),
-            "description": "",  
-            "target_streak": 0 
-        }
-        data["habits"].append(habit)
-        self._save_data(data)
-        return habit["id"]  
-
-    def complete_habit(self, habit_id):
-        """Mark a habit as completed with validation.
-        
-        Args:
-            habit_id (int): ID of the habit to complete
-            
-        Returns:
-            bool: True if successful, False if habit doesn't exist
-        """
-        data = self._load_data()
-        
-        
-        if not any(h["id"] == habit_id for h in data["habits"]):
-            return False
-            
-        completion = {
-            "habit_id": habit_id,
-            "completed_at": datetime.now().isoformat()
-        }
-        data["completions"].append(completion)
-        self._save_data(data)
-        return True
-
-    def get_habits(self, periodicity=None):
-        """Retrieve habits, optionally filtered by periodicity.
-        
-        Args:
-            periodicity (str, optional): Filter by 'daily', 'weekly', or 'monthly'
-            
-        Returns:
-            list: List of habit dictionaries
-        """
-        data = self._load_data()
-        if periodicity:
-            return [h for h in data["habits"] if h["periodicity"] == periodicity]
-        return data["habits"]
-
-    def get_completions(self, habit_id, limit=None):
-        """Retrieve completions for a specific habit.
-        
-        Args:
-            habit_id (int): ID of the habit
-            limit (int, optional): Maximum number of completions to return
-            
-        Returns:
-            list: List of completion timestamps (ISO format)
-        """
-        data = self._load_data()
-        completions = [
-            c["completed_at"] 
-            for c in data["completions"] 
-            if c["habit_id"] == habit_id
-        ]
-        return completions[:limit] if limit else completions
-
-    def get_habit_by_id(self, habit_id):
-        """Get a specific habit by its ID.
-        
-        Args:
-            habit_id (int): ID of the habit
-            
-        Returns:
-            dict: Habit data or None if not found
-        """
-        data = self._load_data()
-        for habit in data["habits"]:
-            if habit["id"] == habit_id:
-                return habit
-        return None
-
-    def update_habit(self, habit_id, **kwargs):
-        """Update habit properties.
-        
-        Args:
-            habit_id (int): ID of the habit to update
-            **kwargs: Fields to update (name, periodicity, description, etc.)
-            
-        Returns:
-            bool: True if successful, False if habit doesn't exist
-        """
-        data = self._load_data()
-        for habit in data["habits"]:
-            if habit["id"] == habit_id:
-                for key, value in kwargs.items():
-                    if key in habit:
-                        habit[key] = value
-                self._save_data(data)
-                return True
-        return False
-
-    def delete_habit(self, habit_id):
-        """Delete a habit and its completions.
-        
-        Args:
-            habit_id (int): ID of the habit to delete
-            
-        Returns:
-            bool: True if successful, False if habit doesn't exist
-        """
-        data = self._load_data()
-        
-        habits = [h for h in data["habits"] if h["id"] != habit_id]
-        if len(habits) == len(data["habits"]):
-            return False
-            
-        completions = [c for c in data["completions"] if c["habit_id"] != habit_id]
-        
-        data["habits"] = habits
-        data["completions"] = completions
-        self._save_data(data)
-        return True
-
-    def get_analytics_settings(self):
-        """Get analytics configuration.
-        
-        Returns:
-            dict: Analytics settings including graph directory
-        """
-        data = self._load_data()
-        return data.get("analytics_settings", {})
-
-    def get_habits_by_periodicity(self, periodicity):
-        """Retrieve all habits with a specific periodicity.
-
-        Args:
-            periodicity: 'daily', 'weekly', or 'monthly'
-
-        Returns:
-            List of habit dictionaries matching the periodicity
-        """
-        data = self._load_data()
-        return [habit for habit in data['habits'] if habit['periodicity'] == periodicity]
\ No newline at end of file
+import bisect
+import copy
+import json
+import os
+import random
+import shutil
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: ConcurrentJSONStorage only guards threads in one process
+    fcntl = None
+
+import profiling
+from analytics import (
+    ROLLUP_GRANULARITIES, advance_rollup, advance_streak_state, build_rollup, build_streak_state,
+    period_bounds, period_key, rollup_range,
+)
+from timestamps import format_timestamps, from_epoch_us, pack_timestamps, slice_range, to_epoch_us
+
+
+class StorageConflictError(Exception):
+    """Raised when a write keeps losing the race against other writers."""
+
+
+class _PackedOnRead(dict):
+    """{habit_id: array('q')} whose values start out as lists of ISO
+    timestamps and are packed the first time they are read, so building
+    the index parses only the habits that are asked for."""
+
+    def __getitem__(self, habit_id):
+        times = super().__getitem__(habit_id)
+        if isinstance(times, list):
+            times = pack_timestamps(times)
+            super().__setitem__(habit_id, times)
+        return times
+
+    def get(self, habit_id, default=None):
+        return self[habit_id] if habit_id in self else default
+
+    def setdefault(self, habit_id, default=None):
+        if habit_id not in self:
+            super().__setitem__(habit_id, default)
+        return self[habit_id]
+
+    def values(self):
+        return [self[habit_id] for habit_id in self]
+
+    def items(self):
+        return [(habit_id, self[habit_id]) for habit_id in self]
+
+
+def _collect_new_completions(completions, known_ids, existing_times, outcomes=None):
+    """Validate and deduplicate (habit_id, timestamp) pairs for a bulk import.
+
+    Args:
+        completions: Iterable of (habit_id, timestamp) pairs; timestamps are
+            datetimes or ISO strings
+        known_ids: Set of existing habit ids
+        existing_times: Callable returning the stored epoch microseconds of
+            a habit, called once per habit that appears in completions
+        outcomes (list, optional): Emptied, then filled with the summary key
+            of every pair, in order
+
+    Returns:
+        tuple: ({habit_id: sorted list of new epoch microseconds}, summary
+        dict with "added", "duplicates", "unknown_habit" and "invalid" counts)
+    """
+    summary = {"added": 0, "duplicates": 0, "unknown_habit": 0, "invalid": 0}
+    if outcomes is not None:
+        del outcomes[:]
+    seen = {}
+    new = {}
+    for habit_id, timestamp in completions:
+        try:
+            habit_id = int(habit_id)
+            moment = to_epoch_us(timestamp)
+        except (AttributeError, TypeError, ValueError):
+            outcome = "invalid"
+        else:
+            if habit_id not in known_ids:
+                outcome = "unknown_habit"
+            else:
+                if habit_id not in seen:
+                    seen[habit_id] = set(existing_times(habit_id))
+                    new[habit_id] = []
+                if moment in seen[habit_id]:
+                    outcome = "duplicates"
+                else:
+                    seen[habit_id].add(moment)
+                    new[habit_id].append(moment)
+                    outcome = "added"
+        summary[outcome] += 1
+        if outcomes is not None:
+            outcomes.append(outcome)
+
+    for times in new.values():
+        times.sort()
+    return {habit_id: times for habit_id, times in new.items() if times}, summary
+
+
+def _atomic_write_text(path, text, metric="storage.save_data"):
+    """Write text to path via a temp file and rename, so readers never see a
+    half-written file and a crash leaves the previous version in place.
+    The bytes written are counted under the profiling metric name.
+
+    Returns:
+        tuple: (mtime_ns, size) of the written file
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w") as file:
+        file.write(text)
+        file.flush()
+        os.fsync(file.fileno())
+        stat = os.fstat(file.fileno())
+        if profiling.is_enabled():
+            profiling.add_bytes(metric, stat.st_size)
+    os.replace(tmp_path, path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class JSONStorage:
+    def __init__(self, file_path="habits.json"):
+        self.file_path = Path(file_path)
+        self._last_read = None
+        self._habits_data = None
+        self._habits_by_id = {}
+        self._completions_data = None
+        self._completions_signature = None
+        self._completions_by_habit = {}
+        self._writes = 0
+        self._ensure_file_exists()
+
+    @property
+    def generation(self):
+        """Token that changes whenever the stored data may have changed.
+
+        Combines a counter of writes made through this instance with the
+        file's mtime and size, so changes by other processes count too.
+        Cheap to compute: one stat() call, no parsing.
+        """
+        stat = self.file_path.stat()
+        return self._writes, stat.st_mtime_ns, stat.st_size
+
+    def _ensure_file_exists(self):
+        """Create the JSON file if it doesn't exist with proper structure."""
+        if not self.file_path.exists():
+            initial_data = {
+                "habits": [],
+                "completions": [],
+                "analytics_settings": {
+                    "graph_directory": "graphs",
+                    "default_periodicities": ["daily", "weekly", "monthly"]
+                }
+            }
+            self.file_path.write_text(json.dumps(initial_data, indent=4))
+
+    def _file_signature(self):
+        """Return (mtime_ns, size) of the backing file."""
+        stat = self.file_path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    @profiling.timed("storage.load_data")
+    def _load_data(self):
+        """Load and validate data from the JSON file."""
+        with open(self.file_path, "r") as file:
+            stat = os.fstat(file.fileno())
+            data = self._read_document(file)
+        self._last_read = (data, (stat.st_mtime_ns, stat.st_size))
+        return data
+
+    def _read_signature(self, data):
+        """Return the (mtime_ns, size) of the file data was parsed from, or
+        None if data did not come straight from the last file read."""
+        if self._last_read is not None and self._last_read[0] is data:
+            return self._last_read[1]
+        return None
+
+    @staticmethod
+    def _read_document(file):
+        """Parse an open habits.json and fill in missing top-level keys."""
+        data = json.load(file)
+        if profiling.is_enabled():
+            profiling.add_bytes("storage.load_data", os.fstat(file.fileno()).st_size)
+
+        if "habits" not in data:
+            data["habits"] = []
+        if "completions" not in data:
+            data["completions"] = []
+        if "analytics_settings" not in data:
+            data["analytics_settings"] = {
+                "graph_directory": "graphs",
+                "default_periodicities": ["daily", "weekly", "monthly"]
+            }
+
+        return data
+
+    @staticmethod
+    def _validate_data(data):
+        """Raise ValueError if data is missing one of the top-level keys."""
+        if not all(key in data for key in ["habits", "completions", "analytics_settings"]):
+            raise ValueError("Invalid data structure")
+
+    @profiling.timed("storage.save_data")
+    def _save_data(self, data):
+        """Save data to the JSON file with validation."""
+        self._validate_data(data)
+        self._writes += 1
+        signature = _atomic_write_text(self.file_path, json.dumps(data, indent=4))
+        if data is self._completions_data:
+            # Write paths keep the completion index in step with data.
+            self._completions_signature = signature
+
+    def _habit_index(self, data):
+        """Return {habit_id: habit} for a loaded document, pointing into data."""
+        if self._habits_data is not data:
+            self._habits_by_id = {h["id"]: h for h in data["habits"]}
+            self._habits_data = data
+        return self._habits_by_id
+
+    def _completion_index(self, data):
+        """Return {habit_id: completion times} for a loaded document.
+
+        Completion timestamps are kept as sorted array('q') of epoch
+        microseconds (see timestamps.py), oldest first, packed per habit
+        on first use. The index is
+        rebuilt only when data is neither the document indexed last nor a
+        fresh parse of the same file version (same mtime and size), so
+        storages that keep the document in memory build it once, and the
+        plain JSONStorage builds it once per version of the file. Write
+        paths keep it up to date (see _index_for_update).
+        """
+        if self._completions_data is not data:
+            signature = self._read_signature(data)
+            if signature is None or signature != self._completions_signature:
+                grouped = {habit["id"]: [] for habit in data["habits"]}
+                for completion in data["completions"]:
+                    grouped.setdefault(completion["habit_id"], []).append(completion["completed_at"])
+                self._completions_by_habit = _PackedOnRead(grouped)
+            self._completions_data = data
+            self._completions_signature = signature
+        return self._completions_by_habit
+
+    def _index(self, data):
+        """Return (habits_by_id, completions_by_habit) for a loaded document."""
+        return self._habit_index(data), self._completion_index(data)
+
+    def _index_for_update(self, data):
+        """Like _index, for write paths that change the index along with data.
+
+        The index stops matching the file until _save_data writes data, so
+        a failed or deferred save can't leave a stale index behind.
+        """
+        index = self._index(data)
+        self._completions_signature = None
+        return index
+
+    def add_habit(self, name, periodicity):
+        """Add a new habit with validation.
+        
+        Args:
+            name (str): Name of the habit
+            periodicity (str): One of 'daily', 'weekly', or 'monthly'
+            
+        Raises:
+            ValueError: If periodicity is invalid
+        """
+        if periodicity not in ["daily", "weekly", "monthly"]:
+            raise ValueError("Periodicity must be 'daily', 'weekly', or 'monthly'")
+            
+        data = self._load_data()
+        habit = {
+            "id": self._next_habit_id(data),
+            "name": name,
+            "periodicity": periodicity,
+            "created_at": datetime.now().isoformat(),
+            "description": "",  
+            "target_streak": 0 
+        }
+        habits_by_id, completions_by_habit = self._index_for_update(data)
+        data["habits"].append(habit)
+        habits_by_id[habit["id"]] = habit
+        completions_by_habit[habit["id"]] = array('q')
+        data.setdefault("streaks", {})[str(habit["id"])] = build_streak_state([], periodicity)
+        data.setdefault("rollups", {})[str(habit["id"])] = build_rollup([])
+        self._save_data(data)
+        return habit["id"]
+
+    @staticmethod
+    def _next_habit_id(data):
+        """Hand out a habit id that is never reused, even after deletes."""
+        habit_id = max(data.get("next_habit_id", 1),
+                       max((h["id"] for h in data["habits"]), default=0) + 1)
+        data["next_habit_id"] = habit_id + 1
+        return habit_id
+
+    def complete_habit(self, habit_id):
+        """Mark a habit as completed with validation.
+        
+        Args:
+            habit_id (int): ID of the habit to complete
+            
+        Returns:
+            bool: True if successful, False if habit doesn't exist
+        """
+        data = self._load_data()
+        habits_by_id, completions_by_habit = self._index_for_update(data)
+        if habit_id not in habits_by_id:
+            return False
+            
+        completion = {
+            "habit_id": habit_id,
+            "completed_at": datetime.now().isoformat()
+        }
+        data["completions"].append(completion)
+        bisect.insort(completions_by_habit.setdefault(habit_id, array('q')),
+                      to_epoch_us(completion["completed_at"]))
+        self._record_completion(data, habits_by_id[habit_id], completion["completed_at"])
+        self._save_data(data)
+        return True
+
+    def add_completions(self, completions, outcomes=None):
+        """Add many completions with a single write.
+
+        Args:
+            completions: Iterable of (habit_id, timestamp) pairs, timestamps
+                as datetime objects or ISO strings
+            outcomes (list, optional): Filled with "added", "duplicates",
+                "unknown_habit" or "invalid" for every pair, in order
+
+        Returns:
+            dict: Counts of "added", "duplicates", "unknown_habit" and
+            "invalid" entries
+        """
+        data = self._load_data()
+        habits_by_id, completions_by_habit = self._index_for_update(data)
+        new, summary = _collect_new_completions(
+            completions, habits_by_id.keys(),
+            lambda habit_id: completions_by_habit.get(habit_id, ()),
+            outcomes,
+        )
+        if not new:
+            return summary
+
+        for habit_id, times in new.items():
+            data["completions"].extend(
+                {"habit_id": habit_id, "completed_at": from_epoch_us(t).isoformat()} for t in times
+            )
+            merged = sorted(completions_by_habit.get(habit_id, array('q')).tolist() + times)
+            completions_by_habit[habit_id] = array('q', merged)
+            self._record_completions(data, habits_by_id[habit_id], times)
+        self._save_data(data)
+        return summary
+
+    def get_habits(self, periodicity=None):
+        """Retrieve habits, optionally filtered by periodicity.
+        
+        Args:
+            periodicity (str, optional): Filter by 'daily', 'weekly', or 'monthly'
+            
+        Returns:
+            list: List of habit dictionaries (copies, safe to change)
+        """
+        data = self._load_data()
+        habits = data["habits"]
+        if periodicity:
+            habits = [h for h in habits if h["periodicity"] == periodicity]
+        return [dict(h) for h in habits]
+
+    def get_completions(self, habit_id, limit=None, latest=False, since=None, until=None):
+        """Retrieve completions for a specific habit.
+        
+        Args:
+            habit_id (int): ID of the habit
+            limit (int, optional): Maximum number of completions to return
+            latest (bool): Return the most recent `limit` completions
+                instead of the oldest ones
+            since (datetime or str, optional): Only completions at or after this time
+            until (datetime or str, optional): Only completions before this time
+            
+        Returns:
+            list: List of completion timestamps (ISO format), oldest first
+        """
+        completions = self.get_completion_times(habit_id, since=since, until=until)
+        if limit:
+            completions = completions[-limit:] if latest else completions[:limit]
+        return format_timestamps(completions)
+
+    def get_completion_times(self, habit_id, since=None, until=None):
+        """Retrieve completions for a specific habit in compact form.
+
+        Args:
+            habit_id (int): ID of the habit
+            since (datetime or str, optional): Only completions at or after this time
+            until (datetime or str, optional): Only completions before this time
+
+        Returns:
+            array: array('q') of epoch microseconds, oldest first
+        """
+        completions_by_habit = self._completion_index(self._load_data())
+        return slice_range(completions_by_habit.get(habit_id, array('q')), since, until)
+
+    def get_all_completions(self):
+        """Retrieve the completions of every habit in one pass.
+
+        Returns:
+            dict: {habit_id: list of completion timestamps (ISO format), oldest first}
+        """
+        return {
+            habit_id: format_timestamps(times)
+            for habit_id, times in self.get_all_completion_times().items()
+        }
+
+    def get_all_completion_times(self):
+        """Retrieve the completions of every habit in one pass, in compact form.
+
+        Returns:
+            dict: {habit_id: array('q') of epoch microseconds, oldest first}
+        """
+        completions_by_habit = self._completion_index(self._load_data())
+        return {habit_id: array('q', times) for habit_id, times in completions_by_habit.items()}
+
+    def get_habit_by_id(self, habit_id):
+        """Get a specific habit by its ID.
+        
+        Args:
+            habit_id (int): ID of the habit
+            
+        Returns:
+            dict: Habit data (a copy) or None if not found
+        """
+        habit = self._habit_index(self._load_data()).get(habit_id)
+        return dict(habit) if habit is not None else None
+
+    def update_habit(self, habit_id, **kwargs):
+        """Update habit properties.
+        
+        Args:
+            habit_id (int): ID of the habit to update
+            **kwargs: Fields to update (name, periodicity, description, etc.)
+            
+        Returns:
+            bool: True if successful, False if habit doesn't exist
+        """
+        data = self._load_data()
+        habits_by_id, _ = self._index_for_update(data)
+        habit = habits_by_id.get(habit_id)
+        if habit is None:
+            return False
+        for key, value in kwargs.items():
+            if key in habit:
+                habit[key] = value
+        if habit["id"] != habit_id:
+            # Re-keyed habit: let the next read rebuild the index.
+            self._habits_data = self._completions_data = None
+        if "periodicity" in kwargs or habit["id"] != habit_id:
+            data.get("streaks", {}).pop(str(habit_id), None)
+        if habit["id"] != habit_id:
+            data.get("rollups", {}).pop(str(habit_id), None)
+        elif "periodicity" in kwargs:
+            self._build_streak(data, habit)
+        self._save_data(data)
+        return True
+
+    def delete_habit(self, habit_id):
+        """Delete a habit and its completions.
+        
+        Args:
+            habit_id (int): ID of the habit to delete
+            
+        Returns:
+            bool: True if successful, False if habit doesn't exist
+        """
+        data = self._load_data()
+        habits_by_id, completions_by_habit = self._index_for_update(data)
+        if habit_id not in habits_by_id:
+            return False
+
+        if completions_by_habit.pop(habit_id, None):
+            data["completions"] = [c for c in data["completions"] if c["habit_id"] != habit_id]
+        data["habits"].remove(habits_by_id.pop(habit_id))
+        data.get("streaks", {}).pop(str(habit_id), None)
+        data.get("rollups", {}).pop(str(habit_id), None)
+        self._save_data(data)
+        return True
+
+    def get_analytics_settings(self):
+        """Get analytics configuration.
+        
+        Returns:
+            dict: Analytics settings including graph directory (a copy)
+        """
+        data = self._load_data()
+        return copy.deepcopy(data.get("analytics_settings", {}))
+
+    def get_habits_by_periodicity(self, periodicity):
+        """Retrieve all habits with a specific periodicity.
+
+        Args:
+            periodicity: 'daily', 'weekly', or 'monthly'
+
+        Returns:
+            List of habit dictionaries matching the periodicity (copies)
+        """
+        data = self._load_data()
+        return [dict(habit) for habit in data['habits'] if habit['periodicity'] == periodicity]
+
+    def _record_streak(self, data, habit, completed_at):
+        """Advance the stored streak state of a habit by one new completion.
+
+        Habits without a stored state (older files, or after an out of
+        order completion) are left alone; their state is rebuilt from
+        history the next time it is read.
+        """
+        states = data.setdefault("streaks", {})
+        key = str(habit["id"])
+        if key not in states:
+            return
+        try:
+            states[key] = advance_streak_state(
+                states[key], datetime.fromisoformat(completed_at), habit["periodicity"]
+            )
+        except ValueError:
+            del states[key]
+
+    def _record_completion(self, data, habit, completed_at):
+        """Update the stored streak state and rollup of a habit for a new
+        completion that is already in the index.
+
+        A missing streak state or rollup (older files, or an out of order
+        completion) is built from the habit's history and stored, so both
+        are kept up to date from the first check-in on.
+        """
+        self._record_streak(data, habit, completed_at)
+        if str(habit["id"]) not in data["streaks"]:
+            self._build_streak(data, habit)
+        if str(habit["id"]) in data.setdefault("rollups", {}):
+            self._record_rollup(data, habit, completed_at)
+        else:
+            self._build_rollup(data, habit)
+
+    def _record_completions(self, data, habit, times):
+        """Update the stored streak state and rollup of a habit for new
+        completions (sorted epoch microseconds) that are already in the index.
+
+        Completions newer than the last one advance the state one by one,
+        like _record_completion; a missing state or rollup, or an older
+        completion, rebuilds it once from the habit's history.
+        """
+        key = str(habit["id"])
+        rollup = data.setdefault("rollups", {}).get(key)
+        if rollup is None:
+            self._build_rollup(data, habit)
+        else:
+            for value in times:
+                advance_rollup(rollup, from_epoch_us(value))
+        state = data.setdefault("streaks", {}).get(key)
+        try:
+            if state is None:
+                raise ValueError("no stored streak state")
+            for value in times:
+                state = advance_streak_state(state, from_epoch_us(value), habit["periodicity"])
+        except ValueError:
+            self._build_streak(data, habit)
+        else:
+            data["streaks"][key] = state
+
+    def _build_streak(self, data, habit):
+        """Rebuild and store the streak state of a habit from its completions."""
+        completions_by_habit = self._completion_index(data)
+        state = build_streak_state(completions_by_habit.get(habit["id"], array('q')),
+                                   habit["periodicity"])
+        data.setdefault("streaks", {})[str(habit["id"])] = state
+        return state
+
+    def get_streak_state(self, habit_id):
+        """Get the stored streak state of a habit.
+
+        Args:
+            habit_id (int): ID of the habit
+
+        Returns:
+            dict: {"current", "longest", "last_completed_at"} or None if the
+            habit doesn't exist
+        """
+        data = self._load_data()
+        habit = self._habit_index(data).get(habit_id)
+        if habit is None:
+            return None
+        state = data.setdefault("streaks", {}).get(str(habit_id))
+        if state is None:
+            state = self._build_streak(data, habit)
+        return dict(state)
+
+    def get_streak_states(self):
+        """Get the stored streak state of every habit.
+
+        Returns:
+            dict: {habit_id: {"current", "longest", "last_completed_at"}}
+        """
+        data = self._load_data()
+        states = data.setdefault("streaks", {})
+        return {
+            habit["id"]: dict(states.get(str(habit["id"])) or self._build_streak(data, habit))
+            for habit in data["habits"]
+        }
+
+    def rebuild_streaks(self):
+        """Recompute every habit's streak state from its full history and save it."""
+        data = self._load_data()
+        data["streaks"] = {}
+        for habit in data["habits"]:
+            self._build_streak(data, habit)
+        self._save_data(data)
+
+    def _record_rollup(self, data, habit, completed_at):
+        """Count one new completion in the stored rollup of a habit.
+
+        Habits without a stored rollup are left alone (the log replay of
+        AppendLogStorage relies on that); _record_completion builds it.
+        """
+        rollup = data.setdefault("rollups", {}).get(str(habit["id"]))
+        if rollup is not None:
+            advance_rollup(rollup, datetime.fromisoformat(completed_at))
+
+    def _build_rollup(self, data, habit):
+        """Rebuild and store the rollup of a habit from its completions."""
+        completions_by_habit = self._completion_index(data)
+        rollup = build_rollup(completions_by_habit.get(habit["id"], array('q')))
+        data.setdefault("rollups", {})[str(habit["id"])] = rollup
+        return rollup
+
+    def get_rollup(self, habit_id, granularity, since=None, until=None):
+        """Get a habit's completion counts per period from the stored rollup.
+
+        Args:
+            habit_id (int): ID of the habit
+            granularity (str): 'daily', 'weekly' or 'monthly'
+            since (datetime or str, optional): Only periods ending after this time
+            until (datetime or str, optional): Only periods starting before this time
+
+        Returns:
+            dict: {period key: count} in chronological order, periods
+            without completions left out; empty if the habit doesn't exist
+        """
+        if granularity not in ROLLUP_GRANULARITIES:
+            raise ValueError("Granularity must be 'daily', 'weekly', or 'monthly'")
+        data = self._load_data()
+        habit = self._habit_index(data).get(habit_id)
+        if habit is None:
+            return {}
+        rollup = data.setdefault("rollups", {}).get(str(habit_id))
+        if rollup is None:
+            rollup = self._build_rollup(data, habit)
+        return rollup_range(rollup.get(granularity, {}), granularity, since, until)
+
+    def rebuild_rollups(self):
+        """Recompute every habit's rollup from its full history and save it."""
+        data = self._load_data()
+        data["rollups"] = {}
+        for habit in data["habits"]:
+            self._build_rollup(data, habit)
+        self._save_data(data)
+
+
+class CachedJSONStorage(JSONStorage):
+    """JSONStorage that keeps the parsed document in memory.
+
+    The file is only parsed again when its mtime or size changes on disk.
+    Writes are kept in memory and written back in one go by flush(), or when
+    the storage is used as a context manager:
+
+        with CachedJSONStorage("habits.json") as storage:
+            storage.complete_habit(1)
+            storage.complete_habit(2)
+    """
+
+    def __init__(self, file_path="habits.json"):
+        super().__init__(file_path)
+        self._data = None
+        self._signature = None
+        self._dirty = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.discard()
+        return False
+
+    def _load_data(self):
+        """Return the cached document, re-reading the file only if it changed."""
+        if self._dirty:
+            return self._data
+
+        signature = self._file_signature()
+        if self._data is None or signature != self._signature:
+            self._data = super()._load_data()
+            self._signature = signature
+        return self._data
+
+    def _save_data(self, data):
+        """Keep the change in memory until flush() is called."""
+        self._validate_data(data)
+        self._writes += 1
+        self._data = data
+        self._dirty = True
+
+    @property
+    def dirty(self):
+        """bool: True if there are changes that have not been flushed yet."""
+        return self._dirty
+
+    def flush(self):
+        """Write pending changes back to the JSON file.
+
+        Returns:
+            bool: True if anything was written
+        """
+        if not self._dirty:
+            return False
+        super()._save_data(self._data)
+        self._signature = self._file_signature()
+        self._dirty = False
+        return True
+
+    def discard(self):
+        """Drop pending changes; the next read goes back to the file."""
+        self._data = None
+        self._signature = None
+        self._dirty = False
+
+
+class AppendLogStorage(JSONStorage):
+    """JSONStorage that appends completions to a JSON Lines log.
+
+    habits.json stays the snapshot (habit catalog, settings and compacted
+    completions). Every check-in is one appended line in
+    ``<name>.completions.jsonl`` next to it, so complete_habit no longer
+    rewrites the whole file. The log is folded into the snapshot every
+    ``compact_every`` completions, and whenever the catalog itself changes.
+
+    Several processes may share the files. Appends and reads hold a shared
+    fcntl lock on a sidecar file; catalog changes and compactions hold it
+    exclusively from loading the data until the folded log is removed, so
+    they always work on the latest snapshot and no append lands in a log
+    that is being folded.
+    """
+
+    def __init__(self, file_path="habits.json", compact_every=1000):
+        super().__init__(file_path)
+        self.log_path = self.file_path.with_name(f"{self.file_path.stem}.completions.jsonl")
+        self.pending_path = self.file_path.with_name(f"{self.file_path.stem}.completions.compacting")
+        self.lock_path = self.file_path.with_name(f".{self.file_path.name}.lock")
+        self.compact_every = compact_every
+        self._log_lines = None
+        self._catalog_signature = None
+        self._habit_ids = set()
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+
+    @contextmanager
+    def _locked(self, exclusive=True):
+        """Hold the log lock; nested calls in the same thread reuse the outer one."""
+        with self._thread_lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with open(self.lock_path, "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                self._lock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth = 0
+                    if fcntl is not None:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    @property
+    def generation(self):
+        """Like JSONStorage.generation, but also covers appends to the log."""
+        try:
+            stat = self.log_path.stat()
+            log_signature = stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            log_signature = None
+        return super().generation, log_signature
+
+    @staticmethod
+    def _read_log(path):
+        """Read completion entries from a JSON Lines file.
+
+        A torn last line (crash mid-append) is skipped rather than failing
+        the whole load.
+        """
+        entries = []
+        try:
+            with open(path, "r") as file:
+                for line in file:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _load_data(self):
+        """Load the snapshot and replay the completion log on top of it."""
+        with self._locked(exclusive=False):
+            return self._load_locked()
+
+    def _load_locked(self):
+        data = super()._load_data()
+        snapshot_size = len(data["completions"])
+        if self.pending_path.exists():
+            # Left behind by an interrupted compaction; part of it may
+            # already be in the snapshot.
+            seen = {(c["habit_id"], c["completed_at"]) for c in data["completions"]}
+            data["completions"].extend(
+                c for c in self._read_log(self.pending_path)
+                if (c["habit_id"], c["completed_at"]) not in seen
+            )
+        log_entries = self._read_log(self.log_path)
+        self._log_lines = len(log_entries)
+        data["completions"].extend(log_entries)
+        if len(data["completions"]) > snapshot_size:
+            # No longer what the snapshot file holds.
+            self._last_read = None
+
+        # The snapshot's streak states and rollups only cover compacted completions.
+        replayed = data["completions"][snapshot_size:]
+        if replayed:
+            habits_by_id = {h["id"]: h for h in data["habits"]}
+            for completion in replayed:
+                if completion["habit_id"] in habits_by_id:
+                    self._record_streak(data, habits_by_id[completion["habit_id"]],
+                                        completion["completed_at"])
+                    self._record_rollup(data, habits_by_id[completion["habit_id"]],
+                                        completion["completed_at"])
+        return data
+
+    def _save_data(self, data):
+        """Write a new snapshot and fold the completion log into it.
+
+        Callers hold the exclusive lock since loading data (see the
+        overrides below), so no other writer has changed the files since.
+        """
+        self._validate_data(data)
+        with self._locked():
+            self._save_locked(data)
+
+    def _save_locked(self, data):
+
+        # Move the log aside first: check-ins that arrive while the snapshot
+        # is being written go to a fresh log instead of being lost.
+        if self.log_path.exists():
+            if self.pending_path.exists():
+                with open(self.pending_path, "a") as pending:
+                    pending.write(self.log_path.read_text())
+                self.log_path.unlink()
+            else:
+                os.replace(self.log_path, self.pending_path)
+
+        habits_by_id = {h["id"]: h for h in data["habits"]}
+        seen = {(c["habit_id"], c["completed_at"]) for c in data["completions"]}
+        for completion in self._read_log(self.pending_path):
+            key = (completion["habit_id"], completion["completed_at"])
+            if completion["habit_id"] in habits_by_id and key not in seen:
+                data["completions"].append(completion)
+                self._record_streak(data, habits_by_id[completion["habit_id"]],
+                                    completion["completed_at"])
+                self._record_rollup(data, habits_by_id[completion["habit_id"]],
+                                    completion["completed_at"])
+                seen.add(key)
+                # The completion index hasn't seen the folded check-in.
+                self._completions_data = None
+
+        super()._save_data(data)
+        try:
+            self.pending_path.unlink()
+        except FileNotFoundError:
+            pass
+        self._log_lines = 0
+
+    def _known_habit_ids(self):
+        """Habit ids from the snapshot, re-read only when the snapshot changes."""
+        stat = self.file_path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature != self._catalog_signature:
+            with open(self.file_path, "r") as file:
+                self._habit_ids = {h["id"] for h in json.load(file).get("habits", [])}
+            self._catalog_signature = signature
+        return self._habit_ids
+
+    def complete_habit(self, habit_id):
+        """Mark a habit as completed by appending one line to the log.
+
+        Args:
+            habit_id (int): ID of the habit to complete
+
+        Returns:
+            bool: True if successful, False if habit doesn't exist
+        """
+        if habit_id not in self._known_habit_ids():
+            return False
+
+        completion = {
+            "habit_id": habit_id,
+            "completed_at": datetime.now().isoformat()
+        }
+        # One write() per line on an O_APPEND file, so concurrent writers
+        # interleave whole lines.
+        line = json.dumps(completion) + "\n"
+        with self._locked(exclusive=False), open(self.log_path, "a") as file:
+            file.write(line)
+            file.flush()
+            os.fsync(file.fileno())
+
+        if self._log_lines is None:
+            self._log_lines = len(self._read_log(self.log_path))
+        else:
+            self._log_lines += 1
+        if self.compact_every and self._log_lines >= self.compact_every:
+            self.compact()
+        return True
+
+    def compact(self):
+        """Fold the completion log into the habits.json snapshot."""
+        with self._locked():
+            self._save_data(self._load_data())
+
+    # Read-modify-write operations run under the exclusive lock, so they
+    # load the latest snapshot and log and nobody writes in between.
+
+    def add_habit(self, name, periodicity):
+        with self._locked():
+            return super().add_habit(name, periodicity)
+
+    def add_completions(self, completions, outcomes=None):
+        with self._locked():
+            return super().add_completions(completions, outcomes)
+
+    def update_habit(self, habit_id, **kwargs):
+        with self._locked():
+            return super().update_habit(habit_id, **kwargs)
+
+    def delete_habit(self, habit_id):
+        with self._locked():
+            return super().delete_habit(habit_id)
+
+    def rebuild_streaks(self):
+        with self._locked():
+            return super().rebuild_streaks()
+
+    def rebuild_rollups(self):
+        with self._locked():
+            return super().rebuild_rollups()
+
+
+class ConcurrentJSONStorage(JSONStorage):
+    """JSONStorage that several processes can write to at the same time.
+
+    Reads take no lock (files are replaced atomically, so a reader always
+    sees a whole document). Writes are optimistic: the change is computed
+    without a lock, then an fcntl lock on a sidecar file is held only for
+    the compare-and-swap. If another writer replaced the file since it was
+    read, the whole operation is retried on fresh data. The document's
+    "version" counter goes up by one on every write.
+    """
+
+    def __init__(self, file_path="habits.json", max_retries=20):
+        super().__init__(file_path)
+        self.lock_path = self.file_path.with_name(f".{self.file_path.name}.lock")
+        self.max_retries = max_retries
+        self._thread_lock = threading.Lock()
+        self._loaded = None
+
+    @contextmanager
+    def _write_lock(self):
+        with self._thread_lock, open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def _signature(stat):
+        # os.replace gives every written file a new inode.
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    @profiling.timed("storage.load_data")
+    def _load_data(self):
+        """Load the document and remember which file version it came from."""
+        with open(self.file_path, "r") as file:
+            stat = os.fstat(file.fileno())
+            data = self._read_document(file)
+        data.setdefault("version", 0)
+        self._loaded = (data, self._signature(stat))
+        self._last_read = (data, (stat.st_mtime_ns, stat.st_size))
+        return data
+
+    def _save_data(self, data):
+        """Write data if nobody else wrote since it was loaded.
+
+        Raises:
+            StorageConflictError: If the file changed since data was loaded
+        """
+        self._validate_data(data)
+        with self._write_lock():
+            loaded_data, signature = self._loaded
+            if loaded_data is not data or self._signature(os.stat(self.file_path)) != signature:
+                raise StorageConflictError("habits.json changed since it was read")
+            data["version"] = data.get("version", 0) + 1
+            super()._save_data(data)
+
+    def _retry(self, operation, *args, **kwargs):
+        """Run a read-modify-write operation until it wins the compare-and-swap."""
+        for attempt in range(self.max_retries):
+            try:
+                return operation(*args, **kwargs)
+            except StorageConflictError:
+                time.sleep(random.uniform(0, 0.001 * 2 ** min(attempt, 6)))
+        raise StorageConflictError(f"Gave up after {self.max_retries} conflicting writes")
+
+    def add_habit(self, name, periodicity):
+        return self._retry(super().add_habit, name, periodicity)
+
+    def complete_habit(self, habit_id):
+        return self._retry(super().complete_habit, habit_id)
+
+    def add_completions(self, completions, outcomes=None):
+        # The iterable may be a one-shot stream, so keep it for retries.
+        return self._retry(super().add_completions, list(completions), outcomes)
+
+    def update_habit(self, habit_id, **kwargs):
+        return self._retry(super().update_habit, habit_id, **kwargs)
+
+    def delete_habit(self, habit_id):
+        return self._retry(super().delete_habit, habit_id)
+
+    def rebuild_streaks(self):
+        return self._retry(super().rebuild_streaks)
+
+    def rebuild_rollups(self):
+        return self._retry(super().rebuild_rollups)
+
+
+class SQLiteStorage:
+    """Storage backend on a SQLite database with the same interface as JSONStorage.
+
+    Completions are indexed on (habit_id, completed_at), so looking up or
+    deleting one habit's history no longer scans every completion.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS habits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            periodicity TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            description TEXT NOT NULL DEFAULT '',
+            target_streak INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS completions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            habit_id INTEGER NOT NULL REFERENCES habits(id) ON DELETE CASCADE,
+            completed_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS streaks (
+            habit_id INTEGER PRIMARY KEY REFERENCES habits(id) ON DELETE CASCADE,
+            current INTEGER NOT NULL,
+            longest INTEGER NOT NULL,
+            last_completed_at TEXT
+        );
+        CREATE TABLE IF NOT EXISTS rollups (
+            habit_id INTEGER NOT NULL REFERENCES habits(id) ON DELETE CASCADE,
+            granularity TEXT NOT NULL,
+            period TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (habit_id, granularity, period)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS analytics_settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_completions_habit_time
+            ON completions (habit_id, completed_at);
+        CREATE INDEX IF NOT EXISTS idx_habits_periodicity
+            ON habits (periodicity);
+    """
+
+    HABIT_COLUMNS = ["id", "name", "periodicity", "created_at", "description", "target_streak"]
+
+    # PRAGMA user_version from which the rollups table is kept up to date;
+    # older databases get their rollups built once when opened.
+    ROLLUPS_VERSION = 1
+
+    def __init__(self, file_path="habits.db"):
+        self.file_path = Path(file_path)
+        self._transaction_depth = 0
+        self._conn = sqlite3.connect(str(self.file_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        with self._conn:
+            self._conn.executescript(self.SCHEMA)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO analytics_settings (key, value) VALUES (?, ?)",
+                [
+                    ("graph_directory", json.dumps("graphs")),
+                    ("default_periodicities", json.dumps(["daily", "weekly", "monthly"])),
+                ],
+            )
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] < self.ROLLUPS_VERSION:
+                for habit in self.get_habits():
+                    self._build_rollup(habit["id"])
+                self._conn.execute(f"PRAGMA user_version = {self.ROLLUPS_VERSION}")
+
+    @property
+    def generation(self):
+        """Token that changes whenever the stored data may have changed.
+
+        total_changes counts writes on this connection, data_version
+        changes when another connection commits.
+        """
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        return self._conn.total_changes, data_version
+
+    def close(self):
+        """Close the database connection."""
+        self._conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Group writes into one transaction.
+
+        Everything written inside the block is committed when it ends, or
+        rolled back if it raises. Writes made by the storage methods join
+        the enclosing transaction instead of committing on their own.
+        """
+        if self._transaction_depth:
+            self._transaction_depth += 1
+            try:
+                yield
+            finally:
+                self._transaction_depth -= 1
+            return
+        self._transaction_depth = 1
+        try:
+            with self._conn:
+                yield
+        finally:
+            self._transaction_depth = 0
+
+    def add_habit(self, name, periodicity):
+        """Add a new habit with validation.
+
+        Args:
+            name (str): Name of the habit
+            periodicity (str): One of 'daily', 'weekly', or 'monthly'
+
+        Raises:
+            ValueError: If periodicity is invalid
+        """
+        if periodicity not in ["daily", "weekly", "monthly"]:
+            raise ValueError("Periodicity must be 'daily', 'weekly', or 'monthly'")
+
+        with self.transaction():
+            cursor = self._conn.execute(
+                "INSERT INTO habits (name, periodicity, created_at) VALUES (?, ?, ?)",
+                (name, periodicity, datetime.now().isoformat()),
+            )
+        return cursor.lastrowid
+
+    def complete_habit(self, habit_id):
+        """Mark a habit as completed with validation.
+
+        Args:
+            habit_id (int): ID of the habit to complete
+
+        Returns:
+            bool: True if successful, False if habit doesn't exist
+        """
+        habit = self.get_habit_by_id(habit_id)
+        if habit is None:
+            return False
+
+        completed_at = datetime.now().isoformat()
+        with self.transaction():
+            self._conn.execute(
+                "INSERT INTO completions (habit_id, completed_at) VALUES (?, ?)",
+                (habit_id, completed_at),
+            )
+            self._record_streak(habit, completed_at)
+            self._record_rollup(habit_id, completed_at)
+        return True
+
+    def add_completions(self, completions, chunk_size=10000, outcomes=None):
+        """Add many completions, committing once per chunk_size rows.
+
+        Args:
+            completions: Iterable of (habit_id, timestamp) pairs, timestamps
+                as datetime objects or ISO strings
+            chunk_size (int): Rows per INSERT batch
+            outcomes (list, optional): Filled with "added", "duplicates",
+                "unknown_habit" or "invalid" for every pair, in order
+
+        Returns:
+            dict: Counts of "added", "duplicates", "unknown_habit" and
+            "invalid" entries
+        """
+        known_ids = {row[0] for row in self._conn.execute("SELECT id FROM habits")}
+        new, summary = _collect_new_completions(completions, known_ids, self.get_completion_times, outcomes)
+        rows = [
+            (habit_id, from_epoch_us(t).isoformat())
+            for habit_id, times in new.items()
+            for t in times
+        ]
+        for start in range(0, len(rows), chunk_size):
+            with self.transaction():
+                self._conn.executemany(
+                    "INSERT INTO completions (habit_id, completed_at) VALUES (?, ?)",
+                    rows[start:start + chunk_size],
+                )
+        with self.transaction():
+            for habit_id in new:
+                self._build_streak(self.get_habit_by_id(habit_id))
+                self._build_rollup(habit_id)
+        return summary
+
+    def get_habits(self, periodicity=None):
+        """Retrieve habits, optionally filtered by periodicity.
+
+        Args:
+            periodicity (str, optional): Filter by 'daily', 'weekly', or 'monthly'
+
+        Returns:
+            list: List of habit dictionaries
+        """
+        if periodicity:
+            rows = self._conn.execute(
+                "SELECT * FROM habits WHERE periodicity = ? ORDER BY id", (periodicity,)
+            )
+        else:
+            rows = self._conn.execute("SELECT * FROM habits ORDER BY id")
+        return [dict(row) for row in rows]
+
+    def get_completions(self, habit_id, limit=None, latest=False, since=None, until=None):
+        """Retrieve completions for a specific habit.
+
+        Args:
+            habit_id (int): ID of the habit
+            limit (int, optional): Maximum number of completions to return
+            latest (bool): Return the most recent `limit` completions
+                instead of the oldest ones
+            since (datetime or str, optional): Only completions at or after this time
+            until (datetime or str, optional): Only completions before this time
+
+        Returns:
+            list: List of completion timestamps (ISO format), oldest first
+        """
+        order = "DESC" if limit and latest else "ASC"
+        query = "SELECT completed_at FROM completions WHERE habit_id = ?"
+        params = [habit_id]
+        # ISO strings sort chronologically, so range bounds use the
+        # (habit_id, completed_at) index.
+        if since is not None:
+            query += " AND completed_at >= ?"
+            params.append(from_epoch_us(to_epoch_us(since)).isoformat())
+        if until is not None:
+            query += " AND completed_at < ?"
+            params.append(from_epoch_us(to_epoch_us(until)).isoformat())
+        query += f" ORDER BY completed_at {order}"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        completions = [row[0] for row in self._conn.execute(query, params)]
+        if order == "DESC":
+            completions.reverse()
+        return completions
+
+    def get_completion_times(self, habit_id, since=None, until=None):
+        """Retrieve completions for a specific habit in compact form.
+
+        Args:
+            habit_id (int): ID of the habit
+            since (datetime or str, optional): Only completions at or after this time
+            until (datetime or str, optional): Only completions before this time
+
+        Returns:
+            array: array('q') of epoch microseconds, oldest first
+        """
+        return pack_timestamps(self.get_completions(habit_id, since=since, until=until), assume_sorted=True)
+
+    def get_all_completion_times(self):
+        """Retrieve the completions of every habit in one query, in compact form.
+
+        Returns:
+            dict: {habit_id: array('q') of epoch microseconds, oldest first}
+        """
+        return {
+            habit_id: pack_timestamps(completions, assume_sorted=True)
+            for habit_id, completions in self.get_all_completions().items()
+        }
+
+    def get_all_completions(self):
+        """Retrieve the completions of every habit in one query.
+
+        Returns:
+            dict: {habit_id: list of completion timestamps (ISO format), oldest first}
+        """
+        completions_by_habit = {row[0]: [] for row in self._conn.execute("SELECT id FROM habits")}
+        rows = self._conn.execute(
+            "SELECT habit_id, completed_at FROM completions ORDER BY habit_id, completed_at"
+        )
+        for habit_id, completed_at in rows:
+            completions_by_habit.setdefault(habit_id, []).append(completed_at)
+        return completions_by_habit
+
+    def get_habit_by_id(self, habit_id):
+        """Get a specific habit by its ID.
+
+        Args:
+            habit_id (int): ID of the habit
+
+        Returns:
+            dict: Habit data or None if not found
+        """
+        row = self._conn.execute("SELECT * FROM habits WHERE id = ?", (habit_id,)).fetchone()
+        return dict(row) if row else None
+
+    def update_habit(self, habit_id, **kwargs):
+        """Update habit properties.
+
+        Args:
+            habit_id (int): ID of the habit to update
+            **kwargs: Fields to update (name, periodicity, description, etc.)
+
+        Returns:
+            bool: True if successful, False if habit doesn't exist
+        """
+        fields = {k: v for k, v in kwargs.items() if k in self.HABIT_COLUMNS and k != "id"}
+        if not fields:
+            return self.get_habit_by_id(habit_id) is not None
+
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self.transaction():
+            cursor = self._conn.execute(
+                f"UPDATE habits SET {assignments} WHERE id = ?",
+                [*fields.values(), habit_id],
+            )
+            if "periodicity" in fields:
+                self._conn.execute("DELETE FROM streaks WHERE habit_id = ?", (habit_id,))
+        return cursor.rowcount == 1
+
+    def delete_habit(self, habit_id):
+        """Delete a habit and its completions.
+
+        Args:
+            habit_id (int): ID of the habit to delete
+
+        Returns:
+            bool: True if successful, False if habit doesn't exist
+        """
+        with self.transaction():
+            self._conn.execute("DELETE FROM completions WHERE habit_id = ?", (habit_id,))
+            self._conn.execute("DELETE FROM streaks WHERE habit_id = ?", (habit_id,))
+            self._conn.execute("DELETE FROM rollups WHERE habit_id = ?", (habit_id,))
+            cursor = self._conn.execute("DELETE FROM habits WHERE id = ?", (habit_id,))
+        return cursor.rowcount == 1
+
+    def get_analytics_settings(self):
+        """Get analytics configuration.
+
+        Returns:
+            dict: Analytics settings including graph directory
+        """
+        rows = self._conn.execute("SELECT key, value FROM analytics_settings")
+        return {key: json.loads(value) for key, value in rows}
+
+    def get_habits_by_periodicity(self, periodicity):
+        """Retrieve all habits with a specific periodicity.
+
+        Args:
+            periodicity: 'daily', 'weekly', or 'monthly'
+
+        Returns:
+            List of habit dictionaries matching the periodicity
+        """
+        return self.get_habits(periodicity)
+
+    def _store_streak(self, habit_id, state):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO streaks (habit_id, current, longest, last_completed_at) "
+            "VALUES (?, ?, ?, ?)",
+            (habit_id, state["current"], state["longest"], state["last_completed_at"]),
+        )
+
+    def _load_streak(self, habit_id):
+        row = self._conn.execute(
+            "SELECT current, longest, last_completed_at FROM streaks WHERE habit_id = ?",
+            (habit_id,),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def _record_streak(self, habit, completed_at):
+        """Advance the stored streak state of a habit by one new completion."""
+        state = self._load_streak(habit["id"])
+        if state is None:
+            self._build_streak(habit)
+            return
+        try:
+            state = advance_streak_state(
+                state, datetime.fromisoformat(completed_at), habit["periodicity"]
+            )
+        except ValueError:
+            self._build_streak(habit)
+            return
+        self._store_streak(habit["id"], state)
+
+    def _build_streak(self, habit):
+        """Rebuild and store the streak state of a habit from its completions."""
+        state = build_streak_state(self.get_completion_times(habit["id"]), habit["periodicity"])
+        self._store_streak(habit["id"], state)
+        return state
+
+    def get_streak_state(self, habit_id):
+        """Get the stored streak state of a habit.
+
+        Args:
+            habit_id (int): ID of the habit
+
+        Returns:
+            dict: {"current", "longest", "last_completed_at"} or None if the
+            habit doesn't exist
+        """
+        habit = self.get_habit_by_id(habit_id)
+        if habit is None:
+            return None
+        state = self._load_streak(habit_id)
+        if state is None:
+            with self.transaction():
+                state = self._build_streak(habit)
+        return state
+
+    def get_streak_states(self):
+        """Get the stored streak state of every habit.
+
+        Returns:
+            dict: {habit_id: {"current", "longest", "last_completed_at"}}
+        """
+        rows = self._conn.execute(
+            "SELECT habits.*, streaks.current, streaks.longest, streaks.last_completed_at "
+            "FROM habits LEFT JOIN streaks ON streaks.habit_id = habits.id ORDER BY habits.id"
+        ).fetchall()
+        states = {}
+        for row in rows:
+            if row["current"] is None:
+                with self.transaction():
+                    states[row["id"]] = self._build_streak(dict(row))
+            else:
+                states[row["id"]] = {
+                    "current": row["current"],
+                    "longest": row["longest"],
+                    "last_completed_at": row["last_completed_at"],
+                }
+        return states
+
+    def rebuild_streaks(self):
+        """Recompute every habit's streak state from its full history and save it."""
+        with self.transaction():
+            self._conn.execute("DELETE FROM streaks")
+            for habit in self.get_habits():
+                self._build_streak(habit)
+
+    def _record_rollup(self, habit_id, completed_at):
+        """Count one new completion in the rollups table."""
+        moment = datetime.fromisoformat(completed_at)
+        rows = [(habit_id, granularity, period_key(moment, granularity))
+                for granularity in ROLLUP_GRANULARITIES]
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO rollups (habit_id, granularity, period, count) VALUES (?, ?, ?, 0)",
+            rows,
+        )
+        self._conn.executemany(
+            "UPDATE rollups SET count = count + 1 WHERE habit_id = ? AND granularity = ? AND period = ?",
+            rows,
+        )
+
+    def _build_rollup(self, habit_id):
+        """Rebuild the rollup rows of a habit from its completions."""
+        rollup = build_rollup(self.get_completion_times(habit_id))
+        self._conn.execute("DELETE FROM rollups WHERE habit_id = ?", (habit_id,))
+        self._conn.executemany(
+            "INSERT INTO rollups (habit_id, granularity, period, count) VALUES (?, ?, ?, ?)",
+            [
+                (habit_id, granularity, period, count)
+                for granularity, counts in rollup.items()
+                for period, count in counts.items()
+            ],
+        )
+        return rollup
+
+    def get_rollup(self, habit_id, granularity, since=None, until=None):
+        """Get a habit's completion counts per period from the rollups table.
+
+        Args:
+            habit_id (int): ID of the habit
+            granularity (str): 'daily', 'weekly' or 'monthly'
+            since (datetime or str, optional): Only periods ending after this time
+            until (datetime or str, optional): Only periods starting before this time
+
+        Returns:
+            dict: {period key: count} in chronological order, periods
+            without completions left out; empty if the habit doesn't exist
+        """
+        if granularity not in ROLLUP_GRANULARITIES:
+            raise ValueError("Granularity must be 'daily', 'weekly', or 'monthly'")
+        first, last = period_bounds(granularity, since, until)
+        query = "SELECT period, count FROM rollups WHERE habit_id = ? AND granularity = ?"
+        params = [habit_id, granularity]
+        if first is not None:
+            query += " AND period >= ?"
+            params.append(first)
+        if last is not None:
+            query += " AND period <= ?"
+            params.append(last)
+        return {period: count for period, count in self._conn.execute(query + " ORDER BY period", params)}
+
+    def rebuild_rollups(self):
+        """Recompute every habit's rollup from its full history."""
+        with self.transaction():
+            for habit in self.get_habits():
+                self._build_rollup(habit["id"])
+
+
+class ShardedStorage:
+    """Storage backend on a directory of small JSON files.
+
+    Layout, with one subdirectory per habit:
+
+        catalog.json            habits, analytics settings, the next habit id
+                                and a generation counter bumped by every write
+        <habit id>/streak.json  streak state of the habit
+        <habit id>/rollup.json  completion counts of the habit per period
+        <habit id>/YYYY-MM.json completions of the habit in that month
+
+    A check-in rewrites one month shard, the habit's streak state and
+    rollup, and the small catalog (for its generation) instead of the whole
+    history, range queries only read the months they
+    cover, and deleting a habit removes its directory. Parsed files are
+    cached until their mtime or size changes; at most shard_cache_size
+    month shards are kept, least recently used first out.
+    """
+
+    CATALOG_NAME = "catalog.json"
+    STREAK_NAME = "streak.json"
+    ROLLUP_NAME = "rollup.json"
+
+    def __init__(self, file_path="habits.d", shard_cache_size=256):
+        self.file_path = Path(file_path)
+        self.catalog_path = self.file_path / self.CATALOG_NAME
+        self.shard_cache_size = shard_cache_size
+        self._writes = 0
+        self._catalog = None
+        self._catalog_signature = None
+        self._shards = OrderedDict()
+        self.file_path.mkdir(parents=True, exist_ok=True)
+        if not self.catalog_path.exists():
+            self._save_catalog({
+                "habits": [],
+                "next_habit_id": 1,
+                "analytics_settings": {
+                    "graph_directory": "graphs",
+                    "default_periodicities": ["daily", "weekly", "monthly"]
+                }
+            })
+
+    @property
+    def generation(self):
+        """Token that changes whenever the stored data may have changed.
+
+        Every write bumps the generation counter in catalog.json, so one
+        stat() of the catalog (and a re-read once it changed) covers
+        changes made by other processes.
+        """
+        catalog = self._load_catalog()
+        return self._writes, self._catalog_signature, catalog.get("generation", 0)
+
+    @staticmethod
+    def _signature(path):
+        """Return (mtime_ns, size) of path, or None if it doesn't exist."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @profiling.timed("storage.load_catalog")
+    def _load_catalog(self):
+        """Return the catalog, re-reading catalog.json only if it changed."""
+        signature = self._signature(self.catalog_path)
+        if self._catalog is None or signature != self._catalog_signature:
+            with open(self.catalog_path, "r") as file:
+                self._catalog = json.load(file)
+            if profiling.is_enabled():
+                profiling.add_bytes("storage.load_catalog", signature[1])
+            self._catalog_signature = signature
+        return self._catalog
+
+    @profiling.timed("storage.save_catalog")
+    def _save_catalog(self, catalog):
+        """Write the catalog and bump its generation; completion shards are left untouched."""
+        self._writes += 1
+        catalog["generation"] = catalog.get("generation", 0) + 1
+        _atomic_write_text(self.catalog_path, json.dumps(catalog, indent=4), "storage.save_catalog")
+        self._catalog = catalog
+        self._catalog_signature = self._signature(self.catalog_path)
+
+    def _find_habit(self, habit_id):
+        """Return the catalog entry of a habit, or None."""
+        return next((h for h in self._load_catalog()["habits"] if h["id"] == habit_id), None)
+
+    def _habit_dir(self, habit_id):
+        return self.file_path / str(habit_id)
+
+    def _months(self, habit_id):
+        """Return the months (YYYY-MM) that have a shard, oldest first."""
+        try:
+            names = os.listdir(self._habit_dir(habit_id))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-5] for name in names
+                      if name.endswith(".json") and name not in (self.STREAK_NAME, self.ROLLUP_NAME))
+
+    @staticmethod
+    def _month_of(value):
+        """Return the YYYY-MM shard name of epoch microseconds."""
+        return from_epoch_us(value).strftime("%Y-%m")
+
+    @profiling.timed("storage.load_shard")
+    def _read_shard(self, habit_id, month):
+        """Return the completions of one month as a sorted array('q')."""
+        path = self._habit_dir(habit_id) / f"{month}.json"
+        signature = self._signature(path)
+        cached = self._shards.get(path)
+        if cached is not None and cached[0] == signature:
+            self._shards.move_to_end(path)
+            return cached[1]
+        if signature is None:
+            self._shards.pop(path, None)
+            return array('q')
+        with open(path, "r") as file:
+            times = pack_timestamps(json.load(file), assume_sorted=True)
+        if profiling.is_enabled():
+            profiling.add_bytes("storage.load_shard", signature[1])
+        self._cache_shard(path, signature, times)
+        return times
+
+    def _cache_shard(self, path, signature, times):
+        """Keep a parsed shard, evicting the least recently used beyond shard_cache_size."""
+        self._shards[path] = (signature, times)
+        self._shards.move_to_end(path)
+        while len(self._shards) > self.shard_cache_size:
+            self._shards.popitem(last=False)
+
+    @profiling.timed("storage.save_shard")
+    def _write_shard(self, habit_id, month, times):
+        """Replace the shard of one month with times (sorted epoch microseconds)."""
+        habit_dir = self._habit_dir(habit_id)
+        habit_dir.mkdir(exist_ok=True)
+        path = habit_dir / f"{month}.json"
+        self._writes += 1
+        _atomic_write_text(path, json.dumps(format_timestamps(times)), "storage.save_shard")
+        self._cache_shard(path, self._signature(path), times)
+
+    def _load_habit_file(self, habit_id, name):
+        """Return the parsed per-habit file name (streak or rollup), or None."""
+        try:
+            with open(self._habit_dir(habit_id) / name, "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    @profiling.timed("storage.save_habit_file")
+    def _store_habit_file(self, habit_id, name, value):
+        """Write (or with value None, remove) a per-habit file."""
+        path = self._habit_dir(habit_id) / name
+        self._writes += 1
+        if value is None:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            return
+        path.parent.mkdir(exist_ok=True)
+        _atomic_write_text(path, json.dumps(value), "storage.save_habit_file")
+
+    def _load_streak(self, habit_id):
+        """Return the stored streak state of a habit, or None."""
+        return self._load_habit_file(habit_id, self.STREAK_NAME)
+
+    def _store_streak(self, habit_id, state):
+        """Write (or with state None, remove) the streak state of a habit."""
+        self._store_habit_file(habit_id, self.STREAK_NAME, state)
+
+    def _build_rollup(self, habit_id):
+        """Rebuild and store the rollup of a habit from its completions."""
+        rollup = build_rollup(self.get_completion_times(habit_id))
+        self._store_habit_file(habit_id, self.ROLLUP_NAME, rollup)
+        return rollup
+
+    def _build_streak(self, habit):
+        """Rebuild and store the streak state of a habit from its completions."""
+        state = build_streak_state(self.get_completion_times(habit["id"]), habit["periodicity"])
+        self._store_streak(habit["id"], state)
+        return state
+
+    def add_habit(self, name, periodicity):
+        """Add a new habit with validation.
+
+        Args:
+            name (str): Name of the habit
+            periodicity (str): One of 'daily', 'weekly', or 'monthly'
+
+        Raises:
+            ValueError: If periodicity is invalid
+        """
+        if periodicity not in ["daily", "weekly", "monthly"]:
+            raise ValueError("Periodicity must be 'daily', 'weekly', or 'monthly'")
+
+        catalog = self._load_catalog()
+        habit = {
+            "id": JSONStorage._next_habit_id(catalog),
+            "name": name,
+            "periodicity": periodicity,
+            "created_at": datetime.now().isoformat(),
+            "description": "",
+            "target_streak": 0
+        }
+        catalog["habits"].append(habit)
+        self._save_catalog(catalog)
+        return habit["id"]
+
+    def complete_habit(self, habit_id):
+        """Mark a habit as completed, rewriting only the current month's shard.
+
+        Args:
+            habit_id (int): ID of the habit to complete
+
+        Returns:
+            bool: True if successful, False if habit doesn't exist
+        """
+        habit = self._find_habit(habit_id)
+        if habit is None:
+            return False
+
+        completed_at = datetime.now()
+        value = to_epoch_us(completed_at)
+        month = self._month_of(value)
+        times = array('q', self._read_shard(habit_id, month))
+        bisect.insort(times, value)
+        self._write_shard(habit_id, month, times)
+        self._save_catalog(self._load_catalog())
+
+        state = self._load_streak(habit_id)
+        try:
+            if state is None:
+                raise ValueError("no stored streak state")
+            self._store_streak(habit_id, advance_streak_state(state, completed_at, habit["periodicity"]))
+        except ValueError:
+            self._build_streak(habit)
+
+        rollup = self._load_habit_file(habit_id, self.ROLLUP_NAME)
+        if rollup is None:
+            self._build_rollup(habit_id)
+        else:
+            self._store_habit_file(habit_id, self.ROLLUP_NAME, advance_rollup(rollup, completed_at))
+        return True
+
+    def add_completions(self, completions, outcomes=None):
+        """Add many completions, rewriting each affected month shard once.
+
+        Args:
+            completions: Iterable of (habit_id, timestamp) pairs, timestamps
+                as datetime objects or ISO strings
+            outcomes (list, optional): Filled with "added", "duplicates",
+                "unknown_habit" or "invalid" for every pair, in order
+
+        Returns:
+            dict: Counts of "added", "duplicates", "unknown_habit" and
+            "invalid" entries
+        """
+        habits_by_id = {h["id"]: h for h in self._load_catalog()["habits"]}
+        new, summary = _collect_new_completions(completions, habits_by_id.keys(), self.get_completion_times,
+                                                outcomes)
+        for habit_id, times in new.items():
+            by_month = {}
+            for value in times:
+                by_month.setdefault(self._month_of(value), []).append(value)
+            for month, values in by_month.items():
+                merged = sorted(self._read_shard(habit_id, month).tolist() + values)
+                self._write_shard(habit_id, month, array('q', merged))
+            self._build_streak(habits_by_id[habit_id])
+            self._build_rollup(habit_id)
+        if new:
+            self._save_catalog(self._load_catalog())
+        return summary
+
+    def get_habits(self, periodicity=None):
+        """Retrieve habits, optionally filtered by periodicity.
+
+        Args:
+            periodicity (str, optional): Filter by 'daily', 'weekly', or 'monthly'
+
+        Returns:
+            list: List of habit dictionaries
+        """
+        habits = self._load_catalog()["habits"]
+        if periodicity:
+            habits = [h for h in habits if h["periodicity"] == periodicity]
+        return [dict(h) for h in habits]
+
+    def get_completions(self, habit_id, limit=None, latest=False, since=None, until=None):
+        """Retrieve completions for a specific habit.
+
+        Args:
+            habit_id (int): ID of the habit
+            limit (int, optional): Maximum number of completions to return
+            latest (bool): Return the most recent `limit` completions
+                instead of the oldest ones
+            since (datetime or str, optional): Only completions at or after this time
+            until (datetime or str, optional): Only completions before this time
+
+        Returns:
+            list: List of completion timestamps (ISO format), oldest first
+        """
+        if limit and latest and since is None and until is None:
+            # Read shards newest first and stop once enough are collected.
+            collected = array('q')
+            for month in reversed(self._months(habit_id)):
+                collected = self._read_shard(habit_id, month) + collected
+                if len(collected) >= limit:
+                    break
+            return format_timestamps(collected[-limit:])
+
+        completions = self.get_completion_times(habit_id, since=since, until=until)
+        if limit:
+            completions = completions[-limit:] if latest else completions[:limit]
+        return format_timestamps(completions)
+
+    def get_completion_times(self, habit_id, since=None, until=None):
+        """Retrieve completions for a specific habit in compact form.
+
+        Only the month shards overlapping [since, until) are read.
+
+        Args:
+            habit_id (int): ID of the habit
+            since (datetime or str, optional): Only completions at or after this time
+            until (datetime or str, optional): Only completions before this time
+
+        Returns:
+            array: array('q') of epoch microseconds, oldest first
+        """
+        first = self._month_of(to_epoch_us(since)) if since is not None else None
+        last = self._month_of(to_epoch_us(until) - 1) if until is not None else None
+        times = array('q')
+        for month in self._months(habit_id):
+            if (first is None or month >= first) and (last is None or month <= last):
+                times.extend(self._read_shard(habit_id, month))
+        if since is None and until is None:
+            return times
+        return slice_range(times, since, until)
+
+    def get_all_completions(self):
+        """Retrieve the completions of every habit.
+
+        Returns:
+            dict: {habit_id: list of completion timestamps (ISO format), oldest first}
+        """
+        return {
+            habit_id: format_timestamps(times)
+            for habit_id, times in self.get_all_completion_times().items()
+        }
+
+    def get_all_completion_times(self):
+        """Retrieve the completions of every habit, in compact form.
+
+        Returns:
+            dict: {habit_id: array('q') of epoch microseconds, oldest first}
+        """
+        return {
+            habit["id"]: self.get_completion_times(habit["id"])
+            for habit in self._load_catalog()["habits"]
+        }
+
+    def get_habit_by_id(self, habit_id):
+        """Get a specific habit by its ID.
+
+        Args:
+            habit_id (int): ID of the habit
+
+        Returns:
+            dict: Habit data or None if not found
+        """
+        habit = self._find_habit(habit_id)
+        return dict(habit) if habit else None
+
+    def update_habit(self, habit_id, **kwargs):
+        """Update habit properties. Like SQLiteStorage, ids can't be changed.
+
+        Args:
+            habit_id (int): ID of the habit to update
+            **kwargs: Fields to update (name, periodicity, description, etc.)
+
+        Returns:
+            bool: True if successful, False if habit doesn't exist
+        """
+        catalog = self._load_catalog()
+        habit = next((h for h in catalog["habits"] if h["id"] == habit_id), None)
+        if habit is None:
+            return False
+        for key, value in kwargs.items():
+            if key in habit and key != "id":
+                habit[key] = value
+        self._save_catalog(catalog)
+        if "periodicity" in kwargs:
+            self._store_streak(habit_id, None)
+        return True
+
+    def delete_habit(self, habit_id):
+        """Delete a habit by removing it from the catalog and deleting its shards.
+
+        Args:
+            habit_id (int): ID of the habit to delete
+
+        Returns:
+            bool: True if successful, False if habit doesn't exist
+        """
+        catalog = self._load_catalog()
+        habit = next((h for h in catalog["habits"] if h["id"] == habit_id), None)
+        if habit is None:
+            return False
+
+        catalog["habits"].remove(habit)
+        self._save_catalog(catalog)
+        habit_dir = self._habit_dir(habit_id)
+        shutil.rmtree(habit_dir, ignore_errors=True)
+        for path in [path for path in self._shards if path.parent == habit_dir]:
+            del self._shards[path]
+        return True
+
+    def get_analytics_settings(self):
+        """Get analytics configuration.
+
+        Returns:
+            dict: Analytics settings including graph directory
+        """
+        return self._load_catalog().get("analytics_settings", {})
+
+    def get_habits_by_periodicity(self, periodicity):
+        """Retrieve all habits with a specific periodicity.
+
+        Args:
+            periodicity: 'daily', 'weekly', or 'monthly'
+
+        Returns:
+            List of habit dictionaries matching the periodicity
+        """
+        return self.get_habits(periodicity)
+
+    def get_streak_state(self, habit_id):
+        """Get the stored streak state of a habit.
+
+        Args:
+            habit_id (int): ID of the habit
+
+        Returns:
+            dict: {"current", "longest", "last_completed_at"} or None if the
+            habit doesn't exist
+        """
+        habit = self._find_habit(habit_id)
+        if habit is None:
+            return None
+        return self._load_streak(habit_id) or self._build_streak(habit)
+
+    def get_streak_states(self):
+        """Get the stored streak state of every habit.
+
+        Returns:
+            dict: {habit_id: {"current", "longest", "last_completed_at"}}
+        """
+        return {
+            habit["id"]: self._load_streak(habit["id"]) or self._build_streak(habit)
+            for habit in self._load_catalog()["habits"]
+        }
+
+    def rebuild_streaks(self):
+        """Recompute every habit's streak state from its full history and save it."""
+        catalog = self._load_catalog()
+        for habit in catalog["habits"]:
+            self._build_streak(habit)
+        self._save_catalog(catalog)
+
+    def get_rollup(self, habit_id, granularity, since=None, until=None):
+        """Get a habit's completion counts per period from its stored rollup.
+
+        Args:
+            habit_id (int): ID of the habit
+            granularity (str): 'daily', 'weekly' or 'monthly'
+            since (datetime or str, optional): Only periods ending after this time
+            until (datetime or str, optional): Only periods starting before this time
+
+        Returns:
+            dict: {period key: count} in chronological order, periods
+            without completions left out; empty if the habit doesn't exist
+        """
+        if granularity not in ROLLUP_GRANULARITIES:
+            raise ValueError("Granularity must be 'daily', 'weekly', or 'monthly'")
+        if self._find_habit(habit_id) is None:
+            return {}
+        rollup = self._load_habit_file(habit_id, self.ROLLUP_NAME) or self._build_rollup(habit_id)
+        return rollup_range(rollup.get(granularity, {}), granularity, since, until)
+
+    def rebuild_rollups(self):
+        """Recompute every habit's rollup from its full history and save it."""
+        catalog = self._load_catalog()
+        for habit in catalog["habits"]:
+            self._build_rollup(habit["id"])
+        self._save_catalog(catalog)
+
+
+def migrate_json_to_sqlite(json_path="habits.json", db_path="habits.db"):
+    """Import an existing habits.json into a SQLite database.
+
+    Habit ids are kept, so completions keep pointing at the right habit.
+    The import runs in one transaction; habits that already exist in the
+    database are left untouched.
+
+    Args:
+        json_path: Path of the JSON file to import
+        db_path: Path of the SQLite database to create or fill
+
+    Returns:
+        SQLiteStorage: The storage opened on db_path
+    """
+    with open(json_path, "r") as file:
+        data = json.load(file)
+
+    storage = SQLiteStorage(db_path)
+    conn = storage._conn
+    existing = {row[0] for row in conn.execute("SELECT id FROM habits")}
+    habits = [h for h in data.get("habits", []) if h["id"] not in existing]
+    new_ids = {h["id"] for h in habits}
+    with conn:
+        conn.executemany(
+            "INSERT INTO habits (id, name, periodicity, created_at, description, target_streak) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (h["id"], h["name"], h["periodicity"], h["created_at"],
+                 h.get("description", ""), h.get("target_streak", 0))
+                for h in habits
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO completions (habit_id, completed_at) VALUES (?, ?)",
+            [
+                (c["habit_id"], c["completed_at"])
+                for c in data.get("completions", [])
+                if c["habit_id"] in new_ids
+            ],
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO analytics_settings (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in data.get("analytics_settings", {}).items()],
+        )
+        for habit_id in new_ids:
+            storage._build_rollup(habit_id)
+    return storage
+
+
+STORAGE_BACKENDS = {
+    "json": JSONStorage,
+    "cached": CachedJSONStorage,
+    "append_log": AppendLogStorage,
+    "concurrent": ConcurrentJSONStorage,
+    "sqlite": SQLiteStorage,
+    "sharded": ShardedStorage,
+}
+
+
+def create_storage(backend=None, file_path=None):
+    """Build the storage backend selected by arguments or environment.
+
+    Falls back to the HABIT_TRACKER_BACKEND and HABIT_TRACKER_PATH
+    environment variables, and then to a JSONStorage on habits.json.
+
+    Args:
+        backend (str, optional): One of the keys of STORAGE_BACKENDS
+        file_path (str, optional): Path of the data file
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    backend = backend or os.environ.get("HABIT_TRACKER_BACKEND", "json")
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend '{backend}'. "
+                         f"Choose from: {', '.join(STORAGE_BACKENDS)}")
+
+    file_path = file_path or os.environ.get("HABIT_TRACKER_PATH")
+    if file_path is None:
+        file_path = {"sqlite": "habits.db", "sharded": "habits.d"}.get(backend, "habits.json")
+    return STORAGE_BACKENDS[backend](file_path)
+
+
+_USER_ID_CHARACTERS = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-.@")
+
+
+def user_storage_factory(root=None, backend=None):
+    """Return a factory opening one storage partition per user.
+
+    Every user gets their own file (or directory, for the sharded
+    backend) under root, so users never parse or lock each other's data.
+
+    Args:
+        root (str, optional): Directory of the partitions, defaults to
+            HABIT_TRACKER_USERS_DIR or "users"
+        backend (str, optional): One of the keys of STORAGE_BACKENDS,
+            defaults to HABIT_TRACKER_BACKEND or "cached"
+
+    Returns:
+        callable: factory(user_id) -> storage
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    root = Path(root or os.environ.get("HABIT_TRACKER_USERS_DIR", "users"))
+    backend = backend or os.environ.get("HABIT_TRACKER_BACKEND", "cached")
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend '{backend}'. "
+                         f"Choose from: {', '.join(STORAGE_BACKENDS)}")
+    suffix = {"sqlite": ".db", "sharded": ".d"}.get(backend, ".json")
+
+    def factory(user_id):
+        user_id = str(user_id)
+        if not user_id or user_id.startswith(".") or not set(user_id) <= _USER_ID_CHARACTERS:
+            raise ValueError(f"Invalid user id {user_id!r}")
+        root.mkdir(parents=True, exist_ok=True)
+        return STORAGE_BACKENDS[backend](root / f"{user_id}{suffix}")
+
+    return factory
+
+
+class _PoolEntry:
+    """An open storage in a StoragePool with its lease count and lock."""
+
+    __slots__ = ("storage", "last_used", "leases", "lock", "released")
+
+    def __init__(self, last_used):
+        # Opened by the first lease, outside the pool lock.
+        self.storage = None
+        self.last_used = last_used
+        self.leases = 0
+        # Serialises the callers of one partition; reentrant so nested
+        # leases in one thread don't deadlock.
+        self.lock = threading.RLock()
+        # Set once an evicted storage has been flushed and closed.
+        self.released = threading.Event()
+
+
+class StoragePool:
+    """Bounded pool of open per-user storages.
+
+    Storages are opened on first use through factory and kept open, so
+    their in-memory caches are reused across requests. At most max_open
+    idle storages stay open: the least recently used one is evicted when
+    the pool is full, and storages idle for longer than idle_timeout
+    seconds are evicted on the next lease. Evicted storages are flushed
+    and closed.
+
+    lease() hands a storage out for the duration of a block. A leased
+    storage is never evicted, so nobody closes it mid-call (the pool may
+    briefly hold more than max_open while many are leased), and leases of
+    one user's storage take turns, since the storages themselves are not
+    thread-safe. The pool lock only guards the bookkeeping: storages are
+    opened, flushed and closed under their own partition's lock, so one
+    user's file I/O never holds up another user's lease.
+    """
+
+    def __init__(self, factory=None, max_open=128, idle_timeout=300.0, clock=time.monotonic):
+        self.factory = factory or user_storage_factory()
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        self.evictions = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._open = OrderedDict()
+        # Evicted entries whose storage is still being flushed and closed.
+        self._closing = {}
+
+    def __len__(self):
+        return len(self._open)
+
+    def __contains__(self, user_id):
+        return user_id in self._open
+
+    @contextmanager
+    def lease(self, user_id):
+        """Borrow the storage of a user, opening it if needed.
+
+        Yields:
+            The user's storage, reserved for this block
+        """
+        with self._lock:
+            now = self._clock()
+            evicted = self._evict_idle(now)
+            entry = self._open.pop(user_id, None)
+            previous = None
+            if entry is None:
+                entry = _PoolEntry(now)
+                previous = self._closing.get(user_id)
+            entry.last_used = now
+            entry.leases += 1
+            self._open[user_id] = entry
+            evicted += self._evict_overflow()
+        self._release(evicted)
+        try:
+            with entry.lock:
+                if entry.storage is None:
+                    if previous is not None:
+                        # Let the evicted storage write its changes first.
+                        previous.released.wait()
+                    entry.storage = self.factory(user_id)
+                yield entry.storage
+        finally:
+            with self._lock:
+                entry.leases -= 1
+                entry.last_used = self._clock()
+                if self._open.get(user_id) is entry:
+                    # Keep the entries in order of last use.
+                    self._open.move_to_end(user_id)
+                evicted = self._evict_overflow()
+            self._release(evicted)
+
+    def get(self, user_id):
+        """Return the open storage of a user, opening it if needed.
+
+        The storage is not leased, so it may be closed once evicted; use
+        lease() (or a PooledStorage) when several threads share the pool.
+        """
+        with self.lease(user_id) as storage:
+            return storage
+
+    def evict_idle(self):
+        """Close storages that have been idle too long.
+
+        Returns:
+            int: Number of storages evicted
+        """
+        with self._lock:
+            evicted = self._evict_idle(self._clock())
+        self._release(evicted)
+        return len(evicted)
+
+    def _evict_idle(self, now):
+        """Take idle storages out of the pool (lock held); returns them for _release."""
+        # Entries are in order of last use, so idle ones are at the front.
+        evicted = []
+        for user_id, entry in list(self._open.items()):
+            if now - entry.last_used <= self.idle_timeout:
+                break
+            if entry.leases:
+                continue
+            evicted.append(self._take(user_id))
+        self.evictions += len(evicted)
+        return evicted
+
+    def _evict_overflow(self):
+        """Take the least recently used idle storages beyond max_open out of
+        the pool (lock held); returns them for _release."""
+        evicted = []
+        for user_id, entry in list(self._open.items()):
+            if len(self._open) <= self.max_open:
+                break
+            if entry.leases:
+                continue
+            evicted.append(self._take(user_id))
+        self.evictions += len(evicted)
+        return evicted
+
+    def _take(self, user_id):
+        """Move an entry from the pool to the closing entries (lock held)."""
+        entry = self._open.pop(user_id)
+        self._closing[user_id] = entry
+        return user_id, entry
+
+    def _release(self, evicted):
+        """Flush and close storages taken out of the pool (lock not held)."""
+        for user_id, entry in evicted:
+            try:
+                # Waits for a call still running on the storage.
+                with entry.lock:
+                    flush = getattr(entry.storage, "flush", None)
+                    if flush is not None:
+                        flush()
+                    close = getattr(entry.storage, "close", None)
+                    if close is not None:
+                        close()
+            finally:
+                entry.released.set()
+                with self._lock:
+                    if self._closing.get(user_id) is entry:
+                        del self._closing[user_id]
+
+    def close(self):
+        """Flush and close every open storage."""
+        with self._lock:
+            evicted = [self._take(user_id) for user_id in list(self._open)]
+        self._release(evicted)
+
+
+class PooledStorage:
+    """Storage-like handle on a user's partition in a StoragePool.
+
+    Every attribute access leases the partition from the pool, and every
+    method call runs under its own lease, so the pool can evict the
+    storage between calls but never during one.
+    """
+
+    def __init__(self, pool, user_id):
+        self.pool = pool
+        self.user_id = user_id
+
+    def __getattr__(self, name):
+        with self.pool.lease(self.user_id) as storage:
+            value = getattr(storage, name)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            with self.pool.lease(self.user_id) as leased:
+                return getattr(leased, name)(*args, **kwargs)
+        call.__name__ = name
+        return call
+
+
+_default_pool = None
+
+
+def default_storage_pool():
+    """Return the process-wide StoragePool used by HabitTracker(user_id=...)."""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = StoragePool()
+    return _default_pool
@@ -0,0 +1,169 @@
+"""Progress charts and sparklines rendered as SVG text in pure Python.
+
+An alternative to the matplotlib charts in visualization.py: no imports
+beyond the standard library, and a chart takes well under a millisecond
+to build, so reports with hundreds of habits stay fast. Rendered charts
+are kept in a small LRU cache keyed by the caller's (habit id, data
+version) key.
+"""
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from html import escape
+
+from timestamps import from_epoch_us, pack_timestamps, to_epoch_us
+
+# Number of rendered charts kept by cached_chart().
+CACHE_SIZE = 512
+_cache = OrderedDict()
+_cache_stats = {"hits": 0, "misses": 0}
+
+_DAY_US = 86_400_000_000
+
+
+def cached_chart(key, render, *args, **kwargs):
+    """Return render(*args, **kwargs), reusing the result cached under key.
+
+    key should identify the data, e.g. (habit_id, digest of the
+    completions, chart kind); a new data version simply misses.
+    """
+    svg = _cache.get(key)
+    if svg is not None:
+        _cache.move_to_end(key)
+        _cache_stats["hits"] += 1
+        return svg
+    _cache_stats["misses"] += 1
+    svg = _cache[key] = render(*args, **kwargs)
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return svg
+
+
+def cache_info():
+    """Return hit/miss counters and the number of cached charts."""
+    return dict(_cache_stats, size=len(_cache), maxsize=CACHE_SIZE)
+
+
+def clear_cache():
+    """Forget all cached charts and reset the counters."""
+    _cache.clear()
+    _cache_stats.update(hits=0, misses=0)
+
+
+def _ticks(low, high, count):
+    """Return count evenly spaced values from low to high."""
+    if count < 2 or high == low:
+        return [low]
+    step = (high - low) / (count - 1)
+    return [low + step * i for i in range(count)]
+
+
+def progress_chart(habit_name, completions, width=800, height=400):
+    """Render the cumulative completions chart of plot_habit_progress as SVG.
+
+    Args:
+        habit_name (str): Name of the habit, used in the title.
+        completions: array('q') of epoch microseconds, or ISO strings /
+            datetimes.
+        width (int): Width in pixels.
+        height (int): Height in pixels.
+
+    Returns:
+        str: A standalone <svg> element.
+    """
+    times = completions if isinstance(completions, array) else pack_timestamps(completions)
+    times = sorted(times)
+    left, right, top, bottom = 60, 20, 40, 70
+    plot_width, plot_height = width - left - right, height - top - bottom
+
+    start, end = (times[0], times[-1]) if times else (0, _DAY_US)
+    if end == start:
+        start, end = start - _DAY_US // 2, end + _DAY_US // 2
+    total = max(len(times), 1)
+
+    def x(value):
+        return left + (value - start) * plot_width / (end - start)
+
+    def y(count):
+        return top + plot_height - count * plot_height / total
+
+    # One point per horizontal pixel is all the line can show.
+    stride = max(1, len(times) // plot_width)
+    indexes = list(range(0, len(times), stride))
+    if times and indexes[-1] != len(times) - 1:
+        indexes.append(len(times) - 1)
+    points = " ".join(f"{x(times[i]):.1f},{y(i + 1):.1f}" for i in indexes)
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="sans-serif" font-size="11">',
+        f'<rect width="{width}" height="{height}" fill="white"/>',
+        f'<text x="{width / 2:.1f}" y="22" text-anchor="middle" font-size="14">'
+        f'{escape(habit_name)} Completion Progress</text>',
+    ]
+    for count in _ticks(0, total, 5):
+        parts.append(f'<line x1="{left}" x2="{left + plot_width}" y1="{y(count):.1f}" y2="{y(count):.1f}" '
+                     f'stroke="#ddd"/>')
+        parts.append(f'<text x="{left - 6}" y="{y(count) + 4:.1f}" text-anchor="end">{count:.0f}</text>')
+    for value in _ticks(start, end, 6):
+        label = from_epoch_us(int(value)).strftime("%Y-%m-%d")
+        parts.append(f'<line x1="{x(value):.1f}" x2="{x(value):.1f}" y1="{top}" y2="{top + plot_height}" '
+                     f'stroke="#ddd"/>')
+        parts.append(f'<text x="{x(value):.1f}" y="{top + plot_height + 14}" text-anchor="end" '
+                     f'transform="rotate(-45 {x(value):.1f} {top + plot_height + 14})">{label}</text>')
+    parts.append(f'<rect x="{left}" y="{top}" width="{plot_width}" height="{plot_height}" '
+                 f'fill="none" stroke="black"/>')
+    if times:
+        parts.append(f'<polyline points="{points}" fill="none" stroke="blue" stroke-width="1.5"/>')
+        if len(indexes) <= 100:
+            parts.extend(f'<circle cx="{x(times[i]):.1f}" cy="{y(i + 1):.1f}" r="3" fill="blue"/>'
+                         for i in indexes)
+    parts.append(f'<text x="{left + plot_width / 2:.1f}" y="{height - 8}" text-anchor="middle">Date</text>')
+    parts.append(f'<text x="14" y="{top + plot_height / 2:.1f}" text-anchor="middle" '
+                 f'transform="rotate(-90 14 {top + plot_height / 2:.1f})">Total Completions</text>')
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def sparkline(values, width=120, height=24, color="blue"):
+    """Render a list of numbers as a small inline SVG line.
+
+    Args:
+        values: Numbers to plot, oldest first (e.g. completions per week).
+        width (int): Width in pixels.
+        height (int): Height in pixels.
+        color (str): Stroke color.
+
+    Returns:
+        str: A standalone <svg> element.
+    """
+    values = list(values) or [0]
+    highest = max(max(values), 1)
+    step = (width - 2) / max(len(values) - 1, 1)
+    coordinates = [(1 + i * step, height - 1 - value * (height - 2) / highest)
+                   for i, value in enumerate(values)]
+    points = " ".join(f"{px:.1f},{py:.1f}" for px, py in coordinates)
+    last_x, last_y = coordinates[-1]
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}">'
+        f'<polyline points="{points}" fill="none" stroke="{color}" stroke-width="1.2"/>'
+        f'<circle cx="{last_x:.1f}" cy="{last_y:.1f}" r="1.8" fill="{color}"/></svg>'
+    )
+
+
+def weekly_counts(times, weeks, until):
+    """Count completions in each of the weeks ending at until.
+
+    Args:
+        times: Sorted array('q') of epoch microseconds.
+        weeks (int): Number of 7-day buckets.
+        until (datetime): End of the last bucket.
+
+    Returns:
+        list: weeks counts, oldest first.
+    """
+    end = to_epoch_us(until)
+    week = 7 * _DAY_US
+    edges = [bisect_left(times, end - week * i) for i in range(weeks, -1, -1)]
+    return [edges[i + 1] - edges[i] for i in range(weeks)]
@@ -0,0 +1,43 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from habit_tracker import HabitTracker
+from storage import JSONStorage, SQLiteStorage
+
+HABITS = [("Exercise", "daily"), ("Read", "weekly"), ("Never done", "monthly")]
+
+COMPLETIONS = [
+    (1, "2025-07-01T07:00:00"), (1, "2025-07-02T07:00:00"), (1, "2025-07-04T07:00:00"),
+    (2, "2025-07-05T20:00:00"), (2, "2025-07-12T21:00:00"),
+]
+
+
+@pytest.fixture
+def backend():
+    """Storage of the tracker fixture; override with params to run on several."""
+    return "json"
+
+
+@pytest.fixture
+def completions():
+    """Check-ins imported into the tracker fixture."""
+    return COMPLETIONS
+
+
+@pytest.fixture
+def tracker(tmp_path, backend, completions):
+    """Tracker with the HABITS (ids 1, 2, 3) and the completions fixture."""
+    if backend == "sqlite":
+        storage = SQLiteStorage(str(tmp_path / "habits.db"))
+    else:
+        storage = JSONStorage(tmp_path / "habits.json")
+    tracker = HabitTracker(storage)
+    for name, periodicity in HABITS:
+        tracker.create_habit(name, periodicity)
+    tracker.import_completions(completions)
+    yield tracker
+    if backend == "sqlite":
+        storage.close()
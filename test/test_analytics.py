@@ -1,91 +1,260 @@
-import sys
-import os
-
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-import pytest
-from datetime import datetime, timedelta
-from analytics import get_longest_streak, get_current_streak, get_all_longest_streaks, get_global_longest_streak
-
-
-class DummyHabit:
-    def __init__(self, habit_id, name, periodicity):
-        self.habit_id = habit_id
-        self.name = name
-        self.periodicity = periodicity
-
-
-class DummyTracker:
-    def __init__(self, completions_map):
-        self.completions_map = completions_map
-
-    def get_habit_completions(self, habit_id):
-        return self.completions_map.get(habit_id, [])
-
-
-def test_longest_streak_daily():
-    today = datetime.now()
-    completions = [today - timedelta(days=i) for i in range(3)]
-    assert get_longest_streak(completions, "daily") == 3
-
-
-def test_longest_streak_weekly():
-    today = datetime.now()
-    completions = [today - timedelta(weeks=i) for i in range(4)]
-    assert get_longest_streak(completions, "weekly") == 4
-
-
-def test_longest_streak_monthly():
-    completions = [
-        datetime(2025, 1, 10),
-        datetime(2025, 2, 10),
-        datetime(2025, 3, 10),
-    ]
-    assert get_longest_streak(completions, "monthly") == 3
-
-
-def test_longest_streak_empty():
-    assert get_longest_streak([], "daily") == 0
-
-
-def test_current_streak_daily_active():
-    today = datetime.now()
-    completions = [today - timedelta(days=i) for i in range(3)]
-    assert get_current_streak(completions, "daily") == 3
-
-def test_current_streak_daily_broken():
-    today = datetime.now()
-    completions = [today - timedelta(days=0), today - timedelta(days=2)]
-    assert get_current_streak(completions, "daily") == 1
-
-def test_current_streak_weekly_active():
-    today = datetime.now()
-    completions = [today - timedelta(weeks=i) for i in range(2)]
-    assert get_current_streak(completions, "weekly") == 2
-
-
-def test_current_streak_monthly_inactive():
-    today = datetime.now()
-    old_completion = today - timedelta(days=60)
-    assert get_current_streak([old_completion], "monthly") == 0
-
-
-def test_all_longest_streaks_and_global():
-    today = datetime.now()
-    habit1 = DummyHabit(1, "Exercise", "daily")
-    habit2 = DummyHabit(2, "Read", "weekly")
-    habits = [habit1, habit2]
-
-    completions_map = {
-        1: [today - timedelta(days=i) for i in range(2)],  # streak of 2
-        2: [today - timedelta(weeks=i) for i in range(3)],  # streak of 3
-    }
-    tracker = DummyTracker(completions_map)
-
-    streaks = get_all_longest_streaks(habits, tracker)
-    assert streaks["Exercise"] == 2
-    assert streaks["Read"] == 3
-
-    name, streak = get_global_longest_streak(habits, tracker)
-    assert name == "Read"
-    assert streak == 3
\ No newline at end of file
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from datetime import datetime, timedelta
+from analytics import (
+    get_longest_streak, get_current_streak, get_all_longest_streaks, get_global_longest_streak,
+    compute_streaks, period_counts, completion_rate, StreakCache, build_rollup, advance_rollup,
+    rollup_range,
+)
+from storage import JSONStorage
+
+
+class DummyHabit:
+    def __init__(self, habit_id, name, periodicity):
+        self.habit_id = habit_id
+        self.name = name
+        self.periodicity = periodicity
+
+
+class DummyTracker:
+    def __init__(self, completions_map):
+        self.completions_map = completions_map
+
+    def get_habit_completions(self, habit_id):
+        return self.completions_map.get(habit_id, [])
+
+
+def test_longest_streak_daily():
+    today = datetime.now()
+    completions = [today - timedelta(days=i) for i in range(3)]
+    assert get_longest_streak(completions, "daily") == 3
+
+
+def test_longest_streak_weekly():
+    today = datetime.now()
+    completions = [today - timedelta(weeks=i) for i in range(4)]
+    assert get_longest_streak(completions, "weekly") == 4
+
+
+def test_longest_streak_monthly():
+    completions = [
+        datetime(2025, 1, 10),
+        datetime(2025, 2, 10),
+        datetime(2025, 3, 10),
+    ]
+    assert get_longest_streak(completions, "monthly") == 3
+
+
+def test_longest_streak_empty():
+    assert get_longest_streak([], "daily") == 0
+
+
+def test_current_streak_daily_active():
+    today = datetime.now()
+    completions = [today - timedelta(days=i) for i in range(3)]
+    assert get_current_streak(completions, "daily") == 3
+
+def test_current_streak_daily_broken():
+    today = datetime.now()
+    completions = [today - timedelta(days=0), today - timedelta(days=2)]
+    assert get_current_streak(completions, "daily") == 1
+
+def test_current_streak_weekly_active():
+    today = datetime.now()
+    completions = [today - timedelta(weeks=i) for i in range(2)]
+    assert get_current_streak(completions, "weekly") == 2
+
+
+def test_current_streak_monthly_inactive():
+    today = datetime.now()
+    old_completion = today - timedelta(days=60)
+    assert get_current_streak([old_completion], "monthly") == 0
+
+
+def test_all_longest_streaks_and_global():
+    today = datetime.now()
+    habit1 = DummyHabit(1, "Exercise", "daily")
+    habit2 = DummyHabit(2, "Read", "weekly")
+    habits = [habit1, habit2]
+
+    completions_map = {
+        1: [today - timedelta(days=i) for i in range(2)],  # streak of 2
+        2: [today - timedelta(weeks=i) for i in range(3)],  # streak of 3
+    }
+    tracker = DummyTracker(completions_map)
+
+    streaks = get_all_longest_streaks(habits, tracker)
+    assert streaks["Exercise"] == 2
+    assert streaks["Read"] == 3
+
+    name, streak = get_global_longest_streak(habits, tracker)
+    assert name == "Read"
+    assert streak == 3
+
+class DummyBatchTracker(DummyTracker):
+    def get_habit_completions(self, habit_id):
+        raise AssertionError("completions should be fetched in one batch")
+
+    def get_all_completions(self):
+        return self.completions_map
+
+
+def test_all_longest_streaks_uses_batch_fetch():
+    today = datetime.now()
+    habits = [DummyHabit(1, "Exercise", "daily"), DummyHabit(2, "Read", "weekly")]
+    tracker = DummyBatchTracker({1: [today - timedelta(days=i) for i in range(4)]})
+
+    assert get_all_longest_streaks(habits, tracker) == {"Exercise": 4, "Read": 0}
+
+
+def test_compute_streaks(tmp_path):
+    storage = JSONStorage(tmp_path / "habits.json")
+    daily = storage.add_habit("Exercise", "daily")
+    weekly = storage.add_habit("Read", "weekly")
+    storage.complete_habit(daily)
+
+    streaks = compute_streaks(storage)
+    assert streaks[daily] == {"name": "Exercise", "periodicity": "daily", "longest": 1, "current": 1}
+    assert streaks[weekly]["longest"] == 0
+    assert streaks[weekly]["current"] == 0
+
+
+@pytest.mark.parametrize("periodicity", ["daily", "weekly", "monthly"])
+def test_vectorized_streaks_match_loops(periodicity):
+    pytest.importorskip("numpy")
+    import random
+    import analytics
+
+    rng = random.Random(periodicity)
+    start = datetime.now() - timedelta(days=3000)
+    step = {"daily": timedelta(days=1), "weekly": timedelta(weeks=1), "monthly": timedelta(days=30)}[periodicity]
+    for _ in range(20):
+        completions = []
+        day = start
+        while day < datetime.now():
+            if rng.random() < 0.9:
+                completions.append(day)
+            day += step if rng.random() < 0.8 else step * rng.randint(0, 3)
+        if periodicity == "monthly":
+            completions += [datetime(2024, 11, 5), datetime(2024, 12, 5), datetime(2025, 1, 9)]
+
+        assert (analytics._longest_streak_vectorized(completions, periodicity)
+                == analytics._longest_streak_loop(completions, periodicity))
+        assert (analytics._current_streak_vectorized(completions, periodicity)
+                == analytics._current_streak_loop(completions, periodicity))
+
+    if periodicity == "monthly":
+        # The current streak needs the same day of month across Dec -> Jan too.
+        today = datetime.now()
+        completions = [datetime(today.year - 1, 12, 9)] + [datetime(today.year, month, 1)
+                                                          for month in range(1, today.month + 1)]
+        assert analytics._current_streak_loop(completions, periodicity) == today.month
+        assert analytics._current_streak_vectorized(completions, periodicity) == today.month
+
+
+def test_vectorized_streaks_edge_cases():
+    pytest.importorskip("numpy")
+    import analytics
+
+    today = datetime.now()
+    for completions in ([], [today], [today, today], [today - timedelta(days=5)]):
+        for periodicity in ("daily", "weekly", "monthly"):
+            assert (analytics._longest_streak_vectorized(completions, periodicity)
+                    == analytics._longest_streak_loop(completions, periodicity))
+            assert (analytics._current_streak_vectorized(completions, periodicity)
+                    == analytics._current_streak_loop(completions, periodicity))
+
+
+@pytest.mark.parametrize("periodicity", ["daily", "weekly", "monthly"])
+def test_streaks_accept_packed_timestamps(periodicity):
+    import analytics
+    from timestamps import pack_timestamps
+
+    today = datetime.now().replace(microsecond=123456)
+    step = {"daily": timedelta(days=1), "weekly": timedelta(weeks=1), "monthly": timedelta(days=0)}[periodicity]
+    completions = [today - step * i for i in range(80)] + [today - timedelta(days=400)]
+    packed = pack_timestamps(completions)
+
+    assert get_longest_streak(packed, periodicity) == get_longest_streak(completions, periodicity)
+    assert get_current_streak(packed, periodicity) == get_current_streak(completions, periodicity)
+    assert (analytics._longest_streak_loop(packed, periodicity)
+            == analytics._longest_streak_loop(completions, periodicity))
+
+
+def test_period_counts_fill_empty_periods():
+    from timestamps import pack_timestamps
+
+    times = pack_timestamps([
+        datetime(2025, 6, 30, 9), datetime(2025, 7, 1, 9), datetime(2025, 7, 1, 20), datetime(2025, 7, 7, 9),
+    ])
+    assert period_counts(times, 'daily', datetime(2025, 7, 1), datetime(2025, 7, 4)) == {
+        '2025-07-01': 2, '2025-07-02': 0, '2025-07-03': 0,
+    }
+    assert period_counts(times, 'weekly') == {'2025-W27': 3, '2025-W28': 1}
+    assert period_counts(times, 'monthly', since=datetime(2025, 7, 1)) == {'2025-07': 3}
+    with pytest.raises(ValueError):
+        period_counts(times, 'hourly')
+
+
+def test_completion_rate_over_window():
+    from timestamps import pack_timestamps
+
+    times = pack_timestamps([datetime(2025, 7, day, 9) for day in (1, 2, 4)])
+    assert completion_rate(times, 'daily', datetime(2025, 7, 1), datetime(2025, 7, 5)) == 0.75
+    assert completion_rate(times, 'weekly', datetime(2025, 7, 1), datetime(2025, 7, 5)) == 1.0
+    assert completion_rate(times, 'daily', datetime(2025, 7, 5), datetime(2025, 7, 5)) == 0.0
+
+
+def test_streak_cache_evicts_least_recently_used():
+    cache = StreakCache(maxsize=2)
+    cache.put((1, 0), "a")
+    cache.put((2, 0), "b")
+    assert cache.get((1, 0)) == "a"
+    cache.put((3, 0), "c")
+
+    assert cache.get((2, 0)) is None
+    assert cache.get((3, 0)) == "c"
+    cache.invalidate(3)
+    assert len(cache) == 1
+    assert cache.stats() == {"hits": 2, "misses": 1, "size": 1, "maxsize": 2}
+
+
+def test_compute_streaks_reuses_cache_until_storage_changes(tmp_path, monkeypatch):
+    storage = JSONStorage(tmp_path / "habits.json")
+    habit_id = storage.add_habit("Exercise", "daily")
+    storage.complete_habit(habit_id)
+    cache = StreakCache()
+
+    first = compute_streaks(storage, cache)
+    reads = []
+    original = storage.get_all_completion_times
+    monkeypatch.setattr(storage, "get_all_completion_times", lambda: reads.append(1) or original())
+
+    assert compute_streaks(storage, cache) == first
+    assert reads == [] and cache.hits == 1
+
+    storage.add_habit("Read", "weekly")
+    assert compute_streaks(storage, cache)[habit_id] == first[habit_id]
+    assert reads == [1] and cache.misses == 3
+
+
+def test_rollup_counts_days_iso_weeks_and_months():
+    from timestamps import pack_timestamps
+
+    moments = [datetime(2024, 12, 30, 9), datetime(2024, 12, 31, 9), datetime(2024, 12, 31, 21),
+               datetime(2025, 1, 6, 9)]
+    rollup = build_rollup(pack_timestamps(moments))
+    assert rollup == build_rollup(moments)
+    assert rollup["daily"] == {"2024-12-30": 1, "2024-12-31": 2, "2025-01-06": 1}
+    assert rollup["weekly"] == {"2025-W01": 3, "2025-W02": 1}
+    assert rollup["monthly"] == {"2024-12": 3, "2025-01": 1}
+
+    advance_rollup(rollup, datetime(2025, 1, 7, 9))
+    assert rollup["monthly"]["2025-01"] == 2
+    assert rollup_range(rollup["daily"], "daily", datetime(2024, 12, 31), datetime(2025, 1, 3), fill=True) == \
+        {"2024-12-31": 2, "2025-01-01": 0, "2025-01-02": 0}
+    assert rollup_range(rollup["weekly"], "weekly", since=datetime(2025, 1, 1)) == {"2025-W01": 3, "2025-W02": 2}
@@ -0,0 +1,26 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import json
+from run_benchmarks import run_benchmarks
+from synthetic import generate_dataset
+
+
+def test_generate_dataset_is_reproducible():
+    first = generate_dataset(5, 20, seed=1)
+    assert len(first["habits"]) == 5
+    assert all(c["habit_id"] in range(1, 6) for c in first["completions"])
+    assert [c["habit_id"] for c in generate_dataset(5, 20, seed=1)["completions"]] == \
+        [c["habit_id"] for c in first["completions"]]
+
+
+def test_run_benchmarks_reports_json():
+    results = run_benchmarks([3], completions_per_habit=5, repeat=1)
+    json.dumps(results)
+    run = results["runs"][0]
+    assert run["habits"] == 3
+    assert run["timings"]["JSONStorage.complete_habit"]["repeat"] == 1
+    assert run["timings"]["JSONStorage.get_completions.cold"]["repeat"] == 1
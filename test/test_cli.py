@@ -0,0 +1,115 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+import json
+import pytest
+from datetime import datetime
+from cli import main
+from habit_tracker import HabitTracker
+from storage import CachedJSONStorage, JSONStorage, SQLiteStorage
+
+
+@pytest.fixture
+def completions():
+    return []
+
+
+def test_import_completions_validates_and_deduplicates(tracker):
+    summary = tracker.import_completions([
+        (1, "2025-07-01T07:00:00"),
+        (1, datetime(2025, 7, 2, 7, 0)),
+        ("1", "2025-07-01T07:00:00"),
+        (2, "2025-07-05T20:00:00+00:00"),
+        (9, "2025-07-01T07:00:00"),
+        (1, "not a date"),
+    ], chunk_size=2)
+
+    assert summary == {"added": 3, "duplicates": 1, "unknown_habit": 1, "invalid": 1}
+    assert tracker.storage.get_completions(1) == ["2025-07-01T07:00:00", "2025-07-02T07:00:00"]
+    assert tracker.get_longest_streak_for_habit(1) == 2
+
+    again = tracker.import_completions([(1, "2025-07-02T07:00:00")])
+    assert again["duplicates"] == 1
+
+
+def test_sqlite_add_completions(tmp_path):
+    storage = SQLiteStorage(tmp_path / "habits.db")
+    habit_id = storage.add_habit("Exercise", "daily")
+    summary = storage.add_completions(
+        [(habit_id, f"2025-07-{day:02d}T07:00:00") for day in range(1, 11)] * 2, chunk_size=3
+    )
+    assert summary["added"] == 10
+    assert summary["duplicates"] == 10
+    assert storage.get_streak_state(habit_id)["longest"] == 10
+
+
+def test_cli_import_csv_and_jsonl(tracker, tmp_path, capsys):
+    csv_file = tmp_path / "export.csv"
+    csv_file.write_text("habit_id,completed_at\n1,2025-07-01T07:00:00\n1,2025-07-02T07:00:00\n")
+    jsonl_file = tmp_path / "export.jsonl"
+    jsonl_file.write_text('{"habit_id": 2, "completed_at": "2025-07-05T20:00:00"}\nnot json\n')
+
+    assert main(["import", str(csv_file)], tracker=tracker) == 0
+    assert "Imported 2 completions" in capsys.readouterr().out
+    assert main(["import", str(jsonl_file)], tracker=tracker) == 0
+    assert "1 invalid" in capsys.readouterr().out
+    assert len(tracker.storage.get_completions(2)) == 1
+
+
+def test_cli_add_done_and_streaks(tracker, capsys):
+    assert main(["add", "Meditate", "daily"], tracker=tracker) == 0
+    assert "created with ID 4" in capsys.readouterr().out
+    assert main(["done", "1", "4"], tracker=tracker) == 0
+    capsys.readouterr()
+
+    assert main(["streaks", "--json"], tracker=tracker) == 0
+    rows = {row["id"]: row for row in json.loads(capsys.readouterr().out)}
+    assert rows[4] == {"id": 4, "name": "Meditate", "periodicity": "daily", "current": 1, "longest": 1}
+    assert rows[2]["longest"] == 0
+
+    assert main(["done", "42"], tracker=tracker) == 1
+    assert "No habit with ID 42" in capsys.readouterr().err
+
+
+def test_cli_batch_writes_once_at_the_end(tmp_path, capsys):
+    path = tmp_path / "habits.json"
+    tracker = HabitTracker(CachedJSONStorage(path))
+    commands = io.StringIO("add Exercise daily\n# comment\n\ndone 1\nstreaks --json\n")
+
+    assert main(["--batch"], tracker=tracker, stdin=commands) == 0
+    assert json.loads(capsys.readouterr().out.splitlines()[-1])[0]["longest"] == 1
+    assert len(JSONStorage(path).get_completions(1)) == 1
+
+
+def test_cli_batch_stops_on_error_without_writing(tmp_path, capsys):
+    path = tmp_path / "habits.json"
+    tracker = HabitTracker(CachedJSONStorage(path))
+    commands = io.StringIO("add Exercise daily\ndone 7\n")
+
+    assert main(["--batch"], tracker=tracker, stdin=commands) == 1
+    assert "line 2" in capsys.readouterr().err
+    assert JSONStorage(path).get_habits() == []
+
+
+def test_cli_batch_rolls_back_sqlite_on_error(tmp_path, capsys):
+    path = tmp_path / "habits.db"
+    tracker = HabitTracker(SQLiteStorage(path))
+    commands = io.StringIO("add Exercise daily\ndone 1\ndone 7\n")
+
+    assert main(["--batch"], tracker=tracker, stdin=commands) == 1
+    assert "line 3: stopping, no changes written" in capsys.readouterr().err
+    tracker.storage.close()
+    assert SQLiteStorage(path).get_habits() == []
+
+
+def test_cli_batch_reports_kept_changes_on_unbuffered_backends(tmp_path, capsys):
+    path = tmp_path / "habits.json"
+    tracker = HabitTracker(JSONStorage(path))
+    commands = io.StringIO("add Exercise daily\ndone 7\n")
+
+    assert main(["--batch"], tracker=tracker, stdin=commands) == 1
+    assert "line 2: stopping, earlier commands were already written" in capsys.readouterr().err
+    assert len(JSONStorage(path).get_habits()) == 1
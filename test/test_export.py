@@ -0,0 +1,111 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import csv
+import io
+import pytest
+import export
+from datetime import datetime
+from analytics import iter_streak_ids
+from cli import main
+from habit_tracker import HabitTracker
+from storage import JSONStorage
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request):
+    return request.param
+
+
+def test_iter_streak_ids_numbers_runs():
+    days = [datetime(2025, 7, day) for day in (1, 2, 4, 5, 6, 9)]
+    assert list(iter_streak_ids(days, "daily")) == [1, 1, 2, 2, 2, 3]
+    assert list(iter_streak_ids([], "weekly")) == []
+
+
+def test_iter_batches_has_fixed_size(tracker):
+    batches = list(export.iter_batches(tracker.storage, batch_size=2))
+    assert [len(batch["habit_id"]) for batch in batches] == [2, 2, 1]
+    assert list(batches[0]) == list(export.COMPLETION_COLUMNS)
+    with pytest.raises(ValueError):
+        next(export.iter_batches(tracker.storage, batch_size=0))
+
+
+def test_csv_export_with_derived_columns(tracker):
+    output = io.StringIO()
+    assert export.export(tracker.storage, output, file_format="csv", derived=True, batch_size=2) == 5
+
+    rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+    assert [(r["habit_id"], r["completed_at"], r["period"], r["streak_id"]) for r in rows] == [
+        ("1", "2025-07-01T07:00:00", "2025-07-01", "1"),
+        ("1", "2025-07-02T07:00:00", "2025-07-02", "1"),
+        ("1", "2025-07-04T07:00:00", "2025-07-04", "2"),
+        ("2", "2025-07-05T20:00:00", "2025-W27", "1"),
+        ("2", "2025-07-12T21:00:00", "2025-W28", "1"),
+    ]
+    assert rows[3]["habit_name"] == "Read"
+
+
+def test_jsonl_export_is_columnar(tracker, tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    assert export.export(tracker.storage, path, batch_size=3) == 5
+    with open(path) as file:
+        batches = list(export.read_jsonl_batches(file))
+
+    assert [batch["habit_id"] for batch in batches] == [[1, 1, 1], [2, 2]]
+    assert batches[1]["completed_at"] == ["2025-07-05T20:00:00", "2025-07-12T21:00:00"]
+
+    habits_path = str(tmp_path / "habits.jsonl")
+    assert export.export(tracker.storage, habits_path, table="habits") == 3
+    with open(habits_path) as file:
+        assert next(export.read_jsonl_batches(file))["name"] == ["Exercise", "Read", "Never done"]
+
+
+def test_columnar_format_falls_back_without_pyarrow(tracker, tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "_pyarrow_checked", True)
+    monkeypatch.setattr(export, "pa", None)
+    assert export.columnar_format() == "jsonl"
+    with pytest.raises(ValueError):
+        export.export(tracker.storage, str(tmp_path / "history.parquet"))
+    with pytest.raises(ValueError):
+        export.export(tracker.storage, str(tmp_path / "history.txt"))
+
+
+def test_parquet_is_not_written_to_streams(tracker, monkeypatch, capsys):
+    monkeypatch.setattr(export, "_load_pyarrow", lambda: True)
+    with pytest.raises(ValueError):
+        export.export(tracker.storage, io.StringIO(), "parquet")
+    assert main(["export", "-", "--format", "parquet"], tracker=tracker) == 1
+    assert "file name" in capsys.readouterr().err
+
+    assert main(["export", "-", "--format", "columnar"], tracker=tracker) == 0
+    assert len(list(export.read_jsonl_batches(io.StringIO(capsys.readouterr().out)))) == 1
+
+
+def test_parquet_export(tracker, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "history.parquet")
+    assert export.export(tracker.storage, path, derived=True, batch_size=2) == 5
+
+    table = pq.read_table(path)
+    assert table.column_names == list(export.COMPLETION_COLUMNS + export.DERIVED_COLUMNS)
+    assert table.column("completed_at").to_pylist()[0] == datetime(2025, 7, 1, 7)
+    assert pq.ParquetFile(path).num_row_groups == 3
+
+
+def test_cli_export_round_trips_through_import(tracker, tmp_path, capsys):
+    path = str(tmp_path / "history.csv")
+    assert main(["export", path], tracker=tracker) == 0
+    assert "Exported 5 completions" in capsys.readouterr().out
+
+    copy = HabitTracker(JSONStorage(tmp_path / "copy.json"))
+    for name, periodicity in [("Exercise", "daily"), ("Read", "weekly")]:
+        copy.create_habit(name, periodicity)
+    assert main(["import", path], tracker=copy) == 0
+    assert copy.get_completion_times(2) == tracker.get_completion_times(2)
+    capsys.readouterr()
+
+    assert main(["export", "-", "--table", "habits"], tracker=tracker) == 0
+    assert capsys.readouterr().out.splitlines()[0] == ",".join(export.HABIT_COLUMNS)
@@ -1,37 +1,141 @@
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-import pytest
-from habit_tracker import HabitTracker
-
-def test_create_habit():
-    tracker = HabitTracker()
-    tracker.create_habit("Exercise", "daily")
-    habits = tracker.get_all_habits()
-    assert any(h.name == "Exercise" for h in habits)
-
-def test_get_habits_by_periodicity():
-    tracker = HabitTracker()
-    tracker.create_habit("Read", "weekly")
-    tracker.create_habit("Run", "daily")
-    weekly = tracker.get_habits_by_periodicity("weekly")
-    assert all(h.periodicity == "weekly" for h in weekly)
-
-def test_complete_habit_and_completions():
-    tracker = HabitTracker()
-    tracker.create_habit("Meditate", "daily")
-    habit = tracker.get_all_habits()[0]
-    tracker.complete_habit(habit.habit_id)
-    completions = tracker.get_habit_completions(habit.habit_id)
-    assert len(completions) > 0
-
-def test_longest_streaks():
-    tracker = HabitTracker()
-    tracker.create_habit("Workout", "daily")
-    habit = tracker.get_all_habits()[0]
-    tracker.complete_habit(habit.habit_id)
-    name, streak = tracker.get_global_longest_streak()
-    assert streak >= 0
-    streak_for_habit = tracker.get_longest_streak_for_habit(habit.habit_id)
-    assert streak_for_habit >= 0
\ No newline at end of file
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from habit_tracker import HabitTracker
+
+def test_create_habit():
+    tracker = HabitTracker()
+    tracker.create_habit("Exercise", "daily")
+    habits = tracker.get_all_habits()
+    assert any(h.name == "Exercise" for h in habits)
+
+def test_get_habits_by_periodicity():
+    tracker = HabitTracker()
+    tracker.create_habit("Read", "weekly")
+    tracker.create_habit("Run", "daily")
+    weekly = tracker.get_habits_by_periodicity("weekly")
+    assert all(h.periodicity == "weekly" for h in weekly)
+
+def test_complete_habit_and_completions():
+    tracker = HabitTracker()
+    tracker.create_habit("Meditate", "daily")
+    habit = tracker.get_all_habits()[0]
+    tracker.complete_habit(habit.habit_id)
+    completions = tracker.get_habit_completions(habit.habit_id)
+    assert len(completions) > 0
+
+def test_longest_streaks():
+    tracker = HabitTracker()
+    tracker.create_habit("Workout", "daily")
+    habit = tracker.get_all_habits()[0]
+    tracker.complete_habit(habit.habit_id)
+    name, streak = tracker.get_global_longest_streak()
+    assert streak >= 0
+    streak_for_habit = tracker.get_longest_streak_for_habit(habit.habit_id)
+    assert streak_for_habit >= 0
+
+def test_completion_times_match_completions(tmp_path):
+    from array import array
+    from storage import JSONStorage
+
+    tracker = HabitTracker(JSONStorage(tmp_path / "habits.json"))
+    tracker.create_habit("Stretch", "daily")
+    habit = tracker.get_all_habits()[0]
+    tracker.complete_habit(habit.habit_id)
+
+    times = tracker.get_completion_times(habit.habit_id)
+    assert isinstance(times, array)
+    assert len(times) == 1
+    assert tracker.get_habit_completions(habit.habit_id)[0].isoformat() == \
+        tracker.storage.get_completions(habit.habit_id)[0]
+
+def test_streak_table_lists_every_habit(tmp_path):
+    from storage import JSONStorage
+
+    tracker = HabitTracker(JSONStorage(tmp_path / "habits.json"))
+    tracker.create_habit("Stretch", "daily")
+    tracker.create_habit("Read", "weekly")
+    tracker.complete_habit(1)
+
+    assert tracker.get_streak_table() == [
+        {"id": 1, "name": "Stretch", "periodicity": "daily", "current": 1, "longest": 1},
+        {"id": 2, "name": "Read", "periodicity": "weekly", "current": 0, "longest": 0},
+    ]
+    assert tracker.get_streak_table(tracker.storage.get_habits()[1:]) == tracker.get_streak_table()[1:]
+
+def test_habit_is_slotted_and_parses_created_at_lazily():
+    from habit_tracker import Habit
+
+    habit = Habit(1, "Read", "weekly", "2025-08-22T07:11:48.927098")
+    assert not hasattr(habit, "__dict__")
+    assert habit._created_at == "2025-08-22T07:11:48.927098"
+    assert habit.created_at.year == 2025
+    assert habit._created_at is habit.created_at
+
+@pytest.mark.parametrize("backend", ["json", "cached", "append_log", "sqlite", "sharded"])
+def test_habits_are_cached_until_storage_changes(tmp_path, backend):
+    from storage import create_storage
+
+    tracker = HabitTracker(create_storage(backend, tmp_path / "habits.data"))
+    tracker.create_habit("Exercise", "daily")
+    first = tracker.get_all_habits()
+    assert tracker.get_all_habits()[0] is first[0]
+
+    tracker.complete_habit(first[0].habit_id)
+    tracker.create_habit("Read", "weekly")
+    habits = tracker.get_all_habits()
+    assert [h.name for h in habits] == ["Exercise", "Read"]
+    assert habits[0] is first[0]
+    assert tracker.get_habits_by_periodicity("weekly") == [habits[1]]
+
+    tracker.storage.update_habit(first[0].habit_id, name="Gym")
+    assert tracker.get_all_habits()[0].name == "Gym"
+
+def test_completion_rate_and_period_counts(tmp_path):
+    from datetime import datetime
+    from storage import JSONStorage
+
+    tracker = HabitTracker(JSONStorage(tmp_path / "habits.json"))
+    habit_id = tracker.create_habit("Exercise", "daily")
+    tracker.import_completions((habit_id, datetime(2025, 7, day, 7)) for day in range(1, 31, 2))
+
+    now = datetime(2025, 7, 30, 12)
+    assert tracker.completion_rate(habit_id, window=10, now=now) == 0.5
+    assert tracker.completion_rate(99, now=now) == 0.0
+    assert tracker.get_period_counts(habit_id, "monthly") == {"2025-07": 15}
+    assert len(tracker.get_habit_completions(habit_id, since=datetime(2025, 7, 25))) == 3
+
+def test_update_and_delete_invalidate_streak_cache(tmp_path):
+    from storage import JSONStorage
+
+    tracker = HabitTracker(JSONStorage(tmp_path / "habits.json"), cache_size=8)
+    habit_id = tracker.create_habit("Exercise", "daily")
+    tracker.complete_habit(habit_id)
+    tracker.compute_streaks()
+    assert len(tracker.streak_cache) == 1
+
+    assert tracker.update_habit(habit_id, name="Gym")
+    assert len(tracker.streak_cache) == 0
+    assert tracker.compute_streaks()[habit_id]["name"] == "Gym"
+
+    assert tracker.delete_habit(habit_id)
+    assert not tracker.delete_habit(habit_id)
+    assert tracker.compute_streaks() == {}
+    assert len(tracker.streak_cache) == 0
+
+def test_user_trackers_use_separate_pooled_partitions(tmp_path):
+    from storage import StoragePool, JSONStorage, user_storage_factory
+
+    pool = StoragePool(user_storage_factory(tmp_path, "cached"), max_open=1)
+    alice = HabitTracker(user_id="alice", pool=pool)
+    bob = HabitTracker(user_id="bob", pool=pool)
+    habit_id = alice.create_habit("Exercise", "daily")
+    assert bob.get_all_habits() == []
+    assert "alice" not in pool
+
+    assert alice.complete_habit(habit_id)
+    assert len(JSONStorage(tmp_path / "alice.json").get_completions(habit_id)) == 1
+    assert [h.name for h in alice.get_all_habits()] == ["Exercise"]
+    pool.close()
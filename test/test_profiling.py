@@ -0,0 +1,89 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import pytest
+import profiling
+from analytics import compute_streaks
+from cli import main
+from habit_tracker import HabitTracker
+from storage import CachedJSONStorage, JSONStorage, ShardedStorage
+
+
+@pytest.fixture
+def profiler():
+    profiling.reset()
+    profiling.enable()
+    yield profiling
+    profiling.disable()
+    profiling.reset()
+
+
+def test_storage_loads_and_saves_are_counted(tmp_path, profiler):
+    storage = JSONStorage(tmp_path / "habits.json")
+    habit_id = storage.add_habit("Exercise", "daily")
+    storage.complete_habit(habit_id)
+    compute_streaks(storage)
+
+    metrics = profiler.snapshot()
+    size = (tmp_path / "habits.json").stat().st_size
+    assert metrics["storage.save_data"]["calls"] == 2
+    assert metrics["storage.load_data"]["calls"] == 4
+    assert metrics["storage.load_data"]["bytes"] > 0
+    assert metrics["storage.save_data"]["bytes"] >= size
+    assert metrics["analytics.compute_streaks"]["calls"] == 1
+    assert metrics["analytics.get_longest_streak"]["calls"] == 1
+
+
+def test_sharded_writes_are_counted_per_file_kind(tmp_path, profiler):
+    storage = ShardedStorage(tmp_path / "habits.d")
+    habit_id = storage.add_habit("Exercise", "daily")
+    storage.complete_habit(habit_id)
+
+    metrics = profiler.snapshot()
+    assert "storage.save_data" not in metrics
+    assert metrics["storage.save_catalog"]["bytes"] >= (tmp_path / "habits.d" / "catalog.json").stat().st_size
+    assert metrics["storage.save_shard"]["calls"] == 1 and metrics["storage.save_shard"]["bytes"] > 0
+    assert metrics["storage.save_habit_file"]["bytes"] > 0
+
+
+def test_cached_storage_parses_once_when_profiled(tmp_path, profiler):
+    storage = CachedJSONStorage(tmp_path / "habits.json")
+    for _ in range(3):
+        storage.get_habits()
+    assert profiler.snapshot()["storage.load_data"]["calls"] == 1
+
+
+def test_nothing_is_recorded_when_disabled(tmp_path):
+    profiling.reset()
+    JSONStorage(tmp_path / "habits.json").get_habits()
+    assert profiling.snapshot() == {}
+
+
+def test_report_formats(profiler):
+    profiler.record("storage.load_data", 0.002)
+    profiler.add_bytes("storage.load_data", 512)
+
+    assert json.loads(profiler.to_json())["storage.load_data"]["bytes"] == 512
+    assert 'habit_tracker_calls_total{name="storage.load_data"} 1' in profiler.to_prometheus()
+    table = profiler.format_table().splitlines()
+    assert table[0].split()[:2] == ["metric", "calls"]
+    assert table[1].split()[:2] == ["storage.load_data", "1"]
+
+
+def test_profile_call_returns_result(capsys):
+    assert profiling.profile_call(sum, [1, 2, 3], file=sys.stdout) == 6
+    assert "function calls" in capsys.readouterr().out
+
+
+def test_cli_profile_flag_reports_to_stderr(tmp_path, capsys):
+    tracker = HabitTracker(JSONStorage(tmp_path / "habits.json"))
+    try:
+        assert main(["--profile", "--profile-format", "json", "add", "Read", "weekly"], tracker=tracker) == 0
+    finally:
+        profiling.disable()
+        profiling.reset()
+    report = json.loads(capsys.readouterr().err)
+    assert report["storage.save_data"]["calls"] == 1
@@ -0,0 +1,94 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import threading
+import pytest
+from datetime import datetime, timedelta
+from analytics import get_longest_streak
+from cli import main
+from scheduler import Deadline, Scheduler, next_deadlines
+
+
+def test_next_deadlines_follow_periodicity():
+    created = datetime(2025, 1, 1)
+    assert next_deadlines("daily", None, created) == (created, None)
+    assert next_deadlines("daily", "2025-03-01T21:00:00", created) == \
+        (datetime(2025, 3, 2), datetime(2025, 3, 3))
+    assert next_deadlines("weekly", datetime(2025, 3, 1, 9), created) == \
+        (datetime(2025, 3, 8), datetime(2025, 3, 9))
+    assert next_deadlines("monthly", datetime(2025, 1, 31, 9), created) == \
+        (datetime(2025, 2, 28), datetime(2025, 3, 4))
+    assert get_longest_streak([datetime(2025, 1, 31, 9), datetime(2025, 2, 28, 9)], "monthly") == 1
+    assert next_deadlines("monthly", datetime(2025, 12, 15), created)[0] == datetime(2026, 1, 15)
+    with pytest.raises(ValueError):
+        next_deadlines("hourly", None, created)
+
+
+@pytest.fixture
+def completions():
+    return [(1, "2025-03-01T07:00:00"), (2, "2025-02-27T20:00:00")]
+
+
+def test_due_now_and_at_risk(tracker):
+    scheduler = Scheduler(tracker)
+    now = datetime(2025, 3, 2, 12)
+
+    assert scheduler.due_now(now) == [Deadline(1, "Exercise", datetime(2025, 3, 2))]
+    assert [d.habit_id for d in scheduler.due_now(datetime(2025, 3, 6))] == [1, 2]
+    assert scheduler.at_risk(within=timedelta(hours=12), now=now) == [Deadline(1, "Exercise", datetime(2025, 3, 3))]
+    assert [d.habit_id for d in scheduler.at_risk(within=timedelta(days=7), now=now)] == [1, 2]
+    # Streaks that have broken are no longer at risk.
+    assert scheduler.at_risk(within=timedelta(days=7), now=datetime(2025, 3, 5)) == \
+        [Deadline(2, "Read", datetime(2025, 3, 7))]
+
+
+def test_update_moves_deadlines(tracker):
+    scheduler = Scheduler(tracker)
+    tracker.import_completions([(1, "2025-03-02T08:00:00")])
+    assert scheduler.update(1)
+
+    now = datetime(2025, 3, 2, 12)
+    assert 1 not in [d.habit_id for d in scheduler.due_now(now)]
+    assert scheduler.at_risk(within=timedelta(days=1), now=now) == []
+
+    tracker.delete_habit(1)
+    assert not scheduler.update(1)
+    assert 1 not in [d.habit_id for d in scheduler.due_now(datetime(2025, 4, 1))]
+
+
+def test_stale_heap_entries_are_compacted(tracker):
+    scheduler = Scheduler(tracker)
+    for day in range(2, 40):
+        tracker.import_completions([(1, datetime(2025, 3, 1) + timedelta(days=day))])
+        scheduler.update(1)
+    assert len(scheduler._due) <= 2 * 3 + 16
+    assert scheduler.at_risk(within=timedelta(days=2), now=datetime(2025, 4, 9, 12)) == \
+        [Deadline(1, "Exercise", datetime(2025, 4, 11))]
+
+
+def test_watch_reports_due_habits_and_sleeps_until_stopped(tracker):
+    scheduler = Scheduler(tracker, warn_before=timedelta(0))
+    events = []
+    thread = threading.Thread(target=scheduler.watch, args=(lambda kind, d: events.append((kind, d.habit_id)),))
+    thread.start()
+    try:
+        for _ in range(100):
+            if len(events) >= 3:
+                break
+            threading.Event().wait(0.01)
+    finally:
+        scheduler.stop()
+        thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert sorted(events) == [("due", 1), ("due", 2), ("due", 3)]
+
+
+def test_cli_due_lists_deadlines(tracker, capsys):
+    assert main(["due", "--json"], tracker=tracker) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert [row["id"] for row in report["due"]] == [1, 2, 3]
+    assert report["at_risk"] == []
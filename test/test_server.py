@@ -0,0 +1,110 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import asyncio
+from datetime import datetime
+from habit_tracker import HabitTracker
+from load_test import request, run_load_test
+import server as server_module
+from server import HabitServer
+from storage import CachedJSONStorage, JSONStorage
+
+
+def run_with_server(tmp_path, scenario):
+    async def main():
+        tracker = HabitTracker(CachedJSONStorage(tmp_path / "habits.json"))
+        server = HabitServer(tracker)
+        port = (await server.start("127.0.0.1", 0)).sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            return await scenario(server, port, lambda *args: request(reader, writer, *args))
+        finally:
+            writer.close()
+            await server.close()
+    return asyncio.run(main())
+
+
+def test_server_endpoints(tmp_path):
+    async def scenario(server, port, call):
+        assert await call("POST", "/habits", {"name": "Exercise", "periodicity": "daily"}) == (201, {"id": 1})
+        assert (await call("POST", "/habits", {"name": "Bad", "periodicity": "hourly"}))[0] == 400
+        status, habits = await call("GET", "/habits")
+        assert status == 200 and [h["name"] for h in habits] == ["Exercise"]
+
+        status, completion = await call("POST", "/habits/1/complete")
+        assert status == 201 and completion["habit_id"] == 1
+        assert (await call("POST", "/habits/9/complete"))[0] == 404
+
+        assert await call("GET", "/habits/1/completions") == (200, [completion["completed_at"]])
+        status, streaks = await call("GET", "/streaks")
+        assert streaks[0]["current"] == 1 and streaks[0]["longest"] == 1
+
+    run_with_server(tmp_path, scenario)
+    assert len(JSONStorage(tmp_path / "habits.json").get_completions(1)) == 1
+
+
+def test_server_coalesces_concurrent_completions(tmp_path):
+    async def scenario(server, port, call):
+        await call("POST", "/habits", {"name": "Exercise", "periodicity": "daily"})
+
+        async def complete():
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            try:
+                return await request(reader, writer, "POST", "/habits/1/complete")
+            finally:
+                writer.close()
+
+        results = await asyncio.gather(*(complete() for _ in range(50)))
+        assert all(status == 201 for status, _ in results)
+        return server.batches_written
+
+    batches = run_with_server(tmp_path, scenario)
+    assert batches < 50
+    assert len(JSONStorage(tmp_path / "habits.json").get_completions(1)) == 50
+
+
+def test_server_reports_check_ins_that_were_not_stored(tmp_path, monkeypatch):
+    class FrozenClock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2025, 7, 1, 7, 0)
+
+    async def scenario(server, port, call):
+        await call("POST", "/habits", {"name": "Exercise", "periodicity": "daily"})
+        monkeypatch.setattr(server_module, "datetime", FrozenClock)
+
+        async def complete():
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            try:
+                return await request(reader, writer, "POST", "/habits/1/complete")
+            finally:
+                writer.close()
+
+        return sorted(status for status, _ in await asyncio.gather(complete(), complete()))
+
+    assert run_with_server(tmp_path, scenario) == [201, 409]
+    assert JSONStorage(tmp_path / "habits.json").get_completions(1) == ["2025-07-01T07:00:00"]
+
+
+def test_server_rejects_bad_content_length(tmp_path):
+    async def scenario(server, port, call):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            writer.write(b"POST /habits HTTP/1.1\r\nContent-Length: abc\r\n\r\n")
+            response = await reader.read()
+        finally:
+            writer.close()
+        assert response.startswith(b"HTTP/1.1 400 ")
+        assert b"Connection: close" in response
+        return await call("GET", "/habits")
+
+    assert run_with_server(tmp_path, scenario) == (200, [])
+
+
+def test_load_test_script():
+    results = asyncio.run(run_load_test(clients=20, requests=5, habits=3))
+    assert results["requests"] == 100
+    assert results["errors"] == 0
@@ -0,0 +1,51 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code, cwd):
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": ROOT},
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_cli_startup_does_not_import_plotting_libraries(tmp_path):
+    output = run_python(
+        "import json, sys\n"
+        "import main, cli\n"
+        "from habit_tracker import HabitTracker\n"
+        "tracker = HabitTracker()\n"
+        "tracker.create_habit('Exercise', 'daily')\n"
+        "tracker.complete_habit(tracker.get_all_habits()[0].habit_id)\n"
+        "tracker.get_global_longest_streak()\n"
+        "print(json.dumps([m for m in ('matplotlib', 'numpy') if m in sys.modules]))\n",
+        cwd=tmp_path,
+    )
+    assert json.loads(output) == []
+
+
+def test_tracker_works_without_matplotlib_or_numpy(tmp_path):
+    output = run_python(
+        "import sys\n"
+        "sys.modules['matplotlib'] = None\n"
+        "sys.modules['numpy'] = None\n"
+        "from datetime import datetime, timedelta\n"
+        "from habit_tracker import HabitTracker\n"
+        "from analytics import get_longest_streak\n"
+        "tracker = HabitTracker()\n"
+        "tracker.create_habit('Exercise', 'daily')\n"
+        "tracker.complete_habit(1)\n"
+        "days = [datetime(2025, 1, 1) + timedelta(days=i) for i in range(100)]\n"
+        "print(tracker.get_longest_streak_for_habit(1), get_longest_streak(days, 'daily'))\n",
+        cwd=tmp_path,
+    )
+    assert output.split() == ["1", "100"]
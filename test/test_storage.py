@@ -0,0 +1,704 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import threading
+import pytest
+from datetime import datetime, timedelta
+import storage as storage_module
+from concurrent.futures import ProcessPoolExecutor
+from storage import (
+    JSONStorage, CachedJSONStorage, AppendLogStorage, ConcurrentJSONStorage, SQLiteStorage, ShardedStorage,
+    StorageConflictError, StoragePool, create_storage, migrate_json_to_sqlite, user_storage_factory,
+)
+
+
+def test_cached_storage_parses_file_once(tmp_path, monkeypatch):
+    path = tmp_path / "habits.json"
+    storage = CachedJSONStorage(path)
+    storage.add_habit("Exercise", "daily")
+    storage.flush()
+
+    loads = []
+    original = JSONStorage._load_data
+    monkeypatch.setattr(JSONStorage, "_load_data", lambda self: loads.append(1) or original(self))
+
+    storage.discard()
+    for _ in range(5):
+        storage.get_habits()
+        storage.get_completions(1)
+    assert len(loads) == 1
+
+
+def test_cached_storage_writes_on_flush(tmp_path):
+    path = tmp_path / "habits.json"
+    storage = CachedJSONStorage(path)
+    habit_id = storage.add_habit("Read", "weekly")
+    storage.complete_habit(habit_id)
+
+    assert json.loads(path.read_text())["habits"] == []
+    assert storage.flush()
+    on_disk = json.loads(path.read_text())
+    assert len(on_disk["habits"]) == 1
+    assert len(on_disk["completions"]) == 1
+    assert not storage.flush()
+
+
+def test_cached_storage_context_manager(tmp_path):
+    path = tmp_path / "habits.json"
+    with CachedJSONStorage(path) as storage:
+        storage.add_habit("Run", "daily")
+    assert JSONStorage(path).get_habits()[0]["name"] == "Run"
+
+    with pytest.raises(RuntimeError):
+        with CachedJSONStorage(path) as storage:
+            storage.add_habit("Swim", "daily")
+            raise RuntimeError("boom")
+    assert len(JSONStorage(path).get_habits()) == 1
+
+
+def test_cached_storage_sees_external_changes(tmp_path):
+    path = tmp_path / "habits.json"
+    cached = CachedJSONStorage(path)
+    assert cached.get_habits() == []
+
+    JSONStorage(path).add_habit("Journal", "daily")
+    assert [h["name"] for h in cached.get_habits()] == ["Journal"]
+
+
+def test_append_log_storage_appends_completions(tmp_path):
+    path = tmp_path / "habits.json"
+    storage = AppendLogStorage(path, compact_every=0)
+    habit_id = storage.add_habit("Exercise", "daily")
+    snapshot = path.read_text()
+
+    assert storage.complete_habit(habit_id)
+    assert storage.complete_habit(habit_id)
+    assert not storage.complete_habit(99)
+
+    assert path.read_text() == snapshot
+    assert len(storage.log_path.read_text().splitlines()) == 2
+    assert len(storage.get_completions(habit_id)) == 2
+
+
+def test_append_log_storage_compaction(tmp_path):
+    path = tmp_path / "habits.json"
+    storage = AppendLogStorage(path, compact_every=3)
+    habit_id = storage.add_habit("Read", "weekly")
+    for _ in range(3):
+        storage.complete_habit(habit_id)
+
+    assert not storage.log_path.exists()
+    assert len(json.loads(path.read_text())["completions"]) == 3
+
+    storage.complete_habit(habit_id)
+    assert len(storage.get_completions(habit_id)) == 4
+
+
+def test_append_log_storage_recovers_from_torn_and_pending_logs(tmp_path):
+    path = tmp_path / "habits.json"
+    storage = AppendLogStorage(path, compact_every=0)
+    habit_id = storage.add_habit("Run", "daily")
+    storage.complete_habit(habit_id)
+    storage.compact()
+
+    # Simulate a crash after the snapshot was written but before the
+    # pending log was removed, plus a half-written line in the live log.
+    completed = storage.get_completions(habit_id)[0]
+    storage.pending_path.write_text(json.dumps({"habit_id": habit_id, "completed_at": completed}) + "\n")
+    storage.log_path.write_text('{"habit_id": 1, "compl')
+
+    assert storage.get_completions(habit_id) == [completed]
+
+
+def test_append_log_storage_delete_drops_logged_completions(tmp_path):
+    path = tmp_path / "habits.json"
+    storage = AppendLogStorage(path, compact_every=0)
+    habit_id = storage.add_habit("Swim", "daily")
+    storage.complete_habit(habit_id)
+
+    assert storage.delete_habit(habit_id)
+    assert storage.get_completions(habit_id) == []
+    assert not storage.log_path.exists()
+
+
+def _append_many(path, habit_id, count):
+    storage = AppendLogStorage(path, compact_every=4)
+    for number in range(count):
+        storage.complete_habit(habit_id)
+        if number % 5 == 0:
+            storage.update_habit(habit_id, description=f"updated {number}")
+    return storage.add_habit("Worker habit", "daily")
+
+
+def test_append_log_storage_loses_no_check_ins_across_processes(tmp_path):
+    path = tmp_path / "habits.json"
+    habit_id = AppendLogStorage(path).add_habit("Exercise", "daily")
+
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        new_ids = list(pool.map(_append_many, [path] * 4, [habit_id] * 4, [15] * 4))
+
+    storage = AppendLogStorage(path)
+    assert len(storage.get_completions(habit_id)) == 60
+    assert storage.get_streak_state(habit_id)["last_completed_at"] is not None
+    assert len(set(new_ids)) == 4
+
+
+def test_sqlite_storage_matches_json_interface(tmp_path):
+    storage = SQLiteStorage(tmp_path / "habits.db")
+    habit_id = storage.add_habit("Exercise", "daily")
+    other_id = storage.add_habit("Read", "weekly")
+
+    assert storage.complete_habit(habit_id)
+    assert storage.complete_habit(habit_id)
+    assert not storage.complete_habit(99)
+
+    assert [h["name"] for h in storage.get_habits()] == ["Exercise", "Read"]
+    assert [h["id"] for h in storage.get_habits("weekly")] == [other_id]
+    assert len(storage.get_completions(habit_id)) == 2
+    assert len(storage.get_completions(habit_id, limit=1)) == 1
+    assert storage.get_habit_by_id(other_id)["periodicity"] == "weekly"
+
+    assert storage.update_habit(other_id, name="Read more", unknown="x")
+    assert storage.get_habit_by_id(other_id)["name"] == "Read more"
+    assert not storage.update_habit(99, name="Nope")
+
+    assert storage.delete_habit(habit_id)
+    assert not storage.delete_habit(habit_id)
+    assert storage.get_completions(habit_id) == []
+    assert storage.get_analytics_settings()["graph_directory"] == "graphs"
+
+
+def test_sqlite_storage_uses_completion_index(tmp_path):
+    storage = SQLiteStorage(tmp_path / "habits.db")
+    plan = storage._conn.execute(
+        "EXPLAIN QUERY PLAN SELECT completed_at FROM completions "
+        "WHERE habit_id = ? ORDER BY completed_at", (1,)
+    ).fetchall()
+    assert any("idx_completions_habit_time" in row[-1] for row in plan)
+
+
+def test_migrate_json_to_sqlite(tmp_path):
+    json_path = tmp_path / "habits.json"
+    source = JSONStorage(json_path)
+    first = source.add_habit("Exercise", "daily")
+    second = source.add_habit("Read", "weekly")
+    source.complete_habit(first)
+    source.complete_habit(second)
+    source.complete_habit(second)
+
+    db_path = tmp_path / "habits.db"
+    migrated = migrate_json_to_sqlite(json_path, db_path)
+    assert migrated.get_habits() == source.get_habits()
+    assert migrated.get_completions(second) == source.get_completions(second)
+
+    # Running it again must not duplicate anything.
+    migrate_json_to_sqlite(json_path, db_path)
+    assert len(migrated.get_completions(second)) == 2
+
+
+def test_create_storage_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("HABIT_TRACKER_BACKEND", "sqlite")
+    monkeypatch.setenv("HABIT_TRACKER_PATH", str(tmp_path / "env.db"))
+    assert isinstance(create_storage(), SQLiteStorage)
+
+    assert isinstance(create_storage("cached", tmp_path / "habits.json"), CachedJSONStorage)
+    with pytest.raises(ValueError):
+        create_storage("yaml")
+
+
+def test_cached_storage_reads_are_copies(tmp_path):
+    storage = CachedJSONStorage(tmp_path / "habits.json")
+    habit_id = storage.add_habit("Exercise", "daily")
+    storage.complete_habit(habit_id)
+    storage.flush()
+    saved = (tmp_path / "habits.json").read_text()
+
+    storage.get_habits().clear()
+    storage.get_habits("daily")[0]["name"] = "Changed"
+    storage.get_habits_by_periodicity("daily")[0]["periodicity"] = "weekly"
+    storage.get_habit_by_id(habit_id)["name"] = "Changed"
+    storage.get_analytics_settings()["default_periodicities"].clear()
+    storage.get_completions(habit_id).clear()
+    storage.get_completion_times(habit_id).pop()
+
+    assert storage.get_habit_by_id(habit_id)["name"] == "Exercise"
+    assert storage.get_habits("daily")[0]["name"] == "Exercise"
+    assert storage.get_analytics_settings()["default_periodicities"] == ["daily", "weekly", "monthly"]
+    assert len(storage.get_completions(habit_id)) == 1
+    storage.add_habit("Read", "weekly")
+    storage.flush()
+    data = json.loads((tmp_path / "habits.json").read_text())
+    assert [(h["name"], h["periodicity"]) for h in data["habits"]] == [("Exercise", "daily"), ("Read", "weekly")]
+    assert data["analytics_settings"] == json.loads(saved)["analytics_settings"]
+
+
+def test_completion_index_tracks_writes(tmp_path):
+    storage = CachedJSONStorage(tmp_path / "habits.json")
+    first = storage.add_habit("Exercise", "daily")
+    second = storage.add_habit("Read", "weekly")
+    for _ in range(3):
+        storage.complete_habit(first)
+    storage.complete_habit(second)
+
+    completions = storage.get_completions(first)
+    assert completions == sorted(completions)
+    assert len(completions) == 3
+    assert storage.get_completions(first, limit=2) == completions[:2]
+    assert storage.get_completions(first, limit=2, latest=True) == completions[-2:]
+    assert storage.get_habit_by_id(second)["name"] == "Read"
+
+    assert storage.delete_habit(first)
+    assert storage.get_habit_by_id(first) is None
+    assert storage.get_completions(first) == []
+    assert len(storage.get_completions(second)) == 1
+
+    storage.flush()
+    reloaded = JSONStorage(storage.file_path)
+    assert [h["id"] for h in reloaded.get_habits()] == [second]
+    assert reloaded.get_completions(second) == storage.get_completions(second)
+
+
+def test_json_storage_indexes_each_file_version_once(tmp_path, monkeypatch):
+    storage = JSONStorage(tmp_path / "habits.json")
+    first = storage.add_habit("Exercise", "daily")
+    second = storage.add_habit("Read", "weekly")
+    storage.add_completions([(first, "2025-07-01T07:00:00"), (second, "2025-07-05T20:00:00")])
+
+    packed = []
+    original = storage_module.pack_timestamps
+    monkeypatch.setattr(storage_module, "pack_timestamps",
+                        lambda *args, **kwargs: packed.append(args) or original(*args, **kwargs))
+    assert storage.get_habit_by_id(second)["name"] == "Read"
+    assert packed == []
+    for _ in range(3):
+        assert storage.get_completions(first) == ["2025-07-01T07:00:00"]
+    storage.complete_habit(first)
+    assert len(storage.get_completions(first)) == 2
+    assert packed == []
+
+    JSONStorage(storage.file_path).add_completions([(second, "2025-07-12T20:00:00")])
+    assert len(storage.get_completions(second)) == 2
+    assert packed
+
+
+def test_json_storage_packs_only_the_habits_read(tmp_path, monkeypatch):
+    storage = JSONStorage(tmp_path / "habits.json")
+    habit_ids = [storage.add_habit(f"Habit {n}", "daily") for n in range(3)]
+    storage.add_completions((habit_id, "2025-07-01T07:00:00") for habit_id in habit_ids)
+
+    packed = []
+    original = storage_module.pack_timestamps
+    monkeypatch.setattr(storage_module, "pack_timestamps",
+                        lambda *args, **kwargs: packed.append(args) or original(*args, **kwargs))
+    assert JSONStorage(storage.file_path).get_completions(habit_ids[1]) == ["2025-07-01T07:00:00"]
+    assert len(packed) == 1
+
+
+def test_sqlite_latest_completions(tmp_path):
+    storage = SQLiteStorage(tmp_path / "habits.db")
+    habit_id = storage.add_habit("Exercise", "daily")
+    for _ in range(3):
+        storage.complete_habit(habit_id)
+    completions = storage.get_completions(habit_id)
+    assert storage.get_completions(habit_id, limit=2, latest=True) == completions[-2:]
+    assert storage.get_all_completions() == {habit_id: completions}
+
+
+
+@pytest.mark.parametrize("make_storage", [
+    lambda tmp_path: JSONStorage(tmp_path / "habits.json"),
+    lambda tmp_path: SQLiteStorage(tmp_path / "habits.db"),
+    lambda tmp_path: ShardedStorage(tmp_path / "habits.d"),
+])
+def test_completions_in_time_range(tmp_path, make_storage):
+    storage = make_storage(tmp_path)
+    habit_id = storage.add_habit("Exercise", "daily")
+    storage.add_completions(
+        (habit_id, datetime(2025, 7, day, 8, 0)) for day in range(1, 11)
+    )
+
+    window = storage.get_completions(habit_id, since=datetime(2025, 7, 3), until="2025-07-06T08:00:00")
+    assert window == ["2025-07-03T08:00:00", "2025-07-04T08:00:00", "2025-07-05T08:00:00"]
+    assert storage.get_completions(habit_id, since=datetime(2025, 7, 9), limit=1) == ["2025-07-09T08:00:00"]
+    assert len(storage.get_completion_times(habit_id, until=datetime(2025, 7, 3))) == 2
+    assert len(storage.get_completion_times(99, since=datetime(2025, 7, 1))) == 0
+
+
+@pytest.mark.parametrize("make_storage", [
+    lambda tmp_path: JSONStorage(tmp_path / "habits.json"),
+    lambda tmp_path: AppendLogStorage(tmp_path / "habits.json", compact_every=2),
+    lambda tmp_path: SQLiteStorage(tmp_path / "habits.db"),
+    lambda tmp_path: ShardedStorage(tmp_path / "habits.d"),
+])
+def test_rollups_follow_writes_and_deletes(tmp_path, clock, make_storage):
+    storage = make_storage(tmp_path)
+    habit_id = storage.add_habit("Exercise", "daily")
+    storage.add_completions([(habit_id, "2025-02-27T07:00:00"), (habit_id, "2025-02-28T07:00:00")])
+    for _ in range(3):
+        storage.complete_habit(habit_id)
+
+    assert storage.get_rollup(habit_id, "monthly") == {"2025-02": 2, "2025-03": 3}
+    assert storage.get_rollup(habit_id, "daily", since=datetime(2025, 2, 28)) == \
+        {"2025-02-28": 1, "2025-03-01": 3}
+    assert storage.get_rollup(habit_id, "weekly", until=datetime(2025, 2, 28)) == {"2025-W09": 5}
+
+    storage.rebuild_rollups()
+    assert storage.get_rollup(habit_id, "monthly") == {"2025-02": 2, "2025-03": 3}
+    storage.delete_habit(habit_id)
+    assert storage.get_rollup(habit_id, "daily") == {}
+    with pytest.raises(ValueError):
+        storage.get_rollup(habit_id, "hourly")
+
+
+def test_check_ins_store_rollups_in_the_file(tmp_path, clock, monkeypatch):
+    path = tmp_path / "habits.json"
+    storage = JSONStorage(path)
+    habit_id = storage.add_habit("Exercise", "daily")
+    assert json.loads(path.read_text())["rollups"][str(habit_id)] == {"daily": {}, "weekly": {}, "monthly": {}}
+    for day in range(3):
+        clock.current = datetime(2025, 2, 27, 8, 0) + timedelta(days=day)
+        storage.complete_habit(habit_id)
+
+    assert json.loads(path.read_text())["rollups"][str(habit_id)] == {
+        "daily": {"2025-02-27": 1, "2025-02-28": 1, "2025-03-01": 1},
+        "weekly": {"2025-W09": 3},
+        "monthly": {"2025-02": 2, "2025-03": 1},
+    }
+    monkeypatch.setattr(storage_module, "build_rollup", lambda *args: pytest.fail("rollup rebuilt on read"))
+    assert storage.get_rollup(habit_id, "monthly") == {"2025-02": 2, "2025-03": 1}
+
+
+def test_json_bulk_adds_advance_streaks_and_rollups(tmp_path, monkeypatch):
+    storage = JSONStorage(tmp_path / "habits.json")
+    habit_id = storage.add_habit("Exercise", "daily")
+    storage.add_completions([(habit_id, "2025-02-26T07:00:00")])
+
+    monkeypatch.setattr(storage_module, "build_streak_state", lambda *args: pytest.fail("streak rebuilt"))
+    monkeypatch.setattr(storage_module, "build_rollup", lambda *args: pytest.fail("rollup rebuilt"))
+    outcomes = []
+    summary = storage.add_completions(
+        [(habit_id, "2025-02-27T07:00:00"), (habit_id, "2025-02-26T07:00:00"),
+         (99, "2025-02-27T07:00:00"), (habit_id, "2025-02-28T07:00:00")],
+        outcomes=outcomes,
+    )
+    assert summary["added"] == 2
+    assert outcomes == ["added", "duplicates", "unknown_habit", "added"]
+    assert storage.get_streak_state(habit_id)["current"] == 3
+    assert storage.get_rollup(habit_id, "monthly") == {"2025-02": 3}
+
+
+def test_sqlite_builds_rollups_for_older_databases(tmp_path):
+    storage = SQLiteStorage(tmp_path / "habits.db")
+    habit_id = storage.add_habit("Exercise", "daily")
+    storage.add_completions([(habit_id, "2025-02-27T07:00:00")])
+    with storage._conn:
+        storage._conn.execute("DELETE FROM rollups")
+        storage._conn.execute("PRAGMA user_version = 0")
+    storage.close()
+
+    assert SQLiteStorage(tmp_path / "habits.db").get_rollup(habit_id, "daily") == {"2025-02-27": 1}
+
+class FrozenDatetime(datetime):
+    current = datetime(2025, 3, 1, 8, 0)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    monkeypatch.setattr(storage_module, "datetime", FrozenDatetime)
+    FrozenDatetime.current = datetime(2025, 3, 1, 8, 0)
+    return FrozenDatetime
+
+
+@pytest.mark.parametrize("make_storage", [
+    lambda tmp_path: JSONStorage(tmp_path / "habits.json"),
+    lambda tmp_path: CachedJSONStorage(tmp_path / "habits.json"),
+    lambda tmp_path: AppendLogStorage(tmp_path / "habits.json", compact_every=2),
+    lambda tmp_path: SQLiteStorage(tmp_path / "habits.db"),
+    lambda tmp_path: ShardedStorage(tmp_path / "habits.d"),
+])
+def test_streak_state_is_maintained_on_completion(tmp_path, clock, make_storage):
+    storage = make_storage(tmp_path)
+    habit_id = storage.add_habit("Exercise", "daily")
+    assert storage.get_streak_state(habit_id) == {"current": 0, "longest": 0, "last_completed_at": None}
+
+    for day in (0, 1, 2, 4, 5):
+        clock.current = datetime(2025, 3, 1, 8, 0) + timedelta(days=day)
+        storage.complete_habit(habit_id)
+
+    expected = {"current": 2, "longest": 3, "last_completed_at": "2025-03-06T08:00:00"}
+    assert storage.get_streak_state(habit_id) == expected
+    assert storage.get_streak_states() == {habit_id: expected}
+    assert storage.get_streak_state(99) is None
+
+    storage.rebuild_streaks()
+    assert storage.get_streak_state(habit_id) == expected
+
+
+def test_streak_state_survives_reload_and_periodicity_change(tmp_path, clock, monkeypatch):
+    path = tmp_path / "habits.json"
+    storage = JSONStorage(path)
+    habit_id = storage.add_habit("Exercise", "daily")
+    for day in range(3):
+        clock.current = datetime(2025, 3, 1, 8, 0) + timedelta(days=day)
+        storage.complete_habit(habit_id)
+
+    assert json.loads(path.read_text())["streaks"][str(habit_id)]["longest"] == 3
+
+    storage.update_habit(habit_id, periodicity="weekly")
+    assert json.loads(path.read_text())["streaks"][str(habit_id)]["longest"] == 1
+
+    builds = []
+    original = storage_module.build_streak_state
+    monkeypatch.setattr(storage_module, "build_streak_state", lambda *args: builds.append(1) or original(*args))
+    for _ in range(3):
+        assert storage.get_streak_state(habit_id)["longest"] == 1
+    assert builds == []
+    storage.delete_habit(habit_id)
+    assert json.loads(path.read_text())["streaks"] == {}
+
+
+def test_first_check_in_stores_streak_state_for_older_files(tmp_path, clock):
+    path = tmp_path / "habits.json"
+    storage = JSONStorage(path)
+    habit_id = storage.add_habit("Exercise", "daily")
+    storage.complete_habit(habit_id)
+    data = json.loads(path.read_text())
+    del data["streaks"]
+    path.write_text(json.dumps(data))
+
+    clock.current = datetime(2025, 3, 2, 8, 0)
+    storage.complete_habit(habit_id)
+    assert json.loads(path.read_text())["streaks"][str(habit_id)] == \
+        {"current": 2, "longest": 2, "last_completed_at": "2025-03-02T08:00:00"}
+
+
+def test_habit_ids_are_not_reused_after_delete(tmp_path):
+    storage = JSONStorage(tmp_path / "habits.json")
+    first = storage.add_habit("Exercise", "daily")
+    second = storage.add_habit("Read", "weekly")
+    storage.delete_habit(first)
+    third = storage.add_habit("Run", "daily")
+    assert len({first, second, third}) == 3
+    storage.delete_habit(third)
+    assert storage.add_habit("Swim", "daily") == third + 1
+
+
+def _complete_many(path, habit_id, count):
+    storage = ConcurrentJSONStorage(path, max_retries=200)
+    for _ in range(count):
+        storage.complete_habit(habit_id)
+    return storage.add_habit("Worker habit", "daily")
+
+
+def test_concurrent_storage_loses_no_updates(tmp_path):
+    path = tmp_path / "habits.json"
+    habit_id = ConcurrentJSONStorage(path).add_habit("Exercise", "daily")
+
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        new_ids = list(pool.map(_complete_many, [path] * 4, [habit_id] * 4, [15] * 4))
+
+    storage = ConcurrentJSONStorage(path)
+    assert len(storage.get_completions(habit_id)) == 60
+    assert len(set(new_ids)) == 4
+    assert json.loads(path.read_text())["version"] == 65
+
+
+def test_concurrent_storage_detects_stale_writes(tmp_path):
+    path = tmp_path / "habits.json"
+    storage = ConcurrentJSONStorage(path, max_retries=1)
+    habit_id = storage.add_habit("Exercise", "daily")
+
+    data = storage._load_data()
+    ConcurrentJSONStorage(path).complete_habit(habit_id)
+    with pytest.raises(StorageConflictError):
+        storage._save_data(data)
+
+
+def test_sharded_storage_writes_one_month_shard(tmp_path, clock):
+    storage = ShardedStorage(tmp_path / "habits.d")
+    exercise = storage.add_habit("Exercise", "daily")
+    read = storage.add_habit("Read", "weekly")
+    storage.add_completions([(exercise, "2025-01-15T07:00:00"), (read, "2025-02-03T21:00:00")])
+    january = tmp_path / "habits.d" / str(exercise) / "2025-01.json"
+    untouched = {path: path.stat().st_mtime_ns for path in (january, tmp_path / "habits.d" / str(read))}
+    generation = storage.generation
+
+    clock.current = datetime(2025, 3, 1, 8, 0)
+    assert storage.complete_habit(exercise)
+    assert sorted(p.name for p in (tmp_path / "habits.d" / str(exercise)).iterdir()) == \
+        ["2025-01.json", "2025-03.json", "rollup.json", "streak.json"]
+    assert {path: path.stat().st_mtime_ns for path in untouched} == untouched
+    assert storage.generation != generation
+    assert json.loads((tmp_path / "habits.d" / str(exercise) / "2025-03.json").read_text()) == \
+        ["2025-03-01T08:00:00"]
+
+    reopened = ShardedStorage(tmp_path / "habits.d")
+    assert reopened.get_completions(exercise) == ["2025-01-15T07:00:00", "2025-03-01T08:00:00"]
+    assert reopened.get_completions(exercise, limit=1, latest=True) == ["2025-03-01T08:00:00"]
+    assert reopened.get_all_completions()[read] == ["2025-02-03T21:00:00"]
+
+
+def test_sharded_storage_reads_only_needed_shards(tmp_path, monkeypatch):
+    storage = ShardedStorage(tmp_path / "habits.d")
+    habit_id = storage.add_habit("Exercise", "daily")
+    storage.add_completions((habit_id, datetime(2024, month, 1, 7)) for month in range(1, 13))
+
+    fresh = ShardedStorage(tmp_path / "habits.d")
+    months = []
+    original = ShardedStorage._read_shard
+    monkeypatch.setattr(ShardedStorage, "_read_shard",
+                        lambda self, habit_id, month: months.append(month) or original(self, habit_id, month))
+
+    assert len(fresh.get_completion_times(habit_id, since=datetime(2024, 11, 1))) == 2
+    assert months == ["2024-11", "2024-12"]
+
+
+def test_sharded_storage_keeps_a_bounded_shard_cache(tmp_path):
+    storage = ShardedStorage(tmp_path / "habits.d", shard_cache_size=3)
+    habit_id = storage.add_habit("Exercise", "daily")
+    storage.add_completions((habit_id, datetime(2024, month, 1, 7)) for month in range(1, 13))
+    assert len(storage.get_completion_times(habit_id)) == 12
+    assert [path.stem for path in storage._shards] == ["2024-10", "2024-11", "2024-12"]
+
+    storage.get_completion_times(habit_id, until=datetime(2024, 1, 31))
+    assert [path.stem for path in storage._shards] == ["2024-11", "2024-12", "2024-01"]
+
+
+def test_sharded_generation_reads_only_the_catalog(tmp_path, monkeypatch):
+    storage = ShardedStorage(tmp_path / "habits.d")
+    habit_id = storage.add_habit("Exercise", "daily")
+    storage.complete_habit(habit_id)
+    monkeypatch.setattr(storage_module.os, "scandir", lambda *args: pytest.fail("habit directories scanned"))
+
+    generation = storage.generation
+    assert storage.generation == generation
+    ShardedStorage(tmp_path / "habits.d").add_completions([(habit_id, "2025-01-15T07:00:00")])
+    assert storage.generation != generation
+
+
+def test_sharded_storage_delete_removes_habit_directory(tmp_path):
+    storage = ShardedStorage(tmp_path / "habits.d")
+    habit_id = storage.add_habit("Exercise", "daily")
+    storage.complete_habit(habit_id)
+    assert (tmp_path / "habits.d" / str(habit_id)).is_dir()
+
+    assert storage.delete_habit(habit_id)
+    assert not (tmp_path / "habits.d" / str(habit_id)).exists()
+    assert storage.get_habits() == [] and storage.get_completions(habit_id) == []
+    assert storage.add_habit("Read", "weekly") == habit_id + 1
+
+
+def test_user_storage_factory_partitions_by_user(tmp_path):
+    factory = user_storage_factory(tmp_path / "users", "json")
+    factory("alice").add_habit("Exercise", "daily")
+
+    assert [h["name"] for h in factory("alice").get_habits()] == ["Exercise"]
+    assert factory("bob").get_habits() == []
+    assert sorted(p.name for p in (tmp_path / "users").iterdir()) == ["alice.json", "bob.json"]
+    for bad in ("../alice", "", ".hidden", "a/b"):
+        with pytest.raises(ValueError):
+            factory(bad)
+
+
+def test_storage_pool_evicts_least_recently_used_and_idle(tmp_path):
+    now = [0.0]
+    pool = StoragePool(user_storage_factory(tmp_path, "cached"), max_open=2,
+                       idle_timeout=60, clock=lambda: now[0])
+    alice = pool.get("alice")
+    alice.add_habit("Exercise", "daily")
+    assert pool.get("alice") is alice
+    pool.get("bob")
+    pool.get("carol")
+
+    assert "alice" not in pool and len(pool) == 2
+    assert not alice.dirty
+    assert [h["name"] for h in pool.get("alice").get_habits()] == ["Exercise"]
+
+    now[0] = 61
+    assert pool.evict_idle() == 2
+    assert len(pool) == 0 and pool.evictions == 4
+
+
+def test_storage_pool_evicts_idle_storages_behind_a_recent_one(tmp_path):
+    now = [0.0]
+    pool = StoragePool(user_storage_factory(tmp_path, "json"), idle_timeout=60, clock=lambda: now[0])
+    with pool.lease("alice"):
+        pool.get("bob")
+        now[0] = 50
+    now[0] = 70
+    assert pool.evict_idle() == 1
+    assert "alice" in pool and "bob" not in pool
+
+
+def test_storage_pool_never_closes_leased_storages(tmp_path):
+    pool = StoragePool(user_storage_factory(tmp_path, "sqlite"), max_open=1)
+    with pool.lease("alice") as alice:
+        with pool.lease("bob"):
+            assert len(pool) == 2
+        assert "bob" not in pool
+        alice.add_habit("Exercise", "daily")
+    assert "alice" in pool and pool.evictions == 1
+    pool.close()
+
+
+def test_storage_pool_opens_storages_outside_the_pool_lock(tmp_path):
+    opening = threading.Event()
+    proceed = threading.Event()
+    factory = user_storage_factory(tmp_path, "json")
+
+    def slow_factory(user_id):
+        if user_id == "slow":
+            opening.set()
+            proceed.wait(10)
+        return factory(user_id)
+
+    pool = StoragePool(slow_factory, max_open=1)
+    slow = threading.Thread(target=pool.get, args=("slow",))
+    slow.start()
+    assert opening.wait(5)
+    fast = threading.Thread(target=lambda: pool.get("fast").add_habit("Exercise", "daily"))
+    fast.start()
+    # Opening "slow" does not hold up another user's lease.
+    fast.join(5)
+    finished = not fast.is_alive()
+    proceed.set()
+    slow.join()
+    fast.join()
+    assert finished
+    assert [h["name"] for h in pool.get("fast").get_habits()] == ["Exercise"]
+
+
+def test_pooled_trackers_share_a_pool_across_threads(tmp_path):
+    import threading
+    from habit_tracker import HabitTracker
+
+    pool = StoragePool(user_storage_factory(tmp_path, "sqlite"), max_open=1)
+    users = ["alice", "bob", "carol"]
+    for user in users:
+        HabitTracker(user_id=user, pool=pool).create_habit("Exercise", "daily")
+    errors = []
+
+    def work(user):
+        tracker = HabitTracker(user_id=user, pool=pool)
+        try:
+            for _ in range(20):
+                tracker.complete_habit(1)
+                tracker.get_longest_streak_for_habit(1)
+        except Exception as error:  # collected so the assertion shows it
+            errors.append(error)
+
+    threads = [threading.Thread(target=work, args=(user,)) for user in users * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert [len(HabitTracker(user_id=user, pool=pool).get_completion_times(1)) for user in users] == [40] * 3
+    pool.close()
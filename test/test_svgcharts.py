@@ -0,0 +1,106 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xml.etree.ElementTree as ET
+import pytest
+from array import array
+from datetime import datetime
+import svgcharts
+from cli import main
+from timestamps import to_epoch_us
+from visualization import iter_html_report, plot_all_habits, plot_habit_progress
+
+
+@pytest.fixture
+def tracker(tracker):
+    tracker.update_habit(2, name="Read <books>")
+    svgcharts.clear_cache()
+    return tracker
+
+
+def test_progress_chart_is_valid_svg():
+    times = array('q', [to_epoch_us(datetime(2025, 1, 1 + day)) for day in range(5)])
+    root = ET.fromstring(svgcharts.progress_chart("Exercise & more", times))
+
+    namespace = "{http://www.w3.org/2000/svg}"
+    assert root.tag == namespace + "svg"
+    assert "Exercise & more Completion Progress" in [t.text for t in root.iter(namespace + "text")]
+    assert len(list(root.iter(namespace + "circle"))) == 5
+    last_point = root.find(namespace + "polyline").get("points").split()[-1]
+    assert last_point == "780.0,40.0"
+
+
+def test_progress_chart_downsamples_long_histories():
+    times = array('q', range(0, 100_000 * 60_000_000, 60_000_000))
+    svg = svgcharts.progress_chart("Busy", times)
+    points = ET.fromstring(svg).find("{http://www.w3.org/2000/svg}polyline").get("points").split()
+    assert len(points) <= 2 * 720
+    assert "<circle" not in svg
+
+
+def test_weekly_counts_and_sparkline():
+    times = array('q', [to_epoch_us(datetime(2025, 7, day)) for day in (1, 2, 9, 20)])
+    assert svgcharts.weekly_counts(times, 3, datetime(2025, 7, 21)) == [2, 1, 1]
+    assert svgcharts.weekly_counts(times, 4, datetime(2025, 7, 22)) == [0, 2, 1, 1]
+    ET.fromstring(svgcharts.sparkline([2, 1, 0, 1]))
+    ET.fromstring(svgcharts.sparkline([]))
+
+
+def test_cached_chart_is_keyed_by_data_version():
+    calls = []
+
+    def render(value):
+        calls.append(value)
+        return f"<svg>{value}</svg>"
+
+    assert svgcharts.cached_chart((1, "v1"), render, "a") == "<svg>a</svg>"
+    assert svgcharts.cached_chart((1, "v1"), render, "b") == "<svg>a</svg>"
+    assert svgcharts.cached_chart((1, "v2"), render, "b") == "<svg>b</svg>"
+    assert calls == ["a", "b"]
+    assert svgcharts.cache_info()["hits"] == 1
+
+
+def test_svg_backend_does_not_import_matplotlib(tracker, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "matplotlib", None)
+    output_dir = str(tmp_path / "graphs")
+
+    filename = plot_habit_progress("Exercise", tracker.get_completion_times(1), backend="svg",
+                                   output_dir=output_dir)
+    assert filename == os.path.join(output_dir, "exercise_progress.svg")
+    first = plot_all_habits(tracker, output_dir=output_dir, backend="svg")
+    tracker.import_completions([(1, "2025-07-03T07:00:00")])
+    second = plot_all_habits(tracker, output_dir=output_dir, backend="svg")
+
+    assert set(second) == {1, 2} and second[2] == first[2] and second[1] != first[1]
+    assert sorted(os.listdir(output_dir)) == sorted(
+        ["exercise_progress.svg"] + [os.path.basename(f) for f in second.values()])
+    with pytest.raises(ValueError):
+        plot_all_habits(tracker, output_dir=output_dir, backend="pdf")
+
+
+def test_html_report_streams_and_reuses_charts(tracker):
+    until = datetime(2025, 7, 10)
+    chunks = list(iter_html_report(tracker, weeks=4, until=until))
+    html = "".join(chunks)
+
+    assert len(chunks) == 5
+    assert html.startswith("<!DOCTYPE html>") and html.endswith("</html>\n")
+    assert "Read &lt;books&gt;" in html
+    assert "No completion data available" in html
+    assert svgcharts.cache_info()["misses"] == 5
+
+    tracker.import_completions([(2, "2025-07-06T20:00:00")])
+    assert "".join(iter_html_report(tracker, weeks=4, until=until)) != html
+    assert svgcharts.cache_info() == dict(hits=3, misses=7, size=7, maxsize=svgcharts.CACHE_SIZE)
+
+
+def test_cli_report_and_svg_plot(tracker, tmp_path, capsys):
+    report = tmp_path / "out" / "report.html"
+    assert main(["report", "--output", str(report)], tracker=tracker) == 0
+    assert report.read_text(encoding="utf-8").count("<section") == 3
+
+    assert main(["plot", "1", "--backend", "svg", "--output-dir", str(tmp_path / "svg")], tracker=tracker) == 0
+    assert (tmp_path / "svg" / "exercise_progress.svg").exists()
+    assert "Report written" in capsys.readouterr().out
@@ -0,0 +1,36 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from array import array
+from datetime import datetime
+from timestamps import (
+    to_epoch_us, from_epoch_us, pack_timestamps, unpack_timestamps, format_timestamps, slice_range,
+)
+
+
+def test_epoch_round_trip_keeps_microseconds():
+    moment = datetime(2025, 8, 22, 7, 11, 42, 879265)
+    assert from_epoch_us(to_epoch_us(moment)) == moment
+    assert to_epoch_us(moment.isoformat()) == to_epoch_us(moment)
+    assert from_epoch_us(to_epoch_us(datetime(1969, 12, 31, 23, 59))) == datetime(1969, 12, 31, 23, 59)
+
+
+def test_pack_and_format_timestamps():
+    values = ["2025-07-02T00:00:00", "2025-07-01T08:30:00.250000"]
+    packed = pack_timestamps(values)
+
+    assert isinstance(packed, array) and packed.itemsize == 8
+    assert format_timestamps(packed) == sorted(values)
+    assert unpack_timestamps(packed) == sorted(datetime.fromisoformat(v) for v in values)
+
+
+def test_slice_range_is_half_open():
+    times = pack_timestamps(["2025-07-01T08:00:00", "2025-07-02T08:00:00", "2025-07-03T08:00:00"])
+
+    assert format_timestamps(slice_range(times, "2025-07-02T08:00:00", "2025-07-03T08:00:00")) == \
+        ["2025-07-02T08:00:00"]
+    assert len(slice_range(times, since=datetime(2025, 7, 2))) == 2
+    assert len(slice_range(times, until=datetime(2025, 7, 2))) == 1
+    assert slice_range(times) == times
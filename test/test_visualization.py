@@ -0,0 +1,64 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+pytest.importorskip("matplotlib")
+
+import profiling
+from visualization import plot_all_habits, plot_calendar_heatmap
+
+
+def test_plot_all_habits_renders_in_process_pool(tracker, tmp_path):
+    output_dir = tmp_path / "graphs"
+    filenames = plot_all_habits(tracker, output_dir=str(output_dir), max_workers=2)
+
+    assert set(filenames) == {1, 2}
+    for filename in filenames.values():
+        with open(filename, "rb") as file:
+            assert file.read(8) == b"\x89PNG\r\n\x1a\n"
+
+
+def test_plot_all_habits_skips_unchanged_charts(tracker, tmp_path):
+    output_dir = str(tmp_path / "graphs")
+    first = plot_all_habits(tracker, output_dir=output_dir, max_workers=0)
+    mtimes = {habit_id: os.stat(f).st_mtime_ns for habit_id, f in first.items()}
+
+    tracker.import_completions([(1, "2025-07-03T07:00:00")])
+    second = plot_all_habits(tracker, output_dir=output_dir, max_workers=0)
+
+    assert second[2] == first[2]
+    assert os.stat(second[2]).st_mtime_ns == mtimes[2]
+    assert second[1] != first[1]
+    assert not os.path.exists(first[1])
+    assert len(os.listdir(output_dir)) == 2
+
+
+def test_plot_calendar_heatmap_reads_daily_rollup(tracker, tmp_path, monkeypatch):
+    from datetime import date
+
+    monkeypatch.setattr(tracker.storage, "get_completion_times",
+                        lambda *args, **kwargs: pytest.fail("heatmap should not read completions"))
+    filename = plot_calendar_heatmap(tracker, 1, weeks=8, until=date(2025, 7, 31),
+                                     output_dir=str(tmp_path / "graphs"))
+
+    assert os.path.basename(filename) == "1_exercise_heatmap.png"
+    with open(filename, "rb") as file:
+        assert file.read(8) == b"\x89PNG\r\n\x1a\n"
+    assert plot_calendar_heatmap(tracker, 99) is None
+
+
+@pytest.mark.parametrize("max_workers", [0, 2])
+def test_render_timings_reach_the_parent_profile(tracker, tmp_path, max_workers):
+    profiling.reset()
+    profiling.enable()
+    try:
+        plot_all_habits(tracker, output_dir=str(tmp_path / "graphs"), max_workers=max_workers)
+        metrics = profiling.snapshot()
+    finally:
+        profiling.disable()
+        profiling.reset()
+    assert metrics["visualization.render_chart"]["calls"] == 2
+    assert metrics["visualization.render_chart"]["seconds"] > 0
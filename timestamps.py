@@ -0,0 +1,61 @@
+"""Compact completion timestamps.
+
+Completions are handled internally as int64 microseconds since
+1970-01-01 (naive local time, like datetime.now()), packed in
+array('q'): 8 bytes per completion instead of a str or datetime object.
+ISO strings are only produced at the edges (JSON files, printing).
+"""
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_epoch_us(value):
+    """Convert a datetime or ISO format string to epoch microseconds.
+
+    Timezone-aware values (e.g. from exports in UTC) are converted to
+    naive local time first, like the timestamps the tracker writes itself.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return (value - EPOCH) // _MICROSECOND
+
+
+def from_epoch_us(value):
+    """Convert epoch microseconds back to a naive datetime."""
+    return EPOCH + timedelta(microseconds=value)
+
+
+def pack_timestamps(values, assume_sorted=False):
+    """Pack datetimes or ISO strings into a sorted array('q') of epoch microseconds."""
+    packed = [to_epoch_us(value) for value in values]
+    if not assume_sorted:
+        packed.sort()
+    return array('q', packed)
+
+
+def unpack_timestamps(times):
+    """Unpack an array of epoch microseconds into datetime objects."""
+    return [from_epoch_us(value) for value in times]
+
+
+def format_timestamps(times):
+    """Format an array of epoch microseconds as ISO strings."""
+    return [from_epoch_us(value).isoformat() for value in times]
+
+
+def slice_range(times, since=None, until=None):
+    """Return the completions in [since, until) from a sorted array('q').
+
+    Bounds are datetimes or ISO strings and may be omitted. The window is
+    found by binary search, so recent-window queries don't scan the full
+    history.
+    """
+    start = bisect_left(times, to_epoch_us(since)) if since is not None else 0
+    end = bisect_left(times, to_epoch_us(until)) if until is not None else len(times)
+    return times[start:end]
@@ -1,40 +1,328 @@
-import matplotlib.pyplot as plt
-from datetime import datetime
-import os
-import sys
-
-
-def plot_habit_progress(habit_name, completions, show_plot=False):
-    """Generate a progress graph for a habit.
-
-    Args:
-        habit_name (str): Name of the habit.
-        completions (list of str): List of ISO format datetime strings.
-        show_plot (bool): Whether to display the plot interactively.
-    """
-    if not completions:
-        print("No completion data available for this habit.")
-        return None
-
-    dates = [datetime.fromisoformat(c) for c in completions]
-    dates_sorted = sorted(dates)
-
-    plt.figure(figsize=(10, 5))
-    plt.plot(dates_sorted, range(1, len(dates_sorted) + 1), 'b-o')
-    plt.title(f"{habit_name} Completion Progress")
-    plt.xlabel("Date")
-    plt.ylabel("Total Completions")
-    plt.grid(True)
-    plt.xticks(rotation=45)
-
-    os.makedirs("graphs", exist_ok=True)
-    filename = f"graphs/{habit_name.lower().replace(' ', '_')}_progress.png"
-    plt.tight_layout()
-    plt.savefig(filename)
-
-    if show_plot:
-        plt.show()  # This opens the interactive plot window
-
-    plt.close()
-
-    return filename
+"""Progress graphs.
+
+numpy and matplotlib are imported inside the plotting functions, so
+importing this module (or the rest of the tracker) stays cheap until a
+graph is drawn. With backend="svg" the progress charts are written by
+svgcharts.py instead and matplotlib is never imported; write_html_report()
+streams SVG charts of every habit into a single HTML page.
+"""
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+import glob
+import hashlib
+from html import escape
+import os
+import sys
+import time
+
+import profiling
+import svgcharts
+
+BACKENDS = ("matplotlib", "svg")
+_EXTENSIONS = {"matplotlib": "png", "svg": "svg"}
+
+
+def _slug(name):
+    return name.lower().replace(' ', '_')
+
+
+def _digest(name, times_bytes):
+    """Version of a habit's chart data, used in filenames and cache keys."""
+    return hashlib.sha1(name.encode() + b"\0" + times_bytes).hexdigest()[:12]
+
+
+@profiling.timed("visualization.plot_habit_progress")
+def plot_habit_progress(habit_name, completions, show_plot=False, backend="matplotlib", output_dir=None):
+    """Generate a progress graph for a habit.
+
+    Args:
+        habit_name (str): Name of the habit.
+        completions (list of str or array): List of ISO format datetime
+            strings, or array('q') of epoch microseconds (see timestamps.py).
+        show_plot (bool): Whether to display the plot interactively
+            (matplotlib backend only).
+        backend (str): "matplotlib" for a PNG, or "svg" for an SVG file
+            rendered without matplotlib.
+        output_dir (str, optional): Directory for the file (default: graphs).
+
+    Returns:
+        str: Filename of the graph, or None if there are no completions.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    if not completions:
+        print("No completion data available for this habit.")
+        return None
+
+    output_dir = output_dir or "graphs"
+    os.makedirs(output_dir, exist_ok=True)
+    filename = os.path.join(output_dir, f"{_slug(habit_name)}_progress.{_EXTENSIONS[backend]}")
+    if backend == "svg":
+        with open(filename, "w", encoding="utf-8") as file:
+            file.write(svgcharts.progress_chart(habit_name, completions))
+        return filename
+
+    import numpy as np
+    import matplotlib.pyplot as plt
+
+    if isinstance(completions, array):
+        dates_sorted = np.sort(np.frombuffer(completions, dtype=np.int64)).astype('datetime64[us]')
+    else:
+        dates_sorted = sorted(datetime.fromisoformat(c) for c in completions)
+
+    plt.figure(figsize=(10, 5))
+    plt.plot(dates_sorted, range(1, len(dates_sorted) + 1), 'b-o')
+    plt.title(f"{habit_name} Completion Progress")
+    plt.xlabel("Date")
+    plt.ylabel("Total Completions")
+    plt.grid(True)
+    plt.xticks(rotation=45)
+
+    plt.tight_layout()
+    plt.savefig(filename)
+
+    if show_plot:
+        plt.show()  # This opens the interactive plot window
+
+    plt.close()
+
+    return filename
+
+
+def _render_progress_chart(job):
+    """Render one progress chart to a PNG file (process pool worker).
+
+    Uses the object-oriented Figure API with the Agg canvas, so nothing
+    touches pyplot's global state and no GUI backend is loaded.
+    """
+    import numpy as np
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    habit_name, times_bytes, filename = job
+    dates_sorted = np.sort(np.frombuffer(times_bytes, dtype=np.int64)).astype('datetime64[us]')
+
+    figure = Figure(figsize=(10, 5))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    axes.plot(dates_sorted, range(1, len(dates_sorted) + 1), 'b-o')
+    axes.set_title(f"{habit_name} Completion Progress")
+    axes.set_xlabel("Date")
+    axes.set_ylabel("Total Completions")
+    axes.grid(True)
+    axes.tick_params(axis='x', labelrotation=45)
+    figure.tight_layout()
+    figure.savefig(filename)
+    return filename
+
+
+def _timed_render(job):
+    """Render one progress chart and return how long it took.
+
+    Workers of the process pool have their own profiling registry, so
+    plot_all_habits records the returned time in the parent instead.
+    """
+    start = time.perf_counter()
+    _render_progress_chart(job)
+    return time.perf_counter() - start
+
+
+def _write_svg_chart(job):
+    """Write one progress chart as SVG (no matplotlib, no process pool)."""
+    habit_name, times_bytes, filename = job
+    with open(filename, "w", encoding="utf-8") as file:
+        file.write(svgcharts.progress_chart(habit_name, array('q', times_bytes)))
+    return filename
+
+
+@profiling.timed("visualization.plot_all_habits")
+def plot_all_habits(tracker, output_dir=None, max_workers=None, backend="matplotlib"):
+    """Generate progress graphs for every habit in parallel.
+
+    Charts are named after a hash of the habit's completions, so a chart
+    whose data hasn't changed since the last run is not rendered again.
+    Older charts of the same habit are removed.
+
+    Args:
+        tracker: HabitTracker instance.
+        output_dir (str, optional): Directory for the PNG files (default:
+            the graph_directory analytics setting).
+        max_workers (int, optional): Size of the process pool; 0 renders
+            in the current process.
+        backend (str): "matplotlib" for PNGs, or "svg" for SVG files,
+            which are cheap enough to always render in-process.
+
+    Returns:
+        dict: {habit_id: filename} for every habit with completions.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    extension = _EXTENSIONS[backend]
+    if output_dir is None:
+        output_dir = tracker.storage.get_analytics_settings().get("graph_directory", "graphs")
+    os.makedirs(output_dir, exist_ok=True)
+
+    completions_by_habit = tracker.get_all_completions()
+    filenames = {}
+    jobs = []
+    for habit in tracker.get_all_habits():
+        times = completions_by_habit.get(habit.habit_id)
+        if not times:
+            continue
+        times_bytes = times.tobytes()
+        prefix = f"{habit.habit_id}_{_slug(habit.name)}_progress"
+        filename = os.path.join(output_dir, f"{prefix}_{_digest(habit.name, times_bytes)}.{extension}")
+        filenames[habit.habit_id] = filename
+        if os.path.exists(filename):
+            continue
+        for stale in glob.glob(os.path.join(output_dir, glob.escape(prefix) + f"_*.{extension}")):
+            os.remove(stale)
+        jobs.append((habit.name, times_bytes, filename))
+
+    timings = []
+    if backend == "svg":
+        for job in jobs:
+            _write_svg_chart(job)
+    elif max_workers == 0:
+        timings = [_timed_render(job) for job in jobs]
+    elif jobs:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            timings = list(pool.map(_timed_render, jobs))
+    if profiling.is_enabled():
+        for seconds in timings:
+            profiling.record("visualization.render_chart", seconds)
+
+    return filenames
+
+
+@profiling.timed("visualization.plot_calendar_heatmap")
+def plot_calendar_heatmap(tracker, habit_id, weeks=53, until=None, output_dir=None):
+    """Draw a calendar heatmap of a habit's daily completion counts.
+
+    One column per week (Monday on top), one cell per day, shaded by the
+    number of completions. Counts come from the stored daily rollup, so
+    a year-long chart reads a few hundred rows instead of every completion.
+
+    Args:
+        tracker: HabitTracker instance.
+        habit_id (int): ID of the habit.
+        weeks (int): Number of weeks to show, ending with the week of until.
+        until (date, optional): Last day shown (default: today).
+        output_dir (str, optional): Directory for the PNG file (default:
+            the graph_directory analytics setting).
+
+    Returns:
+        str: Filename of the PNG, or None if the habit doesn't exist.
+    """
+    habit = tracker.storage.get_habit_by_id(habit_id)
+    if habit is None:
+        return None
+
+    import numpy as np
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    last_day = until or date.today()
+    first_day = last_day - timedelta(days=last_day.weekday(), weeks=weeks - 1)
+    counts = tracker.get_rollup(habit_id, "daily", datetime.combine(first_day, datetime.min.time()),
+                                datetime.combine(last_day + timedelta(days=1), datetime.min.time()))
+
+    grid = np.full((7, weeks), np.nan)
+    month_ticks = {}
+    day = first_day
+    while day <= last_day:
+        column = (day - first_day).days // 7
+        grid[day.weekday(), column] = counts.get(day.isoformat(), 0)
+        if day.day <= 7 and day.weekday() == 0:
+            month_ticks[column] = day.strftime("%b")
+        day += timedelta(days=1)
+
+    figure = Figure(figsize=(max(4, weeks * 0.22), 2.6))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    image = axes.imshow(np.ma.masked_invalid(grid), cmap="Greens", vmin=0, aspect="equal")
+    axes.set_title(f"{habit['name']} Completions")
+    axes.set_yticks(range(7))
+    axes.set_yticklabels(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"])
+    axes.set_xticks(list(month_ticks))
+    axes.set_xticklabels(list(month_ticks.values()))
+    axes.tick_params(length=0)
+    for spine in axes.spines.values():
+        spine.set_visible(False)
+    figure.colorbar(image, ax=axes, shrink=0.8, label="Completions")
+    figure.tight_layout()
+
+    if output_dir is None:
+        output_dir = tracker.storage.get_analytics_settings().get("graph_directory", "graphs")
+    os.makedirs(output_dir, exist_ok=True)
+    filename = os.path.join(output_dir, f"{habit_id}_{_slug(habit['name'])}_heatmap.png")
+    figure.savefig(filename)
+    return filename
+
+
+def iter_html_report(tracker, weeks=26, until=None):
+    """Yield an HTML report of every habit, a chunk at a time.
+
+    Each habit gets a sparkline of its weekly completions and its SVG
+    progress chart. All completions are read in one storage call, and
+    charts are reused from svgcharts' cache while a habit's data is
+    unchanged, so only the habits completed since the last report are
+    rendered again.
+
+    Args:
+        tracker: HabitTracker instance.
+        weeks (int): Number of weeks covered by the sparklines.
+        until (datetime, optional): Day ending the last sparkline week
+            (default: now).
+
+    Yields:
+        str: Consecutive pieces of the HTML document.
+    """
+    until = until or datetime.now()
+    # Weeks end with the day of until, so the sparklines only change daily.
+    last_midnight = datetime.combine(until.date() + timedelta(days=1), datetime.min.time())
+    completions_by_habit = tracker.get_all_completions()
+    yield ("<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n<title>Habit Report</title>\n"
+           "<style>body{font-family:sans-serif;margin:2em}section{margin-bottom:2em}"
+           "h2 svg{vertical-align:middle;margin-left:1em}</style>\n</head>\n<body>\n"
+           f"<h1>Habit Report</h1>\n<p>Generated {until:%Y-%m-%d %H:%M}.</p>\n")
+    for habit in tracker.get_all_habits():
+        times = completions_by_habit.get(habit.habit_id, array('q'))
+        version = _digest(habit.name, times.tobytes())
+        counts = svgcharts.weekly_counts(times, weeks, last_midnight)
+        spark = svgcharts.cached_chart((habit.habit_id, version, "sparkline", weeks, last_midnight),
+                                       svgcharts.sparkline, counts)
+        parts = [f'<section id="habit-{habit.habit_id}">\n<h2>{escape(habit.name)}{spark}</h2>\n',
+                 f"<p>{escape(habit.periodicity.capitalize())} &middot; {len(times)} completions, "
+                 f"{sum(counts)} in the last {weeks} weeks</p>\n"]
+        if times:
+            parts.append(svgcharts.cached_chart((habit.habit_id, version, "progress"),
+                                                svgcharts.progress_chart, habit.name, times))
+        else:
+            parts.append("<p>No completion data available for this habit.</p>")
+        parts.append("\n</section>\n")
+        yield "".join(parts)
+    yield "</body>\n</html>\n"
+
+
+@profiling.timed("visualization.write_html_report")
+def write_html_report(tracker, path, weeks=26, until=None):
+    """Write the report of iter_html_report() to a file.
+
+    Args:
+        tracker: HabitTracker instance.
+        path (str): Output filename.
+        weeks (int): Number of weeks covered by the sparklines.
+        until (datetime, optional): Day ending the last sparkline week.
+
+    Returns:
+        str: The filename.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        for chunk in iter_html_report(tracker, weeks=weeks, until=until):
+            file.write(chunk)
+    return path